@@ -0,0 +1,93 @@
+"""Benchmark whole-recording R-peak detection.
+
+Synthesizes a beat train lazily (nothing is held for the whole recording),
+runs ``detect_r_peaks`` over it chunk by chunk and reports throughput and
+detection accuracy against the known beat positions.
+
+    python benchmarks/bench_detection.py --hours 24 --leads 3 --fs 200
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from holter.detection import detect_r_peaks
+from holter.ingest import Recording
+
+
+class BeatTrainRecording(Recording):
+    """Gaussian-wave beats on a jittered R-R process, synthesized on read"""
+
+    def __init__(self, hours, fs=200.0, n_leads=3, seed=0):
+        rng = np.random.default_rng(seed)
+        self.fs = fs
+        self.n_samples = int(hours * 3600 * fs)
+        self.lead_names = tuple(f'Lead {i + 1}' for i in range(n_leads))
+        n_beats = int(hours * 3600 / 0.6)
+        rr = np.clip(0.85 + 0.1 * np.sin(np.arange(n_beats) / 40) + 0.03 * rng.standard_normal(n_beats), 0.4, 1.6)
+        self.beats = np.round(np.cumsum(rr) * fs).astype(np.int64)
+        self.beats = self.beats[self.beats < self.n_samples - fs]
+        t = np.arange(-0.3, 0.5, 1 / fs)
+        template = (0.15 * np.exp(-((t + 0.18) / 0.025) ** 2) + 1.2 * np.exp(-(t / 0.012) ** 2)
+                    - 0.25 * np.exp(-((t - 0.03) / 0.012) ** 2) + 0.3 * np.exp(-((t - 0.25) / 0.05) ** 2))
+        self._template = template * np.array([1.0, 0.7, -0.4][:n_leads] + [0.5] * max(n_leads - 3, 0))[:, None]
+        self._offset = int(round(0.3 * fs))
+        # Fixed noise table so that repeated reads of a range are identical
+        self._noise = 0.02 * rng.standard_normal(1_000_003).astype(np.float32)
+
+    def _read(self, start, stop, index):
+        width = self._template.shape[1]
+        first, last = np.searchsorted(self.beats, [start - width + self._offset, stop + self._offset])
+        out = np.zeros((len(index), stop - start + 2 * width), dtype=np.float32)
+        cols = (self.beats[first:last] - self._offset - start + width)[:, None] + np.arange(width)
+        for row, lead in enumerate(index):
+            np.add.at(out[row], cols.ravel(), np.tile(self._template[lead], last - first))
+        out = out[:, width:width + stop - start]
+        positions = np.arange(start, stop)
+        for row, lead in enumerate(index):
+            out[row] += self._noise[(positions + 7919 * lead) % len(self._noise)]
+        return out
+
+
+def match(detected, truth, tolerance):
+    """Return sensitivity and positive predictivity with a matching tolerance in samples"""
+    pos = np.clip(np.searchsorted(truth, detected), 1, len(truth) - 1)
+    nearest = np.minimum(np.abs(truth[pos] - detected), np.abs(truth[pos - 1] - detected))
+    tp = int(np.sum(nearest <= tolerance))
+    return tp / len(truth), tp / max(len(detected), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hours', type=float, default=24.0)
+    parser.add_argument('--leads', type=int, default=3)
+    parser.add_argument('--fs', type=float, default=200.0)
+    args = parser.parse_args()
+
+    recording = BeatTrainRecording(args.hours, args.fs, args.leads)
+
+    step = int(300 * args.fs)
+    synth = time.perf_counter()
+    for position in range(0, recording.n_samples, step):
+        recording.read(position, position + step)
+    synth = time.perf_counter() - synth
+
+    start = time.perf_counter()
+    peaks = detect_r_peaks(recording, chunk_seconds=300)
+    elapsed = time.perf_counter() - start
+
+    sensitivity, ppv = match(peaks, recording.beats, int(0.05 * args.fs))
+    total = recording.n_samples * recording.n_leads
+    print(f'{args.hours:g} h x {args.leads} leads @ {args.fs:g} Hz ({total / 1e6:.1f}M samples)')
+    print(f'  detection: {elapsed:.2f} s total, {max(elapsed - synth, 0):.2f} s excluding synthesis '
+          f'({synth:.2f} s), {total / elapsed / 1e6:.1f}M samples/s')
+    print(f'  beats: {len(peaks)} detected / {len(recording.beats)} true, '
+          f'Se {sensitivity:.4f}, +P {ppv:.4f}')
+
+
+if __name__ == '__main__':
+    main()
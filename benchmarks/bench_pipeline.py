@@ -0,0 +1,262 @@
+"""Benchmark every analysis stage on synthetic recordings, against a baseline.
+
+For each recording length a ``SyntheticHolter`` record is written to a
+temporary WFDB file and the whole signal path runs on it: ingest, filter,
+R-peak detection, beat classification, AF, HRV, ST, statistics, report
+export and plot decimation. Every stage gets its wall time, throughput in
+recording samples (all leads) per second and peak memory, the resident set
+size above the stage's starting point sampled from a thread. Detection and
+classification are also scored against the generator's ground truth.
+
+Results can be saved as JSON and are compared with a baseline; the exit
+status is 1 when a metric regressed by more than the threshold (see
+``benchmarks/regression.py``).
+
+    python benchmarks/bench_pipeline.py --sizes 1h,24h --json results.json
+    python benchmarks/bench_pipeline.py --update-baseline
+"""
+import argparse
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks import regression
+from holter.af import RRSeries, detect_af_episodes
+from holter.classify import NORMAL, VENTRICULAR, BeatClassifier
+from holter.conditioning import iter_conditioned
+from holter.decimate import MinMaxPyramid
+from holter.detection import detect_r_peaks
+from holter.hrv import HRVEngine
+from holter.ingest import iter_chunks, open_recording
+from holter.metrics import memory_usage
+from holter.report import FORMATS, ReportModel, export_report
+from holter.st import STAnalyzer
+from holter.stats import HolterStatistics
+from holter.synthetic import SyntheticHolter, load_truth, write_wfdb
+
+BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline_pipeline.json')
+SIZES = '1h,24h,7d'
+UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+CHUNK_SECONDS = 600
+MATCH_TOLERANCE = 0.05      # seconds between a detected and a true beat
+VIEWS = 200                 # pyramid queries, random windows of 10 s to the whole recording
+
+
+class PeakMemory:
+    """Samples the resident set size from a thread while a block runs"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.start = self.peak = None
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, memory_usage()['rss_bytes'])
+
+    def __enter__(self):
+        self.start = self.peak = memory_usage()['rss_bytes']
+        if self.start is not None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            self._stop.set()
+            self._thread.join()
+            self.peak = max(self.peak, memory_usage()['rss_bytes'])
+        return False
+
+    @property
+    def megabytes(self):
+        return None if self.start is None else (self.peak - self.start) / 2 ** 20
+
+
+def parse_duration(text):
+    """Seconds in ``'90s'``, ``'30m'``, ``'24h'`` or ``'7d'``"""
+    return float(text[:-1]) * UNITS[text[-1]] if text[-1] in UNITS else float(text)
+
+
+def match(detected, truth, tolerance):
+    """Index of the matching true beat for every detected beat, -1 where none is within ``tolerance``"""
+    if not len(truth):
+        return np.full(len(detected), -1)
+    pos = np.clip(np.searchsorted(truth, detected), 1, max(len(truth) - 1, 1))
+    nearest = np.where(np.abs(truth[pos] - detected) < np.abs(truth[pos - 1] - detected), pos, pos - 1)
+    return np.where(np.abs(truth[nearest] - detected) <= tolerance, nearest, -1)
+
+
+def accuracy(recording, truth, peaks, labels, af):
+    """Beat detection and ventricular beat Se/+P, and the AF burden error in percentage points"""
+    matched = match(peaks, truth.peaks, int(MATCH_TOLERANCE * recording.fs))
+    found = matched >= 0
+    true_v = truth.labels == VENTRICULAR
+    detected_v = labels == VENTRICULAR
+    hit_v = int(np.count_nonzero(detected_v & found & true_v[np.maximum(matched, 0)]))
+    true_burden = 100.0 * float(np.sum(truth.af[:, 1] - truth.af[:, 0])) / recording.duration
+    return {
+        'beat_se': len(np.unique(matched[found])) / max(len(truth.peaks), 1),
+        'beat_ppv': int(np.count_nonzero(found)) / max(len(peaks), 1),
+        'vpb_se': hit_v / max(int(np.count_nonzero(true_v)), 1),
+        'vpb_ppv': hit_v / max(int(np.count_nonzero(detected_v)), 1),
+        'af_burden_error': abs(af.burden - true_burden),
+    }
+
+
+def hourly(times, *arrays):
+    """Yield ``(times, *arrays)`` an hour of beats at a time, as the pages feed the engines"""
+    hours = np.arange(times[-1] // 3600 + 1) * 3600 if len(times) else []
+    bounds = np.searchsorted(times, np.append(hours, np.inf))
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        yield (times[lo:hi],) + tuple(a[lo:hi] for a in arrays)
+
+
+def run_size(duration, leads, seed, workdir):
+    """Run the signal path on one synthetic recording; returns ``{'stages', 'accuracy', ...}``"""
+    stages = {}
+    samples = None
+
+    def stage(name, function):
+        with PeakMemory() as memory:
+            started = time.perf_counter()
+            value = function()
+            wall = time.perf_counter() - started
+        stages[name] = {'wall_s': wall, 'samples_per_s': samples / wall if wall else None,
+                        'peak_mb': memory.megabytes}
+        return value
+
+    synthetic = SyntheticHolter(duration, n_leads=leads, seed=seed)
+    samples = synthetic.n_samples * synthetic.n_leads
+    header = stage('synthesize', lambda: write_wfdb(os.path.join(workdir, 'bench.hea'), synthetic))
+    truth = load_truth(header)
+    recording = open_recording(header)
+    fs = recording.fs
+
+    def ingest():
+        for chunk in iter_chunks(recording, CHUNK_SECONDS, 0):
+            chunk.core.sum()
+
+    def conditioned():
+        for chunk in iter_conditioned(recording, CHUNK_SECONDS):
+            chunk.core.sum()
+
+    def classify():
+        classes = BeatClassifier(fs, recording.n_leads).classify(recording, peaks)
+        return classes.labels()
+
+    def af():
+        series = RRSeries.from_peaks(peaks, fs, recording.duration)
+        return series, detect_af_episodes(series)
+
+    def hrv():
+        engine = HRVEngine()
+        for times, rr in hourly(series.times, series.rr):
+            engine.add_beats(times, rr)
+        return engine.summary(), engine.segments()
+
+    def statistics():
+        stats = HolterStatistics(recording.duration, recording.start_time)
+        for times, beat_labels in hourly(peaks / fs, labels):
+            stats.add_beats(times, beat_labels)
+        stats.set_af_episodes(af_result.episodes)
+        return stats, stats.summary(), stats.hours(), stats.minutes()
+
+    def report():
+        model = ReportModel(
+            report_type='Comprehensive Holter Report',
+            patient={'id': 'BENCH', 'name': 'Synthetic', 'age': 60, 'gender': 'Other'},
+            physician='', findings='', diagnosis='', statistics=summary, hourly=hours,
+            trend=(minutes['start'], minutes['hr']), beats=(peaks / fs, labels),
+            recording={'name': 'bench.hea', 'start': recording.start_time, 'duration': recording.duration},
+            created=datetime.now())
+        return export_report(model, FORMATS, os.path.join(workdir, 'report'))
+
+    def decimate():
+        pyramid = MinMaxPyramid.build(recording)
+        rng = np.random.default_rng(seed)
+        widths = np.exp(rng.uniform(np.log(10), np.log(recording.duration), VIEWS))
+        for width, start in zip(widths, rng.uniform(0, 1, VIEWS) * (recording.duration - widths)):
+            pyramid.query(start, start + width, lead=int(rng.integers(recording.n_leads)))
+
+    stage('ingest', ingest)
+    stage('filter', conditioned)
+    peaks = stage('detect', lambda: detect_r_peaks(recording))
+    labels = stage('classify', classify)
+    series, af_result = stage('af', af)
+    stage('hrv', hrv)
+    stage('st', lambda: STAnalyzer(fs).analyze(recording, peaks))
+    stats, summary, hours, minutes = stage('statistics', statistics)
+    stage('report', report)
+    stage('decimate', decimate)
+    recording.close()
+
+    return {'duration_s': duration, 'fs': fs, 'leads': recording.n_leads, 'samples': samples,
+            'beats': int(len(truth.peaks)), 'stages': stages,
+            'accuracy': accuracy(recording, truth, peaks, labels, af_result)}
+
+
+def print_run(size, run):
+    print(f"\n{size}: {run['leads']} leads @ {run['fs']:g} Hz, {run['samples'] / 1e6:.1f}M samples, "
+          f"{run['beats']} beats")
+    print(f"{'stage':<12}{'wall':>10}{'M samples/s':>14}{'peak MB':>10}")
+    for name, stage in run['stages'].items():
+        peak = '-' if stage['peak_mb'] is None else f"{stage['peak_mb']:.0f}"
+        print(f"{name:<12}{stage['wall_s']:>9.2f}s{stage['samples_per_s'] / 1e6:>14.2f}{peak:>10}")
+    scores = run['accuracy']
+    print(f"beats Se {scores['beat_se']:.4f} +P {scores['beat_ppv']:.4f}, "
+          f"VPB Se {scores['vpb_se']:.3f} +P {scores['vpb_ppv']:.3f}, "
+          f"AF burden error {scores['af_burden_error']:.2f} points")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=SIZES, help=f'comma-separated recording lengths (default: {SIZES})')
+    parser.add_argument('--leads', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', default=None, help='also write the results to this file')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='relative slowdown or memory growth counted as a regression (default: 0.25)')
+    parser.add_argument('--update-baseline', action='store_true', help='write the results as the new baseline')
+    args = parser.parse_args()
+
+    results = {'machine': {'python': platform.python_version(), 'numpy': np.__version__,
+                           'cpus': os.cpu_count(), 'platform': platform.platform()},
+               'runs': {}}
+    workdir = tempfile.mkdtemp(prefix='holter-bench-')
+    try:
+        for size in args.sizes.split(','):
+            run = run_size(parse_duration(size), args.leads, args.seed, workdir)
+            results['runs'][size] = run
+            print_run(size, run)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    results['peak_rss_mb'] = (memory_usage()['peak_rss_bytes'] or 0) / 2 ** 20
+
+    if args.json:
+        regression.save(args.json, results)
+    if args.update_baseline:
+        regression.save(args.baseline, results)
+        print(f'\nbaseline written to {args.baseline}')
+        return 0
+    baseline = regression.load(args.baseline)
+    if baseline is None:
+        print(f'\nno baseline at {args.baseline}; run with --update-baseline to create one')
+        return 0
+    rows = regression.compare(results, baseline, args.threshold)
+    return 1 if regression.print_comparison(rows, args.threshold) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""Benchmark interaction latency and websocket traffic with many sessions open.
+
+Starts the app with ``streamlit run`` (headless) and drives several sessions
+at once over Streamlit's websocket protocol, as browsers would: each session
+opens a page, then repeats one interaction, sending the widget states and,
+for a widget inside a fragment, the fragment id, so only that fragment
+reruns. Every interaction is timed until the server reports the run finished,
+and the bytes of all messages it sent back are counted.
+
+Results can be saved as JSON and are compared with a baseline; the exit
+status is 1 when an interaction got slower or heavier than the threshold.
+
+    python benchmarks/bench_sessions.py --sessions 10 --interactions 10
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from itertools import cycle
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, 'app.py')
+BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline_sessions.json')
+sys.path.insert(0, ROOT)
+
+from benchmarks import regression
+
+NAVIGATION = "Select Analysis Task:"
+# interaction -> (page, [(widget label, values to cycle through; True presses a button)])
+INTERACTIONS = {
+    'af_sensitivity': ("💓 Atrial Fibrillation Detection",
+                       [("Sensitivity", [["Low"], ["Medium"], ["High"], ["Very High"]]),
+                        ("💾 Save Configuration", [True])]),
+    'af_min_duration': ("💓 Atrial Fibrillation Detection",
+                        [("Min duration (seconds)", [[20.0], [40.0], [60.0]]),
+                         ("💾 Save Configuration", [True])]),
+    'report_physician': ("📝 Report Generation",
+                         [("Physician Name", ["Dr. A", "Dr. Ab", "Dr. Abc", "Dr. Abcd"])]),
+}
+# Element type -> WidgetState field holding its value
+VALUE_FIELDS = {'radio': 'string_value', 'selectbox': 'string_value', 'text_input': 'string_value',
+                'text_area': 'string_value', 'select_slider': 'string_array_value',
+                'slider': 'double_array_value', 'number_input': 'double_value', 'checkbox': 'bool_value',
+                'button': 'trigger_value'}
+
+
+class Session:
+    """One browser-like websocket session"""
+
+    def __init__(self, url):
+        self.url = url
+        self.widgets = {}       # label -> (widget id, element type, fragment id, form id)
+        self.states = {}        # widget id -> WidgetState sent with every rerun
+        self.page_hash = ''
+
+    async def __aenter__(self):
+        self.socket = await websockets.connect(self.url, subprotocols=['streamlit'], max_size=None)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.socket.close()
+
+    async def rerun(self, fragment_id='', triggers=()):
+        """Send the widget states and wait for the run to finish; returns ``(seconds, bytes received)``"""
+        message = BackMsg()
+        state = message.rerun_script
+        state.page_script_hash = self.page_hash
+        state.fragment_id = fragment_id
+        state.widget_states.widgets.extend(list(self.states.values()) + list(triggers))
+        started = time.perf_counter()
+        await self.socket.send(message.SerializeToString())
+        received = 0
+        while True:
+            data = await self.socket.recv()
+            received += len(data)
+            forward = ForwardMsg()
+            forward.ParseFromString(data)
+            kind = forward.WhichOneof('type')
+            if kind == 'new_session':
+                self.page_hash = forward.new_session.page_script_hash
+            elif kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                self._register(forward.delta)
+            elif kind == 'script_finished':
+                return time.perf_counter() - started, received
+
+    def _register(self, delta):
+        element = delta.new_element
+        kind = element.WhichOneof('type')
+        proto = getattr(element, kind)
+        if kind == 'slider' and proto.type == proto.SELECT_SLIDER:
+            kind = 'select_slider'
+        if kind in VALUE_FIELDS and getattr(proto, 'label', None):
+            self.widgets[proto.label] = (proto.id, kind, delta.fragment_id, getattr(proto, 'form_id', ''))
+
+    async def interact(self, label, value):
+        """Set a widget (or press a button) and rerun as the browser would; form widgets wait for the submit"""
+        widget_id, kind, fragment_id, form_id = self.widgets[label]
+        state = WidgetState(id=widget_id)
+        field = VALUE_FIELDS[kind]
+        if field == 'trigger_value':
+            state.trigger_value = True
+            return await self.rerun(fragment_id, [state])
+        if field.endswith('_array_value'):
+            getattr(state, field).data.extend(value)
+        else:
+            setattr(state, field, value)
+        self.states[widget_id] = state
+        if form_id:
+            return 0.0, 0
+        return await self.rerun(fragment_id)
+
+
+async def run_session(url, interaction, count):
+    """Open the page of ``interaction`` and repeat it ``count`` times; returns the samples"""
+    page, steps = INTERACTIONS[interaction]
+    async with Session(url) as session:
+        await session.rerun()
+        opened = await session.interact(NAVIGATION, page)
+        samples = []
+        values = [cycle(step_values) for _, step_values in steps]
+        for _ in range(count):
+            seconds, received = 0.0, 0
+            for (label, _), step_values in zip(steps, values):
+                step_seconds, step_bytes = await session.interact(label, next(step_values))
+                seconds, received = seconds + step_seconds, received + step_bytes
+            samples.append((seconds, received))
+        return opened, samples
+
+
+async def run_all(url, sessions, count, interactions):
+    jobs = [run_session(url, interactions[i % len(interactions)], count) for i in range(sessions)]
+    return list(zip([interactions[i % len(interactions)] for i in range(sessions)], await asyncio.gather(*jobs)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, timeout=60):
+    command = [sys.executable, '-m', 'streamlit', 'run', APP, '--server.headless', 'true',
+               '--server.port', str(port), '--server.address', '127.0.0.1',
+               '--server.enableXsrfProtection', 'false', '--browser.gatherUsageStats', 'false']
+    server = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1) as response:
+                if response.status == 200:
+                    return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError('Streamlit server did not start')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=10, help='concurrent sessions (default: 10)')
+    parser.add_argument('--interactions', type=int, default=10, help='interactions per session (default: 10)')
+    parser.add_argument('--only', default=','.join(INTERACTIONS),
+                        help=f"comma-separated interactions (default: {','.join(INTERACTIONS)})")
+    parser.add_argument('--json', default=None, help='also write the results to this file')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='relative slowdown or payload growth counted as a regression (default: 0.25)')
+    parser.add_argument('--update-baseline', action='store_true', help='write the results as the new baseline')
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_server(port)
+    try:
+        url = f'ws://127.0.0.1:{port}/_stcore/stream'
+        # One session first so imports and caches are warm for everyone
+        asyncio.run(run_all(url, 1, 1, args.only.split(',')))
+        started = time.perf_counter()
+        runs = asyncio.run(run_all(url, args.sessions, args.interactions, args.only.split(',')))
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+    results = {'sessions': args.sessions, 'interactions_per_session': args.interactions,
+               'elapsed_s': elapsed, 'interactions': {}}
+    print(f"{args.sessions} sessions x {args.interactions} interactions in {elapsed:.1f} s")
+    print(f"{'interaction':<20}{'p50':>9}{'p95':>9}{'KB/interaction':>16}{'open page':>11}")
+    for name in dict.fromkeys(name for name, _ in runs):
+        samples = [sample for run_name, (_, run) in runs if run_name == name for sample in run]
+        latencies = sorted(seconds for seconds, _ in samples)
+        opened = [seconds for run_name, ((seconds, _), _) in runs if run_name == name]
+        result = results['interactions'][name] = {
+            'rerun': statistics.median(latencies),
+            'rerun_p95': latencies[min(int(0.95 * len(latencies)), len(latencies) - 1)],
+            'payload_kb': statistics.mean(received for _, received in samples) / 1024,
+            'open_page': statistics.median(opened),
+        }
+        print(f"{name:<20}{result['rerun'] * 1000:>7.0f}ms{result['rerun_p95'] * 1000:>7.0f}ms"
+              f"{result['payload_kb']:>16.1f}{result['open_page'] * 1000:>9.0f}ms")
+
+    if args.json:
+        regression.save(args.json, results)
+    if args.update_baseline:
+        regression.save(args.baseline, results)
+        print(f'\nbaseline written to {args.baseline}')
+        return 0
+    baseline = regression.load(args.baseline)
+    if baseline is None or baseline.get('sessions') != args.sessions:
+        print(f'\nno baseline for {args.sessions} sessions at {args.baseline}; '
+              f'run with --update-baseline to create one')
+        return 0
+    rows = regression.compare(results, baseline, args.threshold)
+    return 1 if regression.print_comparison(rows, args.threshold) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
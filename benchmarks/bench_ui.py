@@ -0,0 +1,128 @@
+"""Benchmark Streamlit start-up and per-page interaction latency.
+
+Runs ``app.py`` headless with Streamlit's ``AppTest`` in a fresh
+interpreter: the first run is the cold start, then every page in the
+sidebar is opened (first-open cost, including its lazy imports) and
+rerun without changes (per-interaction cost). When the app exposes the
+page registry, the import and render time of each page module is listed
+too.
+
+Results can be saved as JSON and are compared with a baseline taken on the
+same data (demo data, a given recording or a synthetic one of ``--hours``);
+the exit status is 1 when a latency regressed by more than the threshold.
+
+    python benchmarks/bench_ui.py --recording data/study.hea --reruns 5
+    python benchmarks/bench_ui.py --hours 24 --update-baseline
+"""
+import argparse
+import json
+import os
+import statistics
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, 'app.py')
+BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline_ui.json')
+sys.path.insert(0, ROOT)
+
+from benchmarks import regression
+
+
+def measure(recording, reruns):
+    """Time one fresh session; runs inside the child interpreter"""
+    from streamlit.testing.v1 import AppTest
+
+    sys.path.insert(0, ROOT)
+    at = AppTest.from_file(APP, default_timeout=600)
+    if recording:
+        at.session_state.user_data = {'role': 'Cardiac Technician', 'bookmarks': [], 'recording_path': recording}
+    started = time.perf_counter()
+    at.run()
+    result = {'cold_start': time.perf_counter() - started, 'pages': {}}
+
+    for label in at.sidebar.radio[0].options:
+        started = time.perf_counter()
+        at.sidebar.radio[0].set_value(label).run()
+        first = time.perf_counter() - started
+        times = []
+        for _ in range(reruns):
+            started = time.perf_counter()
+            at.run()
+            times.append(time.perf_counter() - started)
+        result['pages'][label] = {'first_open': first, 'rerun': statistics.median(times),
+                                  'errors': [str(e.value) for e in at.exception]}
+
+    try:
+        import views
+        result['modules'] = views.timings()
+    except (ImportError, AttributeError):
+        pass
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--recording', default=None, help='recording opened in the session (default: demo data)')
+    parser.add_argument('--hours', type=float, default=None,
+                        help='open a synthetic recording of this length instead')
+    parser.add_argument('--reruns', type=int, default=3)
+    parser.add_argument('--json', default=None, help='also write the results to this file')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='relative slowdown counted as a regression (default: 0.25)')
+    parser.add_argument('--update-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        json.dump(measure(args.recording, args.reruns), sys.stdout)
+        return 0
+
+    workdir = None
+    recording = os.path.abspath(args.recording) if args.recording else None
+    data = os.path.basename(recording) if recording else 'demo'
+    if args.hours:
+        from holter.synthetic import SyntheticHolter, write_wfdb
+
+        workdir = tempfile.mkdtemp(prefix='holter-bench-')
+        recording = write_wfdb(os.path.join(workdir, 'bench.hea'), SyntheticHolter(args.hours * 3600, seed=1))
+        data = f'synthetic {args.hours:g} h'
+    command = [sys.executable, os.path.abspath(__file__), '--child', '--reruns', str(args.reruns)]
+    if recording:
+        command += ['--recording', recording]
+    try:
+        output = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    result = {'data': data, **json.loads(output[output.index('{'):])}
+
+    print(f"cold start: {result['cold_start'] * 1000:.0f} ms")
+    print(f"{'page':<36}{'first open':>12}{'rerun':>10}")
+    for label, page in result['pages'].items():
+        flag = '  ERROR' if page['errors'] else ''
+        print(f"{label:<36}{page['first_open'] * 1000:>10.0f}ms{page['rerun'] * 1000:>8.0f}ms{flag}")
+    if result.get('modules'):
+        print(f"\n{'page module':<36}{'import':>12}{'last render':>14}")
+        for label, module in result['modules'].items():
+            print(f"{label:<36}{module['import'] * 1000:>10.0f}ms{module['render'] * 1000:>12.0f}ms")
+    if args.json:
+        regression.save(args.json, result)
+    if args.update_baseline:
+        regression.save(args.baseline, result)
+        print(f'\nbaseline written to {args.baseline}')
+        return 0
+    baseline = regression.load(args.baseline)
+    if baseline is None or baseline.get('data') != data:
+        print(f'\nno baseline for {data} data at {args.baseline}; run with --update-baseline to create one')
+        return 0
+    rows = regression.compare(result, baseline, args.threshold)
+    return 1 if regression.print_comparison(rows, args.threshold) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""Baseline comparison shared by the benchmarks.
+
+Benchmark results are nested dicts. Every numeric leaf named in ``RULES``
+is compared with the value at the same path in a baseline file. Timings and
+memory regress when they are worse than the baseline by more than the
+relative ``threshold`` and by more than an absolute floor (so timer noise
+on fast stages does not fail a run); accuracy figures regress when they
+drop by more than their floor.
+"""
+import json
+import os
+
+# metric -> (higher is better, absolute floor, floor only)
+RULES = {
+    'wall_s': (False, 0.05, False),
+    'peak_mb': (False, 16.0, False),
+    'cold_start': (False, 0.1, False),
+    'first_open': (False, 0.1, False),
+    'rerun': (False, 0.05, False),
+    'rerun_p95': (False, 0.1, False),
+    'payload_kb': (False, 1.0, False),
+    'beat_se': (True, 0.002, True),
+    'beat_ppv': (True, 0.002, True),
+    'vpb_se': (True, 0.01, True),
+    'vpb_ppv': (True, 0.01, True),
+    'af_burden_error': (False, 0.5, True),
+}
+
+
+def flatten(results, prefix=''):
+    """``{'24h/detect/wall_s': value}`` for every numeric leaf covered by ``RULES``"""
+    flat = {}
+    for key, value in results.items():
+        path = f'{prefix}/{key}' if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif key in RULES and isinstance(value, (int, float)):
+            flat[path] = float(value)
+    return flat
+
+
+def compare(results, baseline, threshold=0.25):
+    """``[(path, baseline, current, regressed)]`` for every metric present in both"""
+    current, reference = flatten(results), flatten(baseline)
+    rows = []
+    for path in sorted(current.keys() & reference.keys()):
+        higher_is_better, floor, floor_only = RULES[path.rsplit('/', 1)[-1]]
+        base, value = reference[path], current[path]
+        worse = base - value if higher_is_better else value - base
+        regressed = worse > floor and (floor_only or worse > threshold * abs(base))
+        rows.append((path, base, value, regressed))
+    return rows
+
+
+def print_comparison(rows, threshold):
+    """Print the comparison and return the number of regressions"""
+    regressions = [row for row in rows if row[3]]
+    print(f"\n{'metric':<52}{'baseline':>12}{'current':>12}{'change':>9}")
+    for path, base, value, regressed in rows:
+        change = f'{(value - base) / base:+.0%}' if base else ''
+        print(f"{path:<52}{base:>12.4g}{value:>12.4g}{change:>9}{'  REGRESSION' if regressed else ''}")
+    print(f'\n{len(rows)} metrics compared, {len(regressions)} regressed (threshold {threshold:.0%})')
+    return len(regressions)
+
+
+def load(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(path, results):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+        f.write('\n')
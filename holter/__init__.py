@@ -0,0 +1 @@
+"""Signal processing and analysis engine behind the Holter analysis guide"""
@@ -0,0 +1,217 @@
+"""Time-indexed beat and episode annotations for review navigation.
+
+Beats are kept as parallel sorted arrays of sample positions and one-byte
+label codes, so "all beats on this page" is two ``searchsorted`` calls and
+a page-sized slice. Episodes are sorted by start with a running maximum of their
+ends, which bounds the candidates overlapping any window without scanning
+the whole list. Reviewer edits (inserts, deletions, relabels) are applied
+in batches with one vectorized pass each.
+"""
+import numpy as np
+
+from holter.classify import NORMAL
+
+# Block size for forward/backward label scans; doubles on every miss
+_SCAN_BLOCK = 4096
+
+
+def _codes(labels, n):
+    labels = np.broadcast_to(np.asarray(labels, dtype='S1'), (n,))
+    return labels.view(np.uint8)
+
+
+class BeatAnnotations:
+    """Sorted beat positions (samples) with a label code per beat"""
+
+    def __init__(self, peaks, labels=NORMAL, fs=None):
+        peaks = np.asarray(peaks, dtype=np.int64)
+        order = np.argsort(peaks, kind='stable')
+        self.fs = fs
+        self._peaks = peaks[order]
+        self._codes = _codes(labels, len(peaks))[order] if np.ndim(labels) else _codes(labels, len(peaks)).copy()
+
+    def __len__(self):
+        return len(self._peaks)
+
+    @property
+    def peaks(self):
+        return self._peaks
+
+    @property
+    def labels(self):
+        return self._codes.view('S1').astype('<U1')
+
+    def range(self, start, stop):
+        """Slice of beats with ``start <= peak < stop`` as ``(peaks, labels)``"""
+        lo, hi = np.searchsorted(self._peaks, [start, stop])
+        return self._peaks[lo:hi], self._codes[lo:hi].view('S1').astype('<U1')
+
+    def count(self, start, stop, label=None):
+        lo, hi = np.searchsorted(self._peaks, [start, stop])
+        if label is None:
+            return int(hi - lo)
+        return int(np.count_nonzero(self._codes[lo:hi] == ord(label)))
+
+    def next(self, after, label=None):
+        """First beat strictly after ``after`` (optionally with ``label``), or None"""
+        first = int(np.searchsorted(self._peaks, after, side='right'))
+        if label is None:
+            return int(self._peaks[first]) if first < len(self._peaks) else None
+        code, block = ord(label), _SCAN_BLOCK
+        while first < len(self._peaks):
+            hits = np.flatnonzero(self._codes[first:first + block] == code)
+            if len(hits):
+                return int(self._peaks[first + hits[0]])
+            first += block
+            block *= 2
+        return None
+
+    def previous(self, before, label=None):
+        """Last beat strictly before ``before`` (optionally with ``label``), or None"""
+        last = int(np.searchsorted(self._peaks, before, side='left'))
+        if label is None:
+            return int(self._peaks[last - 1]) if last else None
+        code, block = ord(label), _SCAN_BLOCK
+        while last > 0:
+            lo = max(last - block, 0)
+            hits = np.flatnonzero(self._codes[lo:last] == code)
+            if len(hits):
+                return int(self._peaks[lo + hits[-1]])
+            last = lo
+            block *= 2
+        return None
+
+    def insert(self, peaks, labels=NORMAL):
+        """Add beats; positions already annotated are relabelled instead"""
+        peaks = np.atleast_1d(np.asarray(peaks, dtype=np.int64))
+        codes = _codes(labels, len(peaks))
+        index = self._find(peaks)
+        exists = index >= 0
+        self._codes[index[exists]] = codes[exists]
+        peaks, codes = peaks[~exists], codes[~exists]
+        if not len(peaks):
+            return
+        order = np.argsort(peaks, kind='stable')
+        at = np.searchsorted(self._peaks, peaks[order])
+        self._peaks = np.insert(self._peaks, at, peaks[order])
+        self._codes = np.insert(self._codes, at, codes[order])
+
+    def remove(self, peaks):
+        """Delete the beats at the given positions; unknown positions are ignored"""
+        index = self._find(np.atleast_1d(peaks))
+        keep = np.ones(len(self._peaks), dtype=bool)
+        keep[index[index >= 0]] = False
+        self._peaks = self._peaks[keep]
+        self._codes = self._codes[keep]
+
+    def relabel(self, peaks, labels):
+        """Change the labels of existing beats in place"""
+        peaks = np.atleast_1d(peaks)
+        index = self._find(peaks)
+        found = index >= 0
+        self._codes[index[found]] = _codes(labels, len(peaks))[found]
+        return int(found.sum())
+
+    def _find(self, peaks):
+        """Index of each position in the sorted array, or -1 where absent"""
+        peaks = np.asarray(peaks, dtype=np.int64)
+        if not len(self._peaks):
+            return np.full(len(peaks), -1, dtype=np.intp)
+        index = np.searchsorted(self._peaks, peaks)
+        found = self._peaks[np.minimum(index, len(self._peaks) - 1)] == peaks
+        return np.where(found, index, -1)
+
+
+class EpisodeIndex:
+    """Interval index of episodes (seconds) sorted by start"""
+
+    def __init__(self, starts=(), ends=(), kinds='AF'):
+        starts = np.asarray(starts, dtype=np.float64)
+        ends = np.asarray(ends, dtype=np.float64)
+        kinds = np.broadcast_to(np.asarray(kinds, dtype='<U16'), starts.shape)
+        order = np.argsort(starts, kind='stable')
+        self._set(starts[order], ends[order], kinds[order])
+
+    @classmethod
+    def from_intervals(cls, intervals, kind='AF'):
+        """Build from an ``(n, 2)`` array of ``[start, end]`` rows"""
+        intervals = np.asarray(intervals, dtype=np.float64).reshape(-1, 2)
+        return cls(intervals[:, 0], intervals[:, 1], kind)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _set(self, starts, ends, kinds):
+        self.starts, self.ends, self.kinds = starts, ends, np.array(kinds)
+        # Running maximum of ends: episodes before the first index whose
+        # running max exceeds ``t`` all end at or before ``t``.
+        self._reach = np.maximum.accumulate(ends) if len(ends) else ends
+
+    def overlapping(self, start, stop, kind=None):
+        """Indices of episodes overlapping ``[start, stop)``"""
+        lo = int(np.searchsorted(self._reach, start, side='right'))
+        hi = int(np.searchsorted(self.starts, stop, side='left'))
+        if hi <= lo:
+            return np.zeros(0, dtype=np.intp)
+        index = np.arange(lo, hi)
+        hit = self.ends[lo:hi] > start
+        if kind is not None:
+            hit &= self.kinds[lo:hi] == kind
+        return index[hit]
+
+    def at(self, t, kind=None):
+        """Indices of episodes containing time ``t``"""
+        return self.overlapping(t, np.nextafter(t, np.inf), kind)
+
+    def next(self, after, kind=None):
+        """Index of the first episode starting strictly after ``after``, or None"""
+        first = int(np.searchsorted(self.starts, after, side='right'))
+        candidates = np.arange(first, len(self.starts))
+        if kind is not None:
+            candidates = candidates[self.kinds[first:] == kind]
+        return int(candidates[0]) if len(candidates) else None
+
+    def previous(self, before, kind=None):
+        """Index of the last episode starting strictly before ``before``, or None"""
+        last = int(np.searchsorted(self.starts, before, side='left'))
+        candidates = np.arange(last)
+        if kind is not None:
+            candidates = candidates[self.kinds[:last] == kind]
+        return int(candidates[-1]) if len(candidates) else None
+
+    def add(self, start, end, kind='AF'):
+        at = int(np.searchsorted(self.starts, start, side='right'))
+        self._set(np.insert(self.starts, at, start), np.insert(self.ends, at, end),
+                  np.insert(self.kinds, at, kind))
+        return at
+
+    def remove(self, index):
+        keep = np.ones(len(self.starts), dtype=bool)
+        keep[index] = False
+        self._set(self.starts[keep], self.ends[keep], self.kinds[keep])
+
+    def relabel(self, index, kind):
+        self.kinds[index] = kind
+
+
+class AnnotationStore:
+    """Beats and episodes of one recording, queried by page"""
+
+    def __init__(self, fs, beats, episodes=None):
+        self.fs = float(fs)
+        self.beats = beats
+        self.episodes = episodes if episodes is not None else EpisodeIndex()
+
+    def page(self, start, stop):
+        """Beat times (s), beat labels and overlapping episode indices for seconds ``[start, stop)``"""
+        peaks, labels = self.beats.range(int(np.ceil(start * self.fs)), int(np.ceil(stop * self.fs)))
+        return peaks / self.fs, labels, self.episodes.overlapping(start, stop)
+
+    def next_beat(self, after, label=None):
+        """Time (s) of the next beat (with ``label``) after ``after`` seconds, or None"""
+        peak = self.beats.next(int(round(after * self.fs)), label)
+        return None if peak is None else peak / self.fs
+
+    def previous_beat(self, before, label=None):
+        peak = self.beats.previous(int(round(before * self.fs)), label)
+        return None if peak is None else peak / self.fs
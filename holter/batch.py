@@ -0,0 +1,171 @@
+"""Headless batch analysis of a worklist of recordings.
+
+Studies are fanned out over a ``ProcessPoolExecutor``. At most
+``max_in_flight`` studies are submitted at once, so memory stays bounded
+however long the worklist is, and per-study progress is streamed back from
+the workers through a manager queue.
+
+    python -m holter.batch worklist.txt --workers 8 --out results/
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from holter.af import RRSeries, detect_af_episodes
+from holter.cache import content_hash
+from holter.detection import RPeakDetector
+from holter.ingest import DEFAULT_CHUNK_SECONDS, iter_chunks, open_recording
+
+RECORDING_EXTENSIONS = ('.edf', '.hea')
+
+BatchEvent = namedtuple('BatchEvent', ['path', 'state', 'progress', 'result'])
+BatchEvent.__doc__ = """Progress update for one study: state is queued, running, done or failed"""
+
+
+def analyze_study(path, af_params=None, out_dir=None, progress=None):
+    """Detect beats and AF episodes in one recording and return a summary dict"""
+    started = time.perf_counter()
+    with open_recording(path) as recording:
+        detector = RPeakDetector(recording.fs, n_leads=recording.n_leads)
+        peaks = []
+        for chunk in iter_chunks(recording, DEFAULT_CHUNK_SECONDS * 5, 0):
+            peaks.append(detector.process(chunk.core))
+            if progress is not None:
+                progress.put((path, chunk.stop / recording.n_samples))
+        peaks.append(detector.flush())
+        peaks = np.concatenate(peaks)
+
+        series = RRSeries.from_peaks(peaks, recording.fs, recording.duration)
+        af = detect_af_episodes(series, **(af_params or {}))
+        result = {
+            'path': path,
+            'content_hash': content_hash(recording),
+            'duration': recording.duration,
+            'fs': recording.fs,
+            'leads': list(recording.lead_names),
+            'beats': int(len(peaks)),
+            'mean_hr': 60.0 / float(series.rr.mean()) if len(series) else 0.0,
+            'af_episodes': af.count,
+            'af_duration': af.total_duration,
+            'af_burden': af.burden,
+            'af_longest': af.longest,
+            'elapsed': time.perf_counter() - started,
+        }
+
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+        stem = os.path.join(out_dir, result['content_hash'])
+        np.save(stem + '.beats.npy', peaks)
+        np.save(stem + '.af.npy', af.episodes)
+        with open(stem + '.json', 'w') as f:
+            json.dump(result, f, indent=2)
+    result['peaks'] = peaks
+    return result
+
+
+def run_batch(paths, max_workers=None, max_in_flight=None, out_dir=None, af_params=None):
+    """Analyse every recording in ``paths``, yielding ``BatchEvent`` updates as they happen"""
+    paths = list(paths)
+    max_workers = max_workers or os.cpu_count() or 1
+    max_in_flight = max(max_in_flight or max_workers, 1)
+    context = multiprocessing.get_context('spawn')
+
+    for path in paths:
+        yield BatchEvent(path, 'queued', 0.0, None)
+
+    with context.Manager() as manager, \
+            ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+        updates = manager.Queue()
+        pending = iter(paths)
+        running = {}
+
+        def submit():
+            path = next(pending, None)
+            if path is None:
+                return None
+            running[pool.submit(analyze_study, path, af_params, out_dir, updates)] = path
+            return BatchEvent(path, 'running', 0.0, None)
+
+        while len(running) < max_in_flight:
+            event = submit()
+            if event is None:
+                break
+            yield event
+
+        while running:
+            done, _ = wait(running, timeout=0.25, return_when=FIRST_COMPLETED)
+            yield from _drain(updates)
+            for future in done:
+                path = running.pop(future)
+                try:
+                    yield BatchEvent(path, 'done', 1.0, future.result())
+                except Exception as e:
+                    yield BatchEvent(path, 'failed', 1.0, e)
+                event = submit()
+                if event is not None:
+                    yield event
+
+
+def find_recordings(directory):
+    """List recordings in a directory, one path per study"""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if os.path.splitext(name)[1].lower() in RECORDING_EXTENSIONS)
+
+
+def _drain(updates):
+    while True:
+        try:
+            path, fraction = updates.get_nowait()
+        except queue.Empty:
+            return
+        yield BatchEvent(path, 'running', fraction, None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Batch Holter analysis of a worklist')
+    parser.add_argument('worklist', nargs='+',
+                        help='recordings, directories of recordings or text files listing one path per line')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--in-flight', type=int, default=None,
+                        help='maximum studies submitted at once (default: number of workers)')
+    parser.add_argument('--out', default='results')
+    args = parser.parse_args(argv)
+
+    paths = []
+    for item in args.worklist:
+        if os.path.isdir(item):
+            paths.extend(find_recordings(item))
+        elif os.path.splitext(item)[1].lower() in RECORDING_EXTENSIONS:
+            paths.append(item)
+        else:
+            with open(item) as f:
+                paths.extend(line.strip() for line in f if line.strip())
+
+    started = time.perf_counter()
+    failed = 0
+    for event in run_batch(paths, args.workers, args.in_flight, args.out):
+        if event.state == 'done':
+            r = event.result
+            print(f"done    {event.path}: {r['beats']} beats, AF burden {r['af_burden']:.1f}% "
+                  f"({r['elapsed']:.1f} s)", flush=True)
+        elif event.state == 'failed':
+            failed += 1
+            print(f'failed  {event.path}: {event.result}', file=sys.stderr, flush=True)
+        elif event.state == 'running':
+            print(f'running {event.path}: {event.progress:.0%}', flush=True)
+    print(f'{len(paths)} studies in {time.perf_counter() - started:.1f} s, {failed} failed')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
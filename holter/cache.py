@@ -0,0 +1,216 @@
+"""Process-wide analysis cache shared by all Streamlit sessions.
+
+Entries are keyed by the content hash of a recording plus the analysis
+parameters, so every session that opens the same study shares one copy of
+its decoded signal, beats and derived results. The cache holds at most
+``max_bytes`` and evicts the least recently used entries beyond that.
+Concurrent requests for a key that is still being computed wait for the
+first computation instead of starting their own.
+"""
+import hashlib
+import mmap
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 1024 * 2 ** 20
+_HASH_BLOCK = 2 ** 20
+
+_MISSING = object()
+
+
+class _Pending:
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class AnalysisCache:
+    """Thread-safe LRU cache with a total memory budget"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = int(max_bytes)
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """Return a cached value and mark it most recently used"""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size=None):
+        """Store a value, evicting older entries to stay within the budget"""
+        size = sizeof(value) if size is None else int(size)
+        with self._lock:
+            self._store(key, value, size)
+
+    def get_or_compute(self, key, compute, size=None):
+        """Return the cached value for ``key``, computing it at most once across threads"""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = _Pending()
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if not owner:
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        try:
+            value = compute()
+        except BaseException as e:
+            pending.error = e
+            raise
+        else:
+            pending.value = value
+            entry_size = sizeof(value) if size is None else int(size)
+            with self._lock:
+                self._store(key, value, entry_size)
+            return value
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.event.set()
+
+    def discard(self, key):
+        """Drop one entry if present"""
+        with self._lock:
+            entry = self._entries.pop(key, _MISSING)
+            if entry is not _MISSING:
+                self.bytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """Counters for monitoring: hits, misses, evictions and memory use"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _store(self, key, value, size):
+        old = self._entries.pop(key, _MISSING)
+        if old is not _MISSING:
+            self.bytes -= old[1]
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+
+def sizeof(value, _seen=None):
+    """Approximate memory held by a value; memory-mapped arrays count as free"""
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    if isinstance(value, np.ndarray):
+        base = value
+        while isinstance(base, np.ndarray):
+            if isinstance(base, np.memmap):
+                return 0
+            base = base.base
+        return 0 if isinstance(base, mmap.mmap) else value.nbytes
+    if isinstance(value, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k, _seen) + sizeof(v, _seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(sizeof(v, _seen) for v in value)
+    if hasattr(value, 'memory_usage') and hasattr(value, 'columns'):
+        return int(value.memory_usage(deep=True).sum())
+    if hasattr(value, '__dict__'):
+        return sys.getsizeof(value) + sizeof(vars(value), _seen)
+    if hasattr(value, '__slots__'):
+        return sys.getsizeof(value) + sum(sizeof(getattr(value, name, None), _seen)
+                                          for name in value.__slots__)
+    return sys.getsizeof(value)
+
+
+_hash_memo = {}
+_hash_lock = threading.Lock()
+
+
+def content_hash(recording):
+    """Hex digest identifying a recording by its content.
+
+    File-backed recordings hash their files once per (path, size, mtime);
+    in-memory recordings hash their sample array. Study files carry the hash
+    of the recording they were written from, so they share its cache entries.
+    """
+    source = getattr(recording, 'source_hash', None)
+    if source:
+        return source
+    paths = getattr(recording, 'paths', ())
+    if not paths:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.ascontiguousarray(recording.data).tobytes())
+        digest.update(str(recording.fs).encode())
+        return digest.hexdigest()
+
+    stamp = tuple((os.path.abspath(p), os.stat(p).st_size, os.stat(p).st_mtime_ns) for p in paths)
+    with _hash_lock:
+        if stamp in _hash_memo:
+            return _hash_memo[stamp]
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(_HASH_BLOCK), b''):
+                digest.update(block)
+    with _hash_lock:
+        _hash_memo[stamp] = digest.hexdigest()
+    return _hash_memo[stamp]
+
+
+def make_key(kind, recording_hash, **params):
+    """Cache key for one analysis of one recording with the given parameters"""
+    return (kind, recording_hash, tuple(sorted(params.items())))
@@ -0,0 +1,203 @@
+"""Morphology clustering and beat classification for VPB counting.
+
+QRS windows of a chunk of beats are normalised into one matrix and matched
+against the current family templates with a single matrix product. Beats
+that match no family seed new families one family at a time (never one beat
+at a time), and family templates are running sums updated with
+``np.add.at``. Each family carries a label, so a reviewer relabels a whole
+family in one action.
+"""
+import numpy as np
+
+from holter.metrics import timed
+from holter.st import beat_windows
+
+NORMAL, VENTRICULAR, SUPRAVENTRICULAR, UNKNOWN = 'N', 'V', 'S', 'Q'
+LABEL_NAMES = {
+    NORMAL: 'Normal',
+    VENTRICULAR: 'Ventricular (VPB)',
+    SUPRAVENTRICULAR: 'Supraventricular (SVPB)',
+    UNKNOWN: 'Artifact / Unknown',
+}
+
+QRS_BEFORE = 0.10
+QRS_AFTER = 0.12
+
+
+class BeatClasses:
+    """Family assignment, family templates and labels for every beat of a recording"""
+
+    def __init__(self, fs, peaks, clusters, templates, counts, cluster_labels, features):
+        self.fs = fs
+        self.peaks = peaks
+        self.clusters = clusters
+        self.templates = templates          # (n_clusters, n_leads, width) mean waveforms
+        self.counts = counts
+        self.cluster_labels = cluster_labels
+        self.features = features
+
+    @property
+    def n_clusters(self):
+        return len(self.counts)
+
+    def to_arrays(self):
+        """Flat name -> array mapping, e.g. for storing in a study file"""
+        arrays = {'peaks': self.peaks, 'clusters': self.clusters, 'templates': self.templates,
+                  'counts': self.counts, 'cluster_labels': self.cluster_labels}
+        arrays.update({f'features/{name}': values for name, values in self.features.items()})
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, fs, arrays):
+        features = {name[len('features/'):]: values for name, values in arrays.items()
+                    if name.startswith('features/')}
+        return cls(fs, arrays['peaks'], arrays['clusters'], arrays['templates'], arrays['counts'],
+                   np.array(arrays['cluster_labels']), features)
+
+    def labels(self, overrides=None):
+        """Per-beat label codes, applying ``{cluster: label}`` reviewer overrides"""
+        cluster_labels = self.cluster_labels.copy()
+        for cluster, label in (overrides or {}).items():
+            cluster_labels[cluster] = label
+        labels = cluster_labels[self.clusters]
+        # Normal-morphology beats arriving early are supraventricular premature beats
+        premature = self.features['prematurity'] < 0.8
+        labels[(labels == NORMAL) & premature] = SUPRAVENTRICULAR
+        return labels
+
+    def count(self, label, overrides=None):
+        return int(np.count_nonzero(self.labels(overrides) == label))
+
+    def runs(self, label=VENTRICULAR, overrides=None):
+        """Lengths of consecutive runs of ``label`` beats (2 = couplet, 3+ = run)"""
+        mask = np.concatenate([[0], (self.labels(overrides) == label).astype(np.int8), [0]])
+        edges = np.diff(mask)
+        return np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+
+
+class BeatClassifier:
+    """Incremental morphology clustering of QRS complexes"""
+
+    def __init__(self, fs, n_leads=1, threshold=0.9, max_clusters=64):
+        self.fs = float(fs)
+        self.threshold = threshold
+        self.max_clusters = max_clusters
+        self.before = int(QRS_BEFORE * self.fs)
+        self.after = int(QRS_AFTER * self.fs)
+        width = self.before + self.after
+        self._shape_sums = np.zeros((0, n_leads * width))
+        self._wave_sums = np.zeros((0, n_leads, width))
+        self._counts = np.zeros(0, dtype=np.int64)
+
+    def fit_windows(self, windows):
+        """Assign a ``(n_leads, n_beats, width)`` window batch to families, creating new ones as needed"""
+        n_leads, n_beats, width = windows.shape
+        waves = windows - windows[:, :, :3].mean(axis=-1, keepdims=True)
+        shapes = waves.transpose(1, 0, 2).reshape(n_beats, -1).astype(np.float64)
+        shapes -= shapes.mean(axis=1, keepdims=True)
+        shapes /= np.linalg.norm(shapes, axis=1, keepdims=True).clip(1e-9)
+
+        clusters = np.full(n_beats, -1, dtype=np.int64)
+        if len(self._counts):
+            score = shapes @ self._unit_templates().T
+            best = np.argmax(score, axis=1)
+            matched = score[np.arange(n_beats), best] >= self.threshold
+            clusters[matched] = best[matched]
+
+        # Unmatched beats seed new families; each iteration creates one family
+        # from the first unmatched beat and everything that correlates with it.
+        pending = np.flatnonzero(clusters < 0)
+        while len(pending) and len(self._counts) < self.max_clusters:
+            seed = shapes[pending[0]]
+            members = pending[shapes[pending] @ seed >= self.threshold]
+            members = members if len(members) else pending[:1]
+            self._add_cluster()
+            clusters[members] = len(self._counts) - 1
+            pending = np.setdiff1d(pending, members, assume_unique=True)
+        if len(pending):
+            # Family limit reached: fall back to the closest existing family
+            self._accumulate(shapes[clusters >= 0], waves[:, clusters >= 0], clusters[clusters >= 0])
+            clusters[pending] = np.argmax(shapes[pending] @ self._unit_templates().T, axis=1)
+            self._accumulate(shapes[pending], waves[:, pending], clusters[pending])
+        else:
+            self._accumulate(shapes, waves, clusters)
+        return clusters
+
+    @timed('classify')
+    def classify(self, recording, peaks, leads=None, chunk_beats=4096):
+        """Cluster and label every beat of a recording, reading one chunk of beats at a time"""
+        peaks = np.asarray(peaks, dtype=np.int64)
+        peaks = peaks[(peaks >= self.before) & (peaks + self.after <= recording.n_samples)]
+        clusters, widths, energies = [], [], []
+        for first in range(0, len(peaks), chunk_beats):
+            batch = peaks[first:first + chunk_beats]
+            start, stop = batch[0] - self.before, batch[-1] + self.after
+            windows = beat_windows(recording.read(start, stop, leads), batch - start, self.before, self.after)
+            clusters.append(self.fit_windows(windows))
+            width, energy = qrs_features(windows, self.fs)
+            widths.append(width)
+            energies.append(energy)
+
+        clusters = np.concatenate(clusters) if clusters else np.zeros(0, dtype=np.int64)
+        templates = self._wave_sums / np.maximum(self._counts, 1)[:, np.newaxis, np.newaxis]
+        unit = self._unit_templates()
+        dominant = int(np.argmax(self._counts)) if len(self._counts) else 0
+        dominant_corr = unit @ unit[dominant] if len(self._counts) else np.zeros(0)
+        template_width, _ = qrs_features(templates.transpose(1, 0, 2), self.fs)
+
+        features = {
+            'width': np.concatenate(widths) if widths else np.zeros(0),
+            'energy': np.concatenate(energies) if energies else np.zeros(0),
+            'dominant_corr': dominant_corr[clusters] if len(clusters) else np.zeros(0),
+            'prematurity': prematurity(peaks),
+        }
+        labels = label_clusters(self._counts, dominant_corr, template_width, dominant)
+        return BeatClasses(self.fs, peaks, clusters, templates, self._counts.copy(), labels, features)
+
+    def _unit_templates(self):
+        return self._shape_sums / np.linalg.norm(self._shape_sums, axis=1, keepdims=True).clip(1e-9)
+
+    def _add_cluster(self):
+        self._shape_sums = np.vstack([self._shape_sums, np.zeros((1, self._shape_sums.shape[1]))])
+        self._wave_sums = np.concatenate([self._wave_sums, np.zeros((1,) + self._wave_sums.shape[1:])])
+        self._counts = np.append(self._counts, 0)
+
+    def _accumulate(self, shapes, waves, clusters):
+        np.add.at(self._shape_sums, clusters, shapes)
+        np.add.at(self._wave_sums, clusters, waves.transpose(1, 0, 2))
+        self._counts += np.bincount(clusters, minlength=len(self._counts))
+
+
+def qrs_features(windows, fs):
+    """QRS width (s) and energy of every beat in a ``(n_leads, n_beats, width)`` batch"""
+    waves = windows - windows[:, :, :3].mean(axis=-1, keepdims=True)
+    magnitude = np.abs(waves).sum(axis=0)
+    above = magnitude > 0.3 * magnitude.max(axis=-1, keepdims=True)
+    onset = np.argmax(above, axis=-1)
+    offset = above.shape[-1] - np.argmax(above[:, ::-1], axis=-1)
+    return (offset - onset) / fs, np.einsum('lbw,lbw->b', waves, waves)
+
+
+def prematurity(peaks, history=8):
+    """Ratio of each R-R interval to the mean of the preceding ``history`` intervals"""
+    rr = np.diff(np.asarray(peaks, dtype=np.float64))
+    if not len(rr):
+        return np.ones(len(peaks))
+    csum = np.concatenate([[0.0], np.cumsum(rr)])
+    index = np.arange(len(rr))
+    lo = np.maximum(index - history, 0)
+    mean = np.where(index > 0, (csum[index] - csum[lo]) / np.maximum(index - lo, 1), rr[0])
+    return np.concatenate([[1.0], rr / mean])
+
+
+def label_clusters(counts, dominant_corr, width, dominant):
+    """Initial family labels from morphology relative to the dominant family"""
+    labels = np.full(len(counts), NORMAL, dtype='<U1')
+    if not len(counts):
+        return labels
+    wide = (width > 1.3 * width[dominant]) | (width >= 0.12)
+    different = dominant_corr < 0.8
+    labels[wide & different] = VENTRICULAR
+    labels[~wide & different & (counts < 0.001 * counts.sum())] = UNKNOWN
+    labels[dominant] = NORMAL
+    return labels
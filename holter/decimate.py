@@ -0,0 +1,102 @@
+"""Min/max decimation pyramid for plotting long ECG recordings.
+
+Every level stores the minimum and maximum of each bucket of samples, so a
+QRS spike or an artifact never disappears from the overview however far the
+plot is zoomed out. A query picks the coarsest level that still resolves the
+requested span into at most ``max_points`` points; spans too short for the
+finest stored level are decimated on the fly from the raw samples.
+"""
+import numpy as np
+
+DEFAULT_MAX_POINTS = 4000
+
+
+def minmax_reduce(data, bucket):
+    """Min and max of consecutive ``bucket``-sample groups along the last axis"""
+    index = np.arange(0, data.shape[-1], bucket)
+    return np.minimum.reduceat(data, index, axis=-1), np.maximum.reduceat(data, index, axis=-1)
+
+
+def _check_max_points(max_points):
+    # Buckets are drawn as min/max pairs, so two points are the least a plot can get
+    if max_points < 2:
+        raise ValueError(f'max_points must be at least 2, got {max_points}')
+
+
+def interleave(x, mins, maxs):
+    """Turn per-bucket min/max pairs into a drawable ``(x, y)`` polyline"""
+    return np.repeat(x, 2), np.column_stack([mins, maxs]).ravel()
+
+
+def decimate_minmax(x, y, max_points=DEFAULT_MAX_POINTS):
+    """Reduce an ``(x, y)`` series to at most ``max_points`` points keeping extremes"""
+    _check_max_points(max_points)
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(y) <= max_points:
+        return x, y
+    bucket = -(-len(y) // (max_points // 2))
+    mins, maxs = minmax_reduce(y, bucket)
+    return interleave(x[::bucket], mins, maxs)
+
+
+class MinMaxPyramid:
+    """Precomputed min/max levels for every lead of a recording"""
+
+    def __init__(self, recording, levels):
+        self.recording = recording
+        self.levels = levels  # list of (bucket, mins, maxs), finest first
+
+    @classmethod
+    def build(cls, recording, base_bucket=64, factor=4, chunk_buckets=4096):
+        """Build all levels in one streaming pass over the recording"""
+        step = base_bucket * chunk_buckets
+        mins, maxs = [], []
+        for start in range(0, recording.n_samples, step):
+            block = recording.read(start, start + step)
+            low, high = minmax_reduce(block, base_bucket)
+            mins.append(low)
+            maxs.append(high)
+        n_leads = recording.n_leads
+        mins = np.concatenate(mins, axis=1) if mins else np.zeros((n_leads, 0), np.float32)
+        maxs = np.concatenate(maxs, axis=1) if maxs else np.zeros((n_leads, 0), np.float32)
+
+        levels = [(base_bucket, mins, maxs)]
+        while mins.shape[1] > DEFAULT_MAX_POINTS // 2:
+            mins = minmax_reduce(mins, factor)[0]
+            maxs = minmax_reduce(maxs, factor)[1]
+            levels.append((levels[-1][0] * factor, mins, maxs))
+        return cls(recording, levels)
+
+    @property
+    def nbytes(self):
+        return sum(mins.nbytes + maxs.nbytes for _, mins, maxs in self.levels)
+
+    def query(self, start, stop, lead=0, max_points=DEFAULT_MAX_POINTS):
+        """Return ``(time_s, mV)`` for seconds ``[start, stop)`` with at most ``max_points`` points"""
+        _check_max_points(max_points)
+        fs = self.recording.fs
+        first = max(int(start * fs), 0)
+        last = min(int(np.ceil(stop * fs)), self.recording.n_samples)
+        lead = self.recording.lead_index([lead])[0]
+        if last <= first:
+            return np.zeros(0), np.zeros(0)
+
+        wanted = (last - first) / (max_points // 2)
+        if wanted < self.levels[0][0]:
+            # Short span: decimate the raw samples directly
+            y = self.recording.read(first, last, [lead])[0]
+            return decimate_minmax(np.arange(first, last) / fs, y, max_points)
+
+        usable = [level for level in self.levels if level[0] >= wanted]
+        bucket, mins, maxs = usable[0] if usable else self.levels[-1]
+        lo, hi = first // bucket, -(-last // bucket)
+        low, high = mins[lead, lo:hi], maxs[lead, lo:hi]
+        # Past the coarsest level, or one bucket over from rounding: merge
+        # neighbouring buckets so the output stays within max_points
+        group = -(-(hi - lo) // (max_points // 2))
+        if group > 1:
+            low, high = minmax_reduce(low, group)[0], minmax_reduce(high, group)[1]
+        edges = np.minimum(np.arange(lo, hi + group, group), hi)
+        x = (edges[:-1] + edges[1:]) / 2 * bucket / fs
+        return interleave(x[:len(low)], low, high)
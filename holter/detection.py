@@ -0,0 +1,154 @@
+"""Streaming Pan-Tompkins R-peak detection.
+
+Every stage (band-pass, derivative, squaring, moving-window integration and
+thresholding) runs as array operations over a whole chunk with all leads in
+one 2-D array. The filter state, integration tail and adaptive threshold are
+carried between chunks, so feeding a recording chunk by chunk gives the same
+beats as feeding it in one piece.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import signal
+
+from holter.ingest import DEFAULT_CHUNK_SECONDS, iter_chunks
+from holter.metrics import timed
+
+
+class RPeakDetector:
+    """Stateful multi-lead R-peak detector for consecutive sample blocks"""
+
+    def __init__(self, fs, n_leads=1, band=(5.0, 15.0), integration_window=0.15,
+                 refractory=0.2, threshold=0.3, half_life=2.0, learning_period=2.0):
+        self.fs = float(fs)
+        self.n_leads = n_leads
+        self.threshold = threshold
+        self._sos = signal.butter(2, band, btype='bandpass', fs=self.fs, output='sos')
+        self._delay = _group_delay(self._sos, np.mean(band), self.fs)
+        self._window = max(int(round(integration_window * self.fs)), 1)
+        self._refractory = max(int(round(refractory * self.fs)), 1)
+        # Candidates closer than this to the end of the buffer may still be
+        # beaten by a larger peak in the next block, so they wait.
+        self._hold = self._refractory + 1
+        self._search = self._window + self._delay
+        # Exponential decay rate of the peak envelope, per sample
+        self._decay = np.log(2.0) / (half_life * self.fs)
+        self._learning = int(round(learning_period * self.fs))
+        self.reset()
+
+    def reset(self):
+        self._zi = np.zeros((self._sos.shape[0], self.n_leads, 2))
+        self._bp_tail = np.zeros((self.n_leads, 4))
+        self._energy_tail = np.zeros(self._window - 1)
+        self._mwi = np.zeros(0)
+        self._bp_energy = np.zeros(0)
+        self._buffer_start = 0
+        self._search_from = 0
+        self._last_peak = -self._refractory
+        self._envelope = -np.inf
+        self.n_samples = 0
+
+    def process(self, block, final=False):
+        """Consume the next ``(n_leads, n)`` block; return newly confirmed R-peak sample indices"""
+        block = np.atleast_2d(np.asarray(block, dtype=np.float64))
+        if block.shape[1]:
+            bp, self._zi = signal.sosfilt(self._sos, block, axis=1, zi=self._zi)
+
+            # Five-point derivative, squared and summed over leads
+            padded = np.concatenate([self._bp_tail, bp], axis=1)
+            deriv = (2 * padded[:, 4:] + padded[:, 3:-1] - padded[:, 1:-3] - 2 * padded[:, :-4]) / 8
+            self._bp_tail = padded[:, -4:]
+            energy = np.einsum('ij,ij->j', deriv, deriv)
+
+            # Moving-window integration via a cumulative sum
+            padded = np.concatenate([self._energy_tail, energy])
+            csum = np.concatenate([[0.0], np.cumsum(padded)])
+            mwi = (csum[self._window:] - csum[:-self._window]) / self._window
+            self._energy_tail = padded[len(padded) - self._window + 1:]
+
+            self._mwi = np.concatenate([self._mwi, mwi])
+            self._bp_energy = np.concatenate([self._bp_energy, np.einsum('ij,ij->j', bp, bp)])
+            self.n_samples += block.shape[1]
+
+        end = self._buffer_start + len(self._mwi)
+        if self._envelope == -np.inf:
+            # Seed the threshold from the largest peak of the learning period
+            if end < self._learning and not final:
+                return np.zeros(0, dtype=np.int64)
+            if len(self._mwi):
+                learn = self._mwi[:self._learning]
+                self._envelope = np.log(max(learn.max(), 1e-300)) + self._decay * self._buffer_start
+        limit = end if final else end - self._hold
+        peaks = self._pick(limit)
+
+        keep_from = max(limit - self._search, self._buffer_start)
+        self._mwi = self._mwi[keep_from - self._buffer_start:]
+        self._bp_energy = self._bp_energy[keep_from - self._buffer_start:]
+        self._buffer_start = keep_from
+        self._search_from = max(limit, self._search_from)
+        return peaks
+
+    def flush(self):
+        """Confirm any candidates still held back at the end of the recording"""
+        return self.process(np.zeros((self.n_leads, 0)), final=True)
+
+    def _pick(self, limit):
+        if len(self._mwi) < 3:
+            return np.zeros(0, dtype=np.int64)
+        local, _ = signal.find_peaks(self._mwi, distance=self._refractory)
+        index = local + self._buffer_start
+        local = local[(index >= self._search_from) & (index < limit)]
+        if not len(local):
+            return np.zeros(0, dtype=np.int64)
+        index = local + self._buffer_start
+        heights = np.maximum(self._mwi[local], 1e-300)
+
+        # Decaying peak envelope in log space: the envelope seen by candidate
+        # i is the running maximum of log(h_j) + decay * t_j over j < i.
+        scores = np.log(heights) + self._decay * index
+        running = np.maximum.accumulate(np.maximum(scores, self._envelope))
+        previous = np.concatenate([[self._envelope], running[:-1]])
+        self._envelope = running[-1]
+        accepted = scores >= previous + np.log(self.threshold)
+
+        local = local[accepted]
+        index = index[accepted]
+        if len(index) and index[0] - self._last_peak < self._refractory:
+            local, index = local[1:], index[1:]
+        if not len(index):
+            return np.zeros(0, dtype=np.int64)
+        self._last_peak = index[-1]
+
+        # Refine each beat to the band-passed energy maximum preceding the
+        # integrator peak, then undo the filter's group delay.
+        width = self._search + 1
+        if len(self._bp_energy) < width:
+            starts = np.zeros_like(local)
+            windows = self._bp_energy[np.newaxis, :]
+        else:
+            starts = np.clip(local - self._search, 0, len(self._bp_energy) - width)
+            windows = sliding_window_view(self._bp_energy, width)[starts]
+        refined = starts + np.argmax(windows, axis=1) + self._buffer_start - self._delay
+        return np.maximum(refined, 0).astype(np.int64)
+
+
+@timed('detect')
+def detect_r_peaks(recording, leads=None, chunk_seconds=DEFAULT_CHUNK_SECONDS, **kwargs):
+    """Detect R peaks over a whole recording, one chunk in memory at a time"""
+    n_leads = len(recording.lead_index(leads))
+    detector = RPeakDetector(recording.fs, n_leads=n_leads, **kwargs)
+    peaks = [detector.process(chunk.core)
+             for chunk in iter_chunks(recording, chunk_seconds, 0, leads=leads)]
+    peaks.append(detector.flush())
+    return np.concatenate(peaks)
+
+
+def rr_intervals(peaks, fs):
+    """Return beat times and the preceding R-R interval of each beat, in seconds"""
+    times = np.asarray(peaks, dtype=np.float64) / fs
+    return times[1:], np.diff(times)
+
+
+def _group_delay(sos, frequency, fs):
+    b, a = signal.sos2tf(sos)
+    _, delay = signal.group_delay((b, a), w=[frequency], fs=fs)
+    return int(round(delay[0]))
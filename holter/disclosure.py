@@ -0,0 +1,169 @@
+"""Parallel full-disclosure rendering with a content-addressed page cache.
+
+A full disclosure lays out one lead of the whole recording as fixed-length
+strips, ``strips_per_page`` to a page. Pages are drawn with the Agg backend
+in worker processes that open the recording themselves, so only page
+numbers and the page's annotations cross the process boundary. Every page
+file is named by a hash of the recording, the layout and the annotations
+falling on that page: after a reviewer edit only the pages whose beats or
+episodes changed are drawn again.
+"""
+import hashlib
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from holter.cache import content_hash
+from holter.classify import NORMAL
+from holter.decimate import decimate_minmax
+from holter.ingest import open_recording
+
+try:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.collections import LineCollection
+    from matplotlib.figure import Figure
+    MATPLOTLIB_AVAILABLE = True
+except ImportError:
+    MATPLOTLIB_AVAILABLE = False
+
+FORMATS = ('png', 'pdf')
+_RENDER_VERSION = 1
+
+Layout = namedtuple('Layout', ['lead', 'strip_seconds', 'strips_per_page', 'fmt', 'dpi'],
+                    defaults=(0, 60.0, 30, 'png', 150))
+Layout.__doc__ = """Full-disclosure page layout: lead index, strip length (s), strips per page, format, dpi"""
+
+# Recordings opened by this worker process, by path
+_worker_recordings = {}
+
+
+def page_annotations(store, page, layout):
+    """Beats, labels and episodes falling on one page of the layout"""
+    span = layout.strip_seconds * layout.strips_per_page
+    start, stop = page * span, (page + 1) * span
+    times, labels, episodes = store.page(start, stop)
+    intervals = np.column_stack([store.episodes.starts[episodes], store.episodes.ends[episodes]])
+    return times, labels, intervals
+
+
+def page_key(source_hash, page, layout, times, labels, intervals):
+    """Content address of one rendered page"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f'{_RENDER_VERSION}|{source_hash}|{page}|{tuple(layout)}'.encode())
+    for array in (np.asarray(times, np.float64), np.asarray(labels, 'S1'), np.asarray(intervals, np.float64)):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+def render_page(path, page, layout, times, labels, intervals, target):
+    """Draw one page of strips to ``target`` (runs in a worker process)"""
+    recording = _worker_recordings.get(path)
+    if recording is None:
+        recording = _worker_recordings[path] = open_recording(path)
+    fs = recording.fs
+    strip = int(round(layout.strip_seconds * fs))
+    first = page * strip * layout.strips_per_page
+    data = recording.read(first, first + strip * layout.strips_per_page, [layout.lead])[0]
+
+    fig = Figure(figsize=(11.69, 8.27), dpi=layout.dpi)  # A4 landscape
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes([0.07, 0.04, 0.91, 0.9])
+    width_px = 0.91 * 11.69 * layout.dpi
+    spacing = 2.0
+    segments, ticks, tick_labels = [], [], []
+    for i in range(-(-len(data) // strip)):
+        y = data[i * strip:(i + 1) * strip]
+        t, mv = decimate_minmax(np.arange(len(y)) / fs, y, int(2 * width_px))
+        segments.append(np.column_stack([t, mv - i * spacing]))
+        ticks.append(-i * spacing)
+        seconds = int((first + i * strip) / fs)
+        tick_labels.append(f'{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}')
+    ax.add_collection(LineCollection(segments, linewidths=0.4, colors='black'))
+
+    # Episodes shaded and non-normal beats labelled on their strips
+    page_start = first / fs
+    for start, end in intervals:
+        lo, hi = max(start, page_start), min(end, page_start + len(data) / fs)
+        for i in range(int((lo - page_start) // layout.strip_seconds),
+                       int(np.ceil((hi - page_start) / layout.strip_seconds))):
+            strip_start = page_start + i * layout.strip_seconds
+            x0, x1 = max(lo, strip_start) - strip_start, min(hi, strip_start + layout.strip_seconds) - strip_start
+            ax.axhspan(-i * spacing - spacing / 2, -i * spacing + spacing / 2,
+                       xmin=x0 / layout.strip_seconds, xmax=x1 / layout.strip_seconds,
+                       color='purple', alpha=0.12, linewidth=0)
+    marked = np.asarray(labels) != NORMAL
+    offsets = np.asarray(times)[marked] - page_start
+    for offset, label in zip(offsets, np.asarray(labels)[marked]):
+        i = int(offset // layout.strip_seconds)
+        ax.text(offset - i * layout.strip_seconds, -i * spacing + 0.7 * spacing / 2, label,
+                color='red', fontsize=5, ha='center')
+
+    ax.set_xlim(0, layout.strip_seconds)
+    ax.set_ylim(-(layout.strips_per_page - 0.5) * spacing, spacing / 2)
+    ax.set_yticks(ticks, tick_labels, fontsize=6)
+    ax.set_xticks(np.arange(0, layout.strip_seconds + 1, 5))
+    ax.tick_params(axis='x', labelsize=6)
+    ax.grid(axis='x', color='#f4a6a6', linewidth=0.3)
+    ax.set_title(f'Full disclosure - {recording.lead_names[layout.lead]} - page {page + 1}', fontsize=9)
+
+    partial = f'{target}.{os.getpid()}.tmp'
+    fig.savefig(partial, format=layout.fmt)
+    os.replace(partial, target)
+    return target
+
+
+def n_pages(recording, layout):
+    per_page = int(round(layout.strip_seconds * recording.fs)) * layout.strips_per_page
+    return max(-(-recording.n_samples // per_page), 1)
+
+
+def render_full_disclosure(recording, store, cache_dir, layout=Layout(), max_workers=None, progress=None):
+    """Render every page, reusing cached pages whose content is unchanged.
+
+    Returns the page file paths in order. ``progress(done, total)`` is called
+    as pages complete; pages found in the cache count as done immediately.
+    """
+    if not MATPLOTLIB_AVAILABLE:
+        raise RuntimeError('matplotlib is required for full-disclosure rendering')
+    if layout.fmt not in FORMATS:
+        raise ValueError(f'Unsupported format {layout.fmt!r}; expected one of {FORMATS}')
+    if not recording.paths:
+        raise ValueError('Full disclosure needs a file-backed recording')
+    os.makedirs(cache_dir, exist_ok=True)
+    source = content_hash(recording)
+    total = n_pages(recording, layout)
+
+    targets, todo = [], []
+    for page in range(total):
+        annotations = page_annotations(store, page, layout)
+        target = os.path.join(cache_dir, f'{page_key(source, page, layout, *annotations)}.{layout.fmt}')
+        targets.append(target)
+        if not os.path.exists(target):
+            todo.append((page, annotations, target))
+    done = total - len(todo)
+    if progress is not None:
+        progress(done, total)
+    if not todo:
+        return targets
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(todo))
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+        pending = {pool.submit(render_page, recording.paths[0], page, layout, *annotations, target)
+                   for page, annotations, target in todo}
+        try:
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    future.result()
+                done += len(finished)
+                if progress is not None:
+                    progress(done, total)
+        except BaseException:
+            # e.g. progress() cancelling a background job: drop the pages not started yet
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+    return targets
@@ -0,0 +1,192 @@
+"""Incremental heart rate variability over 5-minute segments.
+
+Per-segment sufficient statistics (beat count, sums, squared successive
+differences, NN50) and LF/HF band powers are computed for all touched
+segments at once with ``np.bincount`` and a batched Welch periodogram.
+Recording-level figures are combined from the segment statistics, so
+appending a new chunk of beats or re-labelling ectopic beats only
+recomputes the segments that changed.
+"""
+import numpy as np
+from scipy import signal
+
+SEGMENT_SECONDS = 300.0
+RESAMPLE_HZ = 4.0
+LF_BAND = (0.04, 0.15)
+HF_BAND = (0.15, 0.40)
+
+# Minimum fraction of a segment covered by NN beats for a valid spectrum
+MIN_COVERAGE = 0.5
+
+_COUNT, _SUM, _SUMSQ, _DIFFSQ, _NDIFF, _NN50 = range(6)
+
+
+class HRVEngine:
+    """Accumulates beats chunk by chunk and keeps HRV up to date per segment"""
+
+    def __init__(self, segment_seconds=SEGMENT_SECONDS, resample_hz=RESAMPLE_HZ):
+        self.segment_seconds = float(segment_seconds)
+        self.resample_hz = float(resample_hz)
+        self._chunks = []
+        self._times = np.zeros(0)
+        self._rr = np.zeros(0)
+        self._normal = np.zeros(0, dtype=bool)
+        self._stats = np.zeros((0, 6))
+        self._power = np.zeros((0, 2))
+        self._dirty = set()
+
+    def __len__(self):
+        return len(self._times) + sum(len(c[0]) for c in self._chunks)
+
+    @property
+    def n_segments(self):
+        self._refresh()
+        return len(self._stats)
+
+    def add_beats(self, times, rr, normal=None):
+        """Append the next chunk of beat times and R-R intervals (seconds)"""
+        times = np.asarray(times, dtype=np.float64)
+        rr = np.asarray(rr, dtype=np.float64)
+        if not len(times):
+            return
+        if normal is None:
+            previous = self._last_rr()
+            normal = plausible_nn(rr, previous)
+        self._chunks.append((times, rr, np.asarray(normal, dtype=bool)))
+        first, last = (times[[0, -1]] // self.segment_seconds).astype(int)
+        self._dirty.update(range(first, last + 1))
+
+    def set_normal(self, beats, normal):
+        """Mark beats (indices into all beats added so far) as normal or ectopic"""
+        self._consolidate()
+        beats = np.atleast_1d(beats)
+        self._normal[beats] = normal
+        # A beat also takes part in the successive difference of the next one
+        touched = np.concatenate([beats, np.minimum(beats + 1, len(self._times) - 1)])
+        self._dirty.update(np.unique(self._times[touched] // self.segment_seconds).astype(int).tolist())
+
+    def segments(self):
+        """Per-segment table: start (s), NN count, mean NN and SDNN (ms), LF and HF (ms²)"""
+        self._refresh()
+        stats = self._stats
+        count = stats[:, _COUNT]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = stats[:, _SUM] / count
+            sd = np.sqrt((stats[:, _SUMSQ] - stats[:, _SUM] * mean) / (count - 1))
+            rmssd = np.sqrt(stats[:, _DIFFSQ] / stats[:, _NDIFF])
+        return {
+            'start': np.arange(len(stats)) * self.segment_seconds,
+            'nn_count': count.astype(int),
+            'mean_nn': 1000 * mean,
+            'sdnn': 1000 * sd,
+            'rmssd': 1000 * rmssd,
+            'lf': self._power[:, 0],
+            'hf': self._power[:, 1],
+        }
+
+    def summary(self):
+        """Recording-level time- and frequency-domain HRV figures"""
+        self._refresh()
+        totals = self._stats.sum(axis=0)
+        table = self.segments()
+        valid = table['nn_count'] >= 2
+        n = totals[_COUNT]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sdnn = np.sqrt((totals[_SUMSQ] - totals[_SUM] ** 2 / n) / (n - 1)) if n > 1 else np.nan
+            rmssd = np.sqrt(totals[_DIFFSQ] / totals[_NDIFF]) if totals[_NDIFF] else np.nan
+            pnn50 = 100 * totals[_NN50] / totals[_NDIFF] if totals[_NDIFF] else np.nan
+            lf = np.nanmean(table['lf']) if np.isfinite(table['lf']).any() else np.nan
+            hf = np.nanmean(table['hf']) if np.isfinite(table['hf']).any() else np.nan
+        return {
+            'nn_count': int(n),
+            'mean_nn': 1000 * totals[_SUM] / n if n else np.nan,
+            'sdnn': 1000 * sdnn,
+            'rmssd': 1000 * rmssd,
+            'pnn50': pnn50,
+            'sdann': float(np.std(table['mean_nn'][valid], ddof=1)) if valid.sum() > 1 else np.nan,
+            'sdnn_index': float(np.nanmean(table['sdnn'][valid])) if valid.any() else np.nan,
+            'lf': lf,
+            'hf': hf,
+            'lf_hf': lf / hf if hf else np.nan,
+        }
+
+    def _last_rr(self):
+        if self._chunks:
+            return self._chunks[-1][1][-1]
+        return self._rr[-1] if len(self._rr) else None
+
+    def _consolidate(self):
+        if self._chunks:
+            self._times = np.concatenate([self._times] + [c[0] for c in self._chunks])
+            self._rr = np.concatenate([self._rr] + [c[1] for c in self._chunks])
+            self._normal = np.concatenate([self._normal] + [c[2] for c in self._chunks])
+            self._chunks = []
+
+    def _refresh(self):
+        self._consolidate()
+        if not self._dirty:
+            return
+        n_segments = int(self._times[-1] // self.segment_seconds) + 1 if len(self._times) else 0
+        if n_segments > len(self._stats):
+            grow = n_segments - len(self._stats)
+            self._stats = np.vstack([self._stats, np.zeros((grow, 6))])
+            self._power = np.vstack([self._power, np.full((grow, 2), np.nan)])
+
+        dirty = np.array(sorted(s for s in self._dirty if s < n_segments), dtype=int)
+        self._dirty.clear()
+        if not len(dirty):
+            return
+        length = self.segment_seconds
+        lo = np.searchsorted(self._times, dirty * length)
+        hi = np.searchsorted(self._times, (dirty + 1) * length)
+        counts = hi - lo
+        # Beat indices of all dirty segments and the local segment of each
+        beats = np.repeat(lo - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts) + np.arange(counts.sum())
+        local = np.repeat(np.arange(len(dirty)), counts)
+
+        rr = self._rr[beats]
+        nn = self._normal[beats]
+        previous = np.maximum(beats - 1, 0)
+        paired = nn & self._normal[previous] & (beats > 0)
+        delta = rr - self._rr[previous]
+
+        stats = np.zeros((len(dirty), 6))
+        stats[:, _COUNT] = np.bincount(local, weights=nn, minlength=len(dirty))
+        stats[:, _SUM] = np.bincount(local, weights=rr * nn, minlength=len(dirty))
+        stats[:, _SUMSQ] = np.bincount(local, weights=rr * rr * nn, minlength=len(dirty))
+        stats[:, _DIFFSQ] = np.bincount(local, weights=delta * delta * paired, minlength=len(dirty))
+        stats[:, _NDIFF] = np.bincount(local, weights=paired, minlength=len(dirty))
+        stats[:, _NN50] = np.bincount(local, weights=paired & (np.abs(delta) > 0.05), minlength=len(dirty))
+        self._stats[dirty] = stats
+        self._power[dirty] = self._band_powers(dirty, stats[:, _SUM] / length)
+
+    def _band_powers(self, segments, coverage):
+        """LF and HF power (ms²) of several segments in one batched Welch call"""
+        nn_times = self._times[self._normal]
+        nn_rr = self._rr[self._normal]
+        powers = np.full((len(segments), 2), np.nan)
+        if len(nn_times) < 4:
+            return powers
+
+        n_points = int(self.segment_seconds * self.resample_hz)
+        grid = segments[:, np.newaxis] * self.segment_seconds + np.arange(n_points) / self.resample_hz
+        tachogram = np.interp(grid.ravel(), nn_times, nn_rr).reshape(grid.shape) * 1000
+        freqs, psd = signal.welch(tachogram, fs=self.resample_hz, nperseg=min(256, n_points),
+                                  detrend='linear', axis=-1)
+        df = freqs[1] - freqs[0]
+        for column, (low, high) in enumerate((LF_BAND, HF_BAND)):
+            band = (freqs >= low) & (freqs < high)
+            powers[:, column] = psd[:, band].sum(axis=1) * df
+        powers[coverage < MIN_COVERAGE] = np.nan
+        return powers
+
+
+def plausible_nn(rr, previous=None, max_change=0.2):
+    """Flag R-R intervals that look like normal-to-normal intervals.
+
+    Intervals outside 0.3-2.0 s, or differing by more than ``max_change``
+    from the preceding interval, are treated as ectopic or artifact.
+    """
+    rr = np.asarray(rr, dtype=np.float64)
+    before = np.concatenate([[rr[0] if previous is None else previous], rr[:-1]])
+    return (rr > 0.3) & (rr < 2.0) & (np.abs(rr - before) <= max_change * before)
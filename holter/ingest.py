@@ -0,0 +1,328 @@
+"""Memory-mapped ingestion of multi-lead Holter recordings.
+
+Recordings are never decoded as a whole. Each reader maps its file with
+``np.memmap`` and converts only the requested sample range to float32
+millivolts, so peak memory depends on the chunk size and not on the length
+of the study.
+"""
+import os
+from datetime import datetime
+
+import numpy as np
+
+from holter.metrics import timed
+
+DEFAULT_CHUNK_SECONDS = 60.0
+DEFAULT_OVERLAP_SECONDS = 1.0
+
+_UNIT_SCALE = {'uv': 1e-3, 'µv': 1e-3, 'mv': 1.0, 'v': 1e3}
+
+
+class Recording:
+    """Base class for lazily readable multi-lead recordings"""
+
+    fs = None
+    n_samples = 0
+    lead_names = ()
+    start_time = None
+    paths = ()
+
+    @property
+    def n_leads(self):
+        return len(self.lead_names)
+
+    @property
+    def duration(self):
+        """Recording length in seconds"""
+        return self.n_samples / self.fs
+
+    def lead_index(self, leads):
+        """Resolve lead names or positions to an index array"""
+        if leads is None:
+            return np.arange(self.n_leads)
+        index = []
+        for lead in leads:
+            if isinstance(lead, str):
+                index.append(self.lead_names.index(lead))
+            else:
+                index.append(int(lead))
+        return np.asarray(index, dtype=np.intp)
+
+    def read(self, start, stop, leads=None):
+        """Return samples ``[start, stop)`` as a float32 ``(n_leads, n)`` array in mV"""
+        start = max(int(start), 0)
+        stop = min(int(stop), self.n_samples)
+        index = self.lead_index(leads)
+        if stop <= start:
+            return np.zeros((len(index), 0), dtype=np.float32)
+        return self._read(start, stop, index)
+
+    def adc_scale(self):
+        """Per-lead ``(gain, offset)`` with ``mV = raw * gain + offset``, or None if not integer coded"""
+        return None
+
+    def _read(self, start, stop, index):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ArrayRecording(Recording):
+    """Recording backed by an in-memory ``(n_leads, n_samples)`` array"""
+
+    def __init__(self, data, fs, lead_names=None, start_time=None):
+        data = np.asarray(data, dtype=np.float32)
+        if data.ndim == 1:
+            data = data[np.newaxis, :]
+        self.data = data
+        self.fs = float(fs)
+        self.n_samples = data.shape[1]
+        self.lead_names = tuple(lead_names or [f'Lead {i + 1}' for i in range(data.shape[0])])
+        self.start_time = start_time
+
+    def _read(self, start, stop, index):
+        return self.data[index, start:stop]
+
+
+class WFDBRecording(Recording):
+    """MIT-BIH/WFDB recording (``.hea`` header plus format 16 or 212 ``.dat`` file)"""
+
+    def __init__(self, path):
+        header_path = os.path.splitext(path)[0] + '.hea'
+        with open(header_path, 'r', encoding='latin-1') as f:
+            lines = [line.strip() for line in f
+                     if line.strip() and not line.startswith('#')]
+
+        record = lines[0].split()
+        n_signals = int(record[1])
+        self.fs = float(record[2].split('/')[0].split('(')[0]) if len(record) > 2 else 250.0
+        self.start_time = _parse_wfdb_time(record[4:6])
+
+        files, formats, gains, baselines, names = set(), set(), [], [], []
+        byte_offset = 0
+        for line in lines[1:1 + n_signals]:
+            fields = line.split()
+            files.add(fields[0])
+            fmt = fields[1]
+            if '+' in fmt:
+                fmt, offset = fmt.split('+')
+                byte_offset = int(offset)
+            formats.add(fmt.split('x')[0].split(':')[0])
+            gain, baseline, units = _parse_wfdb_gain(fields[2] if len(fields) > 2 else '')
+            adc_zero = int(fields[4]) if len(fields) > 4 else 0
+            gains.append(gain / _UNIT_SCALE.get(units.lower(), 1.0))
+            baselines.append(adc_zero if baseline is None else baseline)
+            names.append(' '.join(fields[8:]) if len(fields) > 8 else f'Signal {len(names)}')
+
+        if len(files) != 1 or len(formats) != 1:
+            raise ValueError('WFDB records must store all signals in one file with one format')
+        self.format = formats.pop()
+        if self.format not in ('16', '212'):
+            raise ValueError(f'Unsupported WFDB format {self.format}')
+
+        self.lead_names = tuple(names)
+        self._gain = np.asarray(gains, dtype=np.float32)[:, np.newaxis]
+        self._baseline = np.asarray(baselines, dtype=np.float32)[:, np.newaxis]
+        self._n_signals = n_signals
+
+        dat_path = os.path.join(os.path.dirname(header_path), files.pop())
+        self.paths = (header_path, dat_path)
+        if self.format == '16':
+            self._map = np.memmap(dat_path, dtype='<i2', mode='r', offset=byte_offset)
+            n_frames = self._map.size // n_signals
+            self._map = self._map[:n_frames * n_signals].reshape(n_frames, n_signals)
+        else:
+            self._map = np.memmap(dat_path, dtype=np.uint8, mode='r', offset=byte_offset)
+            n_frames = (self._map.size * 2 // 3) // n_signals
+        declared = int(record[3]) if len(record) > 3 else n_frames
+        self.n_samples = min(declared, n_frames)
+
+    def adc_scale(self):
+        return 1.0 / self._gain[:, 0], -self._baseline[:, 0] / self._gain[:, 0]
+
+    @timed('ingest')
+    def _read(self, start, stop, index):
+        if self.format == '16':
+            raw = self._map[start:stop].T
+        else:
+            raw = self._read_212(start, stop)
+        return (raw[index].astype(np.float32) - self._baseline[index]) / self._gain[index]
+
+    def _read_212(self, start, stop):
+        # Format 212 packs two 12-bit samples into three bytes, so decoding
+        # starts at the nearest even flat sample index.
+        first = start * self._n_signals
+        last = stop * self._n_signals
+        even = first - (first % 2)
+        n_pairs = (last - even + 1) // 2
+        packed = np.asarray(self._map[even // 2 * 3:(even // 2 + n_pairs) * 3])
+        packed = packed[:len(packed) // 3 * 3].reshape(-1, 3).astype(np.int16)
+        flat = np.empty(len(packed) * 2, dtype=np.int16)
+        flat[0::2] = packed[:, 0] | ((packed[:, 1] & 0x0F) << 8)
+        flat[1::2] = packed[:, 2] | ((packed[:, 1] & 0xF0) << 4)
+        flat[flat > 2047] -= 4096
+        flat = flat[first - even:first - even + last - first]
+        return flat.reshape(-1, self._n_signals).T
+
+    def close(self):
+        self._map = None
+
+
+class EDFRecording(Recording):
+    """EDF/EDF+ recording; the ``EDF Annotations`` channel is skipped"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            header = f.read(256)
+            n_signals = int(header[252:256])
+            signal_header = f.read(256 * n_signals)
+
+        if header[192:197] == b'EDF+D':
+            raise ValueError('Discontinuous EDF+D recordings are not supported')
+        header_bytes = int(header[184:192])
+        n_records = int(header[236:244])
+        record_seconds = float(header[244:252])
+        self.start_time = _parse_edf_time(header[168:176], header[176:184])
+
+        def field(offset, width):
+            base = offset * n_signals
+            return [signal_header[base + i * width:base + (i + 1) * width].decode('latin-1').strip()
+                    for i in range(n_signals)]
+
+        labels = field(0, 16)
+        units = field(16 + 80, 8)
+        phys_min = np.array(field(16 + 80 + 8, 8), dtype=float)
+        phys_max = np.array(field(16 + 80 + 16, 8), dtype=float)
+        dig_min = np.array(field(16 + 80 + 24, 8), dtype=float)
+        dig_max = np.array(field(16 + 80 + 32, 8), dtype=float)
+        per_record = np.array(field(16 + 80 + 40 + 80, 8), dtype=int)
+
+        offsets = np.concatenate([[0], np.cumsum(per_record)[:-1]])
+        leads = [i for i, label in enumerate(labels) if label != 'EDF Annotations']
+        if len(set(per_record[leads])) != 1:
+            raise ValueError('All EDF signals must share one sampling rate')
+
+        self._per_record = int(per_record[leads[0]])
+        self.fs = self._per_record / record_seconds
+        self.lead_names = tuple(labels[i] for i in leads)
+
+        gain = (phys_max - phys_min) / (dig_max - dig_min)
+        scale = np.array([_UNIT_SCALE.get(units[i].lower(), 1.0) for i in range(n_signals)])
+        self._gain = (gain * scale)[leads].astype(np.float32)[:, np.newaxis]
+        self._offset = ((phys_max - gain * dig_max) * scale)[leads].astype(np.float32)[:, np.newaxis]
+        self._columns = offsets[leads][:, np.newaxis] + np.arange(self._per_record)
+
+        self.paths = (path,)
+        record_size = int(per_record.sum())
+        self._map = np.memmap(path, dtype='<i2', mode='r', offset=header_bytes)
+        available = self._map.size // record_size
+        if n_records < 0 or n_records > available:
+            n_records = available
+        self._map = self._map[:n_records * record_size].reshape(n_records, record_size)
+        self.n_samples = n_records * self._per_record
+
+    def adc_scale(self):
+        return self._gain[:, 0], self._offset[:, 0]
+
+    @timed('ingest')
+    def _read(self, start, stop, index):
+        first = start // self._per_record
+        last = -(-stop // self._per_record)
+        block = self._map[first:last][:, self._columns[index]]
+        data = block.transpose(1, 0, 2).reshape(len(index), -1)
+        skip = start - first * self._per_record
+        data = data[:, skip:skip + stop - start].astype(np.float32)
+        return data * self._gain[index] + self._offset[index]
+
+    def close(self):
+        self._map = None
+
+
+class Chunk:
+    """Block of samples ``[start, stop)`` preceded by ``overlap`` samples of context"""
+
+    __slots__ = ('start', 'stop', 'data_start', 'data')
+
+    def __init__(self, start, stop, data_start, data):
+        self.start = start
+        self.stop = stop
+        self.data_start = data_start
+        self.data = data
+
+    @property
+    def overlap(self):
+        return self.start - self.data_start
+
+    @property
+    def core(self):
+        """Samples belonging to this chunk only, without the overlap context"""
+        return self.data[:, self.overlap:]
+
+
+def open_recording(path):
+    """Open an EDF/EDF+, WFDB or study file by file extension"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.hstudy':
+        from holter.study import StudyRecording
+        return StudyRecording(path)
+    if ext in ('.edf', '.rec'):
+        return EDFRecording(path)
+    if ext in ('.hea', '.dat'):
+        return WFDBRecording(path)
+    raise ValueError(f'Unrecognised recording format: {path}')
+
+
+def iter_chunks(recording, chunk_seconds=DEFAULT_CHUNK_SECONDS,
+                overlap_seconds=DEFAULT_OVERLAP_SECONDS, leads=None, start=0, stop=None):
+    """Yield consecutive ``Chunk`` objects covering the recording.
+
+    Chunk cores tile the recording without gaps; each chunk additionally
+    carries up to ``overlap_seconds`` of the preceding samples so that
+    windowed consumers can look back across the boundary.
+    """
+    size = max(int(round(chunk_seconds * recording.fs)), 1)
+    overlap = max(int(round(overlap_seconds * recording.fs)), 0)
+    stop = recording.n_samples if stop is None else min(stop, recording.n_samples)
+    position = start
+    while position < stop:
+        end = min(position + size, stop)
+        data_start = max(position - overlap, 0)
+        yield Chunk(position, end, data_start, recording.read(data_start, end, leads))
+        position = end
+
+
+def _parse_wfdb_gain(spec):
+    units = 'mV'
+    if '/' in spec:
+        spec, units = spec.split('/', 1)
+    baseline = None
+    if '(' in spec:
+        spec, baseline = spec.rstrip(')').split('(')
+        baseline = int(baseline)
+    gain = float(spec) if spec else 200.0
+    return gain or 200.0, baseline, units
+
+
+def _parse_wfdb_time(fields):
+    try:
+        if len(fields) == 2:
+            return datetime.strptime(' '.join(fields), '%H:%M:%S %d/%m/%Y')
+        if len(fields) == 1:
+            return datetime.strptime(fields[0], '%H:%M:%S')
+    except ValueError:
+        pass
+    return None
+
+
+def _parse_edf_time(date, time):
+    try:
+        return datetime.strptime(f'{date.decode()} {time.decode()}', '%d.%m.%y %H.%M.%S')
+    except ValueError:
+        return None
@@ -0,0 +1,152 @@
+"""Background jobs that run outside the Streamlit rerun cycle.
+
+A job is a function run on a shared worker pool. It receives its ``Job``
+as first argument and reports through it: ``job.update(progress, message)``
+for progress, ``job.add_partial(item)`` for results that are already
+usable, and ``job.check()``, which raises ``JobCancelled`` once a cancel
+has been requested (``update`` checks too). Sessions keep only job ids and
+poll the runner, so a job outlives reruns and page navigation.
+"""
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once its cancellation has been requested"""
+
+
+class Job:
+    """One background task with its progress, partial results and outcome"""
+
+    def __init__(self, name, fn, args=(), kwargs=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.state = QUEUED
+        self.progress = 0.0
+        self.message = ''
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._fn, self._args, self._kwargs = fn, args, kwargs or {}
+        self._partial = []
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._future = None
+
+    @property
+    def active(self):
+        return self.state in ACTIVE_STATES
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def check(self):
+        if self._cancel.is_set():
+            raise JobCancelled(self.name)
+
+    def update(self, progress=None, message=None):
+        """Report progress (0-1) and/or a status message; raises ``JobCancelled`` if cancelled"""
+        self.check()
+        if progress is not None:
+            self.progress = min(max(float(progress), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+    def add_partial(self, item):
+        with self._lock:
+            self._partial.append(item)
+
+    @property
+    def partial(self):
+        """Partial results reported so far (a copy)"""
+        with self._lock:
+            return list(self._partial)
+
+    def cancel(self):
+        """Request cancellation; a queued job is dropped, a running one stops at its next check"""
+        self._cancel.set()
+        if self._future is not None and self._future.cancel():
+            self.state, self.finished = CANCELLED, time.time()
+
+    def _run(self):
+        if self._cancel.is_set():
+            self.state, self.finished = CANCELLED, time.time()
+            return
+        self.state, self.started = RUNNING, time.time()
+        try:
+            self.result = self._fn(self, *self._args, **self._kwargs)
+            self.state, self.progress = DONE, 1.0
+        except JobCancelled:
+            self.state = CANCELLED
+        except Exception as e:
+            self.error = f'{e}\n{traceback.format_exc()}'
+            self.state = FAILED
+        finally:
+            self.finished = time.time()
+
+
+class JobRunner:
+    """Worker pool running jobs for every session, keeping recent finished jobs for polling"""
+
+    def __init__(self, max_workers=2, keep_finished=50):
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name, fn, *args, **kwargs):
+        """Queue ``fn(job, *args, **kwargs)`` and return its ``Job``"""
+        job = Job(name, fn, args, kwargs)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        job._future = self._executor.submit(job._run)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """Known jobs, oldest first"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def forget(self, job_id):
+        """Drop a finished job; active jobs are cancelled first"""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is not None and job.active:
+            job.cancel()
+
+    def shutdown(self):
+        for job in self.jobs():
+            job.cancel()
+        self._executor.shutdown(wait=False)
+
+    def _prune(self):
+        finished = [job for job in self._jobs.values() if not job.active]
+        finished.sort(key=lambda job: job.finished or 0)
+        for job in finished[:max(len(finished) - self.keep_finished, 0)]:
+            del self._jobs[job.id]
@@ -0,0 +1,233 @@
+"""Process-wide performance metrics: stage timings, memory and cache counters.
+
+Analysis stages are wrapped in ``timed('detect')``, which works both as a
+context manager and as a decorator, and other durations (page renders) are
+recorded with ``observe``. Each series keeps a cumulative histogram with
+fixed buckets, exported Prometheus-style, and a rolling window of its latest
+samples for the percentiles shown on the dashboard. ``snapshot()`` adds the
+process memory and every registered collector (such as the analysis cache
+counters), and ``write`` dumps it all to a file as JSON or in Prometheus
+text format.
+
+Metrics are per process: stages run in worker processes (the batch analysis,
+report charts) are not seen by the process that started them.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import ContextDecorator
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+PREFIX = 'holter_'
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+WINDOW = 500                # latest samples kept per series for percentiles
+STAGE = 'stage_seconds'
+
+
+class Histogram:
+    """Cumulative bucket counts plus a rolling window of recent samples"""
+
+    def __init__(self, buckets=BUCKETS, window=WINDOW):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def summary(self):
+        """Totals since start and percentiles over the rolling window"""
+        recent = sorted(self.recent)
+        if not recent:
+            return {'count': self.count, 'sum': self.sum}
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'last': self.recent[-1],
+            'mean': sum(recent) / len(recent),
+            'p50': quantile(recent, 0.5),
+            'p95': quantile(recent, 0.95),
+            'max': recent[-1],
+        }
+
+
+class Timer(ContextDecorator):
+    """Times a block or every call of a function into one histogram series"""
+
+    def __init__(self, metrics, name, labels):
+        self.metrics, self.name, self.labels = metrics, name, labels
+        self._started = None
+
+    def _recreate_cm(self):
+        # A fresh timer per call keeps decorated functions thread-safe and re-entrant
+        return Timer(self.metrics, self.name, self.labels)
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self._started, **self.labels)
+        return False
+
+
+class Metrics:
+    """Thread-safe registry of histogram series and gauge collectors"""
+
+    def __init__(self, buckets=BUCKETS, window=WINDOW):
+        self.buckets = buckets
+        self.window = window
+        self.started = time.time()
+        self._series = {}       # (name, sorted label items) -> Histogram
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, **labels):
+        """Record one sample (seconds) of the series ``name`` with ``labels``"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = Histogram(self.buckets, self.window)
+            series.observe(float(value))
+
+    def timer(self, name, **labels):
+        """Context manager and decorator recording durations into the series ``name``"""
+        return Timer(self, name, labels)
+
+    def timed(self, stage):
+        """``timer`` for one analysis stage"""
+        return self.timer(STAGE, stage=stage)
+
+    def register(self, name, collector):
+        """Add a callable returning ``{gauge: value}``, read at every snapshot"""
+        with self._lock:
+            self._collectors[name] = collector
+
+    def series(self, name=None):
+        """``[(name, labels, summary)]`` of every series, or of one metric name"""
+        with self._lock:
+            return [(key[0], dict(key[1]), histogram.summary()) for key, histogram in self._series.items()
+                    if name is None or key[0] == name]
+
+    def snapshot(self):
+        """Everything as plain data: series summaries and buckets, memory, collector gauges"""
+        with self._lock:
+            series = [{'name': name, 'labels': dict(labels), **histogram.summary(),
+                       'buckets': dict(zip(map(str, histogram.buckets + (float('inf'),)), histogram.counts))}
+                      for (name, labels), histogram in self._series.items()]
+            collectors = dict(self._collectors)
+        gauges = {}
+        for prefix, collector in collectors.items():
+            try:
+                gauges.update({f'{prefix}_{key}': value for key, value in collector().items()
+                               if isinstance(value, (int, float))})
+            except Exception:
+                continue
+        return {'time': time.time(), 'uptime': time.time() - self.started, 'memory': memory_usage(),
+                'series': series, 'gauges': gauges}
+
+    def to_prometheus(self):
+        """Prometheus text exposition format of the current snapshot"""
+        snapshot = self.snapshot()
+        lines = []
+        for key, value in snapshot['memory'].items():
+            if value is not None:
+                lines += [f'# TYPE {PREFIX}{key} gauge', f'{PREFIX}{key} {value}']
+        for key, value in snapshot['gauges'].items():
+            lines += [f'# TYPE {PREFIX}{key} gauge', f'{PREFIX}{key} {value}']
+        typed = set()
+        for series in snapshot['series']:
+            name = PREFIX + series['name']
+            if name not in typed:
+                lines.append(f'# TYPE {name} histogram')
+                typed.add(name)
+            labels = [f'{key}="{escape(value)}"' for key, value in series['labels'].items()]
+            cumulative = 0
+            for bound, count in series['buckets'].items():
+                cumulative += count
+                le = '+Inf' if bound == 'inf' else bound
+                bucket_labels = labels + [f'le="{le}"']
+                lines.append(f'{name}_bucket{{{",".join(bucket_labels)}}} {cumulative}')
+            suffix = f'{{{",".join(labels)}}}' if labels else ''
+            lines += [f'{name}_sum{suffix} {series["sum"]}', f'{name}_count{suffix} {series["count"]}']
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Write the metrics to ``path``: JSON for ``.json`` files, Prometheus text otherwise"""
+        if path.lower().endswith('.json'):
+            text = json.dumps(self.snapshot(), indent=1)
+        else:
+            text = self.to_prometheus()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Replace atomically so a scraper never reads a half-written file
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    def start_export(self, path, interval=15.0):
+        """Rewrite ``path`` every ``interval`` seconds from a daemon thread; returns its stop event"""
+        stop = threading.Event()
+
+        def export():
+            while True:
+                try:
+                    self.write(path)
+                except OSError:
+                    pass
+                if stop.wait(interval):
+                    return
+
+        threading.Thread(target=export, name='metrics-export', daemon=True).start()
+        return stop
+
+
+def quantile(values, q):
+    """Linear-interpolated quantile of a sorted, non-empty list"""
+    position = q * (len(values) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def memory_usage():
+    """Resident set size, its peak and the machine's physical memory in bytes (None where unknown)"""
+    usage = {'rss_bytes': None, 'peak_rss_bytes': None, 'physical_memory_bytes': None}
+    try:
+        page = os.sysconf('SC_PAGE_SIZE')
+        usage['physical_memory_bytes'] = page * os.sysconf('SC_PHYS_PAGES')
+        with open('/proc/self/statm') as f:
+            usage['rss_bytes'] = int(f.read().split()[1]) * page
+    except (AttributeError, ValueError, OSError):
+        pass
+    if RESOURCE_AVAILABLE:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        usage['peak_rss_bytes'] = peak if sys.platform == 'darwin' else peak * 1024
+    return usage
+
+
+METRICS = Metrics()
+timed = METRICS.timed
+timer = METRICS.timer
+observe = METRICS.observe
@@ -0,0 +1,327 @@
+"""Multi-format Holter report export.
+
+A report is first collected into one ``ReportModel``; anonymization is a
+single transformation of that model, so every output format sees the same
+de-identified data. The writers (text, PDF, HL7 v2, CSV beat listing) run
+concurrently on a thread pool. Charts are drawn with the Agg backend in
+worker processes, and the PDF writer waits for them while the other
+formats are written. The CSV beat listing is written a chunk at a time,
+so its size does not depend on holding the whole listing in memory.
+"""
+import hashlib
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from holter.classify import SUPRAVENTRICULAR, VENTRICULAR
+from holter.metrics import timed
+
+try:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.figure import Figure
+    from matplotlib.image import imread
+    MATPLOTLIB_AVAILABLE = True
+except ImportError:
+    MATPLOTLIB_AVAILABLE = False
+
+FORMATS = ('PDF', 'TXT', 'HL7', 'CSV')
+EXTENSIONS = {'PDF': 'pdf', 'TXT': 'txt', 'HL7': 'hl7', 'CSV': 'csv'}
+MIME_TYPES = {'PDF': 'application/pdf', 'TXT': 'text/plain', 'HL7': 'application/hl7-v2', 'CSV': 'text/csv'}
+CHARTS = ('hr_trend', 'hourly_ectopy')
+CSV_CHUNK_BEATS = 100_000
+
+ReportModel = namedtuple('ReportModel', ['report_type', 'patient', 'physician', 'findings', 'diagnosis',
+                                         'statistics', 'hourly', 'trend', 'beats', 'recording', 'created'])
+ReportModel.__doc__ = """Everything a report shows, shared by all output formats.
+
+``patient`` holds id, name, age and gender; ``statistics`` the report
+figures; ``hourly`` the hourly table and ``trend`` ``(minute starts, HR)``
+from ``HolterStatistics``; ``beats`` is ``(times, labels)`` or None;
+``recording`` holds name, start (datetime or None), duration and
+optionally ``show_date``.
+"""
+
+
+def anonymize(model):
+    """De-identified copy of a report: pseudonymous ID, no name, age band, no dates"""
+    patient = dict(model.patient)
+    digest = hashlib.blake2b(str(patient.get('id', '')).encode(), digest_size=4).hexdigest().upper()
+    patient['id'] = f'ANON-{digest}'
+    patient['name'] = 'Anonymous'
+    decade = int(patient.get('age') or 0) // 10 * 10
+    patient['age'] = f'{decade}-{decade + 9}'
+    recording = dict(model.recording)
+    recording['name'] = patient['id']
+    # The time of day stays (circadian findings) but the date is not shown
+    recording['show_date'] = False
+    return model._replace(patient=patient, recording=recording)
+
+
+def _fmt(value, digits=0, unit=''):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return 'n/a'
+    return f'{value:,.{digits}f}{unit}'
+
+
+def _summary_rows(model):
+    s = model.statistics
+    return [
+        ('Total Beats', _fmt(s['total_beats'])),
+        ('Average HR', _fmt(s['mean_hr'], unit=' bpm')),
+        ('Maximum HR', _fmt(s['max_hr'], unit=' bpm')),
+        ('Minimum HR', _fmt(s['min_hr'], unit=' bpm')),
+        ('AF Burden', _fmt(s['af_burden'], 1, '%')),
+        ('VPB Count', _fmt(s['vpb_count'])),
+        ('SVPB Count', _fmt(s.get('svpb_count'))),
+        ('Nighttime HR Drop', _fmt(s.get('night_drop'), unit='%')),
+    ]
+
+
+def _hour_labels(model):
+    start = model.recording.get('start')
+    if start is None:
+        return [f'+{int(t // 3600):02d}h' for t in model.hourly['start']]
+    return [(start + timedelta(seconds=float(t))).strftime('%H:%M') for t in model.hourly['start']]
+
+
+def _hourly_frame(model):
+    h = model.hourly
+    return pd.DataFrame({
+        'Hour': _hour_labels(model), 'Beats': h['beats'], 'Mean HR': np.round(h['mean_hr']),
+        'Min HR': np.round(h['min_hr']), 'Max HR': np.round(h['max_hr']), 'VPBs': h[VENTRICULAR],
+        'SVPBs': h[SUPRAVENTRICULAR], 'AF (min)': np.round(h['af_minutes'], 1),
+    })
+
+
+def _header_lines(model):
+    p, r = model.patient, model.recording
+    start = r.get('start')
+    start_format = '%Y-%m-%d %H:%M' if r.get('show_date', True) else '%H:%M'
+    return [
+        f'{model.report_type} Holter Report',
+        f"Patient: {p['name']} ({p['id']}), {p['age']} y, {p['gender']}",
+        f"Recording: {r['name']}, {_fmt(r['duration'] / 3600, 1)} h"
+        + ('' if start is None else f", start {start.strftime(start_format)}"),
+        f"Physician: {model.physician}    Date: {model.created:%Y-%m-%d}",
+    ]
+
+
+def write_text(model, target):
+    lines = _header_lines(model) + ['', 'Findings:', model.findings, '', f'Diagnosis: {model.diagnosis}', '',
+                                    'Statistics:']
+    lines += [f'  {name:<20}{value}' for name, value in _summary_rows(model)]
+    if model.report_type != 'Summary' and len(model.hourly['start']):
+        lines += ['', 'Hourly Summary:', _hourly_frame(model).to_string(index=False)]
+    with open(target, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    return target
+
+
+def _hl7_escape(text):
+    text = str(text)
+    for char, escape in (('\\', '\\E\\'), ('|', '\\F\\'), ('^', '\\S\\'), ('&', '\\T\\'), ('~', '\\R\\')):
+        text = text.replace(char, escape)
+    return text.replace('\n', '\\.br\\')
+
+
+def write_hl7(model, target):
+    """HL7 v2.5 ORU^R01 observation message with one OBX per report figure"""
+    stamp = model.created.strftime('%Y%m%d%H%M%S')
+    p, s = model.patient, model.statistics
+    gender = {'Male': 'M', 'Female': 'F'}.get(p['gender'], 'O')
+    segments = [
+        f'MSH|^~\\&|HOLTER|ANALYSIS|||{stamp}||ORU^R01|{stamp}{p["id"][-6:]}|P|2.5',
+        f'PID|1||{_hl7_escape(p["id"])}||{_hl7_escape(p["name"])}|||{gender}',
+        f'OBR|1|||HOLTER^{_hl7_escape(model.report_type)} Holter Report^L|||{stamp}',
+    ]
+    observations = [
+        ('TOTAL_BEATS', 'Total beats', s['total_beats'], ''),
+        ('MEAN_HR', 'Average heart rate', s['mean_hr'], '/min'),
+        ('MAX_HR', 'Maximum heart rate', s['max_hr'], '/min'),
+        ('MIN_HR', 'Minimum heart rate', s['min_hr'], '/min'),
+        ('AF_BURDEN', 'AF burden', s['af_burden'], '%'),
+        ('VPB_COUNT', 'Ventricular premature beats', s['vpb_count'], ''),
+        ('SVPB_COUNT', 'Supraventricular premature beats', s.get('svpb_count'), ''),
+        ('NIGHT_HR_DROP', 'Nighttime heart rate drop', s.get('night_drop'), '%'),
+    ]
+    index = 0
+    for code, name, value, unit in observations:
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            continue
+        index += 1
+        value = f'{value:.1f}' if isinstance(value, float) else str(value)
+        segments.append(f'OBX|{index}|NM|{code}^{name}^L||{value}|{unit}|||||F')
+    for code, name, text in (('FINDINGS', 'Clinical findings', model.findings),
+                             ('DIAGNOSIS', 'Diagnosis', model.diagnosis),
+                             ('PHYSICIAN', 'Reporting physician', model.physician)):
+        index += 1
+        segments.append(f'OBX|{index}|TX|{code}^{name}^L||{_hl7_escape(text)}||||||F')
+    with open(target, 'w', encoding='ascii', errors='replace', newline='') as f:
+        f.write('\r'.join(segments) + '\r')
+    return target
+
+
+def write_csv(model, target, chunk_beats=CSV_CHUNK_BEATS):
+    """Beat listing (time, label, preceding R-R interval), written a chunk of beats at a time"""
+    with open(target, 'w', encoding='utf-8', newline='') as f:
+        f.write('beat,time_s,label,rr_ms\n')
+        if model.beats is None:
+            return target
+        times, labels = model.beats
+        previous = np.nan
+        for lo in range(0, len(times), chunk_beats):
+            chunk = np.asarray(times[lo:lo + chunk_beats], dtype=np.float64)
+            rr = np.diff(chunk, prepend=previous) * 1000.0
+            previous = chunk[-1]
+            pd.DataFrame({'beat': np.arange(lo + 1, lo + len(chunk) + 1), 'time_s': np.round(chunk, 3),
+                          'label': labels[lo:lo + chunk_beats], 'rr_ms': pd.array(np.round(rr), dtype='Int64')}).to_csv(
+                f, header=False, index=False, float_format='%.3f', na_rep='')
+    return target
+
+
+def render_chart(kind, model, target):
+    """Draw one report chart to a PNG (runs in a worker process)"""
+    fig = Figure(figsize=(10, 3.2), dpi=120)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    if kind == 'hr_trend':
+        starts, hr = model.trend
+        ax.plot(np.asarray(starts) / 3600, hr, color='#00539B', linewidth=0.6)
+        ax.set_ylabel('HR (bpm)')
+        ax.set_xlabel('Time (h)')
+        ax.set_title('Heart rate trend (1-minute means)')
+    elif kind == 'hourly_ectopy':
+        hours = np.asarray(model.hourly['start']) / 3600
+        ax.bar(hours, model.hourly[VENTRICULAR], width=0.8, color='#c0392b', label='VPB', align='edge')
+        ax.bar(hours, model.hourly[SUPRAVENTRICULAR], width=0.8, color='#2980b9', label='SVPB', align='edge',
+               bottom=model.hourly[VENTRICULAR])
+        ax.set_ylabel('Beats / hour')
+        ax.set_xlabel('Time (h)')
+        ax.set_title('Hourly ectopy')
+        ax.legend(loc='upper right', fontsize=8)
+    else:
+        raise ValueError(f'Unknown chart {kind!r}')
+    ax.grid(alpha=0.3)
+    fig.tight_layout()
+    partial = f'{target}.{os.getpid()}.tmp'
+    fig.savefig(partial, format='png')
+    os.replace(partial, target)
+    return target
+
+
+def warm_up():
+    """No-op run in each chart worker ahead of the first export, so it pays its start-up cost early"""
+    return MATPLOTLIB_AVAILABLE
+
+
+def write_pdf(model, target, charts=()):
+    """Summary page, then the charts, then the hourly table (``charts`` are futures or paths of PNGs)"""
+    if not MATPLOTLIB_AVAILABLE:
+        raise RuntimeError('matplotlib is required for PDF reports')
+    with PdfPages(target) as pdf:
+        fig = Figure(figsize=(8.27, 11.69))  # A4 portrait
+        lines = _header_lines(model)
+        fig.text(0.08, 0.95, lines[0], fontsize=16, weight='bold')
+        for i, line in enumerate(lines[1:]):
+            fig.text(0.08, 0.91 - i * 0.022, line, fontsize=10)
+        ax = fig.add_axes([0.08, 0.52, 0.84, 0.3])
+        ax.axis('off')
+        ax.table(cellText=_summary_rows(model), colLabels=['Statistic', 'Value'], loc='upper center',
+                 cellLoc='left').scale(1, 1.5)
+        fig.text(0.08, 0.47, 'Findings', fontsize=12, weight='bold')
+        fig.text(0.08, 0.445, model.findings, fontsize=10, wrap=True, va='top')
+        fig.text(0.08, 0.35, f'Diagnosis: {model.diagnosis}', fontsize=11)
+        pdf.savefig(fig)
+
+        charts = [chart.result() if hasattr(chart, 'result') else chart for chart in charts]
+        if charts:
+            fig = Figure(figsize=(8.27, 11.69))
+            height = 0.9 / len(charts)
+            for i, chart in enumerate(charts):
+                ax = fig.add_axes([0.05, 0.95 - (i + 1) * height, 0.9, height * 0.95])
+                ax.imshow(imread(chart))
+                ax.axis('off')
+            pdf.savefig(fig)
+
+        if model.report_type != 'Summary' and len(model.hourly['start']):
+            frame = _hourly_frame(model).astype(str)
+            for lo in range(0, len(frame), 40):
+                fig = Figure(figsize=(8.27, 11.69))
+                ax = fig.add_axes([0.05, 0.05, 0.9, 0.88])
+                ax.axis('off')
+                ax.set_title('Hourly Summary')
+                page = frame.iloc[lo:lo + 40]
+                ax.table(cellText=page.values, colLabels=list(page.columns), loc='upper center').scale(1, 1.2)
+                pdf.savefig(fig)
+    return target
+
+
+@timed('report')
+def export_report(model, formats, out_dir, include_graphs=True, anonymized=False, threads=None, processes=None,
+                  progress=None):
+    """Write every requested format of one report concurrently.
+
+    ``anonymized`` applies ``anonymize`` once before any writer runs. Writers
+    run on ``threads`` and charts render on ``processes`` (pools are created
+    and shut down here when not given). Returns ``{name: path}`` with one
+    entry per format plus one per chart; ``progress(done, total)`` is called
+    as outputs complete.
+    """
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError(f'Unsupported formats {sorted(unknown)}; expected some of {FORMATS}')
+    if include_graphs and not MATPLOTLIB_AVAILABLE:
+        include_graphs = False
+    os.makedirs(out_dir, exist_ok=True)
+    if anonymized:
+        model = anonymize(model)
+    stem = os.path.join(out_dir, f"Holter_Report_{model.patient['id']}")
+
+    own_threads = threads is None
+    own_processes = processes is None and include_graphs
+    threads = threads or ThreadPoolExecutor(max_workers=len(formats) or 1, thread_name_prefix='report-writer')
+    if own_processes:
+        processes = ProcessPoolExecutor(max_workers=min(len(CHARTS), os.cpu_count() or 1),
+                                        mp_context=multiprocessing.get_context('spawn'))
+    try:
+        futures = {}
+        charts = []
+        if include_graphs:
+            # Charts need the tables only; the beat listing stays in this process
+            chart_model = model._replace(beats=None)
+            for kind in CHARTS:
+                future = processes.submit(render_chart, kind, chart_model, f'{stem}_{kind}.png')
+                futures[future] = kind
+                charts.append(future)
+        writers = {'PDF': write_pdf, 'TXT': write_text, 'HL7': write_hl7, 'CSV': write_csv}
+        for name in formats:
+            args = (model, f'{stem}.{EXTENSIONS[name]}') + ((charts,) if name == 'PDF' else ())
+            futures[threads.submit(writers[name], *args)] = name
+
+        outputs, pending = {}, set(futures)
+        try:
+            if progress is not None:
+                progress(0, len(futures))
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    outputs[futures[future]] = future.result()
+                if progress is not None:
+                    progress(len(outputs), len(futures))
+        except BaseException:
+            # Outputs not started yet are dropped when the export is abandoned
+            for future in pending:
+                future.cancel()
+            raise
+        return {name: outputs[name] for name in list(formats) + [kind for kind in CHARTS if kind in outputs]}
+    finally:
+        if own_threads:
+            threads.shutdown(wait=False)
+        if own_processes:
+            processes.shutdown(wait=False)
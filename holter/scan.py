@@ -0,0 +1,162 @@
+"""Resumable Page-mode scan: stop at the next event matching the stop rules.
+
+``scan_events`` is a generator. It pulls chunks lazily, feeds the streaming
+R-peak detector and an incremental event tracker, and yields each event as
+soon as it is confirmed, so a reviewer sees the first AF episode of a 7-day
+study after scanning up to it rather than after a retrospective pass over
+the whole recording. Every ``ScanEvent`` carries a ``ScanCheckpoint``: the
+detector and tracker state and the events still pending from the same
+chunk. ``scan_events(recording, rules, checkpoint)`` continues exactly where
+that event left off without reading any scanned chunk again, so the scan can
+be suspended for as long as the review takes.
+
+AF episodes follow the rules of ``detect_af_episodes`` (window irregularity,
+merge gap, minimum duration), evaluated as the beats arrive. An episode is
+reported as soon as it reaches the minimum duration, with ``stop`` set to
+where it had reached at that point; it may go on after that.
+"""
+import copy
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from holter.af import SENSITIVITY_SCALE, runs
+from holter.detection import RPeakDetector
+from holter.ingest import iter_chunks
+from holter.metrics import observe
+
+SCAN_CHUNK_SECONDS = 60.0
+AF = 'AF'
+PAUSE = 'Pause'
+
+StopRules = namedtuple('StopRules', ['af', 'pause', 'min_beats', 'rr_var', 'min_duration', 'sensitivity',
+                                     'merge_gap'],
+                       defaults=[True, 2.5, 30, 12, 30, 'Medium', 10.0])
+StopRules.__doc__ = """Events that stop the scan: AF episodes (with the AF rule parameters) and
+R-R pauses of at least ``pause`` seconds (None disables either rule)"""
+
+ScanCheckpoint = namedtuple('ScanCheckpoint', ['position', 'detector', 'tracker', 'pending'])
+ScanCheckpoint.__doc__ = """Everything needed to resume a scan: the next sample to read, detector
+and tracker state, and events already found but not yet yielded"""
+
+ScanEvent = namedtuple('ScanEvent', ['kind', 'start', 'stop', 'checkpoint'])
+ScanEvent.__doc__ = """An event in seconds from the recording start, with the checkpoint to resume after it"""
+
+
+class EventTracker:
+    """Turns confirmed R peaks into stop-rule events, keeping only the beats its windows still need"""
+
+    def __init__(self, fs, rules=StopRules()):
+        self.fs = float(fs)
+        self.rules = rules
+        self.window = int(rules.min_beats)
+        self.centre = self.window // 2
+        self.threshold = rules.rr_var * SENSITIVITY_SCALE[rules.sensitivity]
+        self.finished = False
+        self._last_peak = None
+        self._times = np.zeros(0)        # beats from global index self._first on
+        self._rr = np.zeros(0)
+        self._first = 0
+        self._n_beats = 0
+        self._decided = 0                # beats with a final AF verdict
+        self._episode = None             # [start, end] of the AF episode being built
+        self._reported = False
+
+    def add(self, peaks, final=False):
+        """Take newly confirmed R-peak sample indices; return the events they complete as tuples"""
+        times = np.asarray(peaks, dtype=np.float64) / self.fs
+        if self._last_peak is not None:
+            times = np.concatenate([[self._last_peak], times])
+        if len(times):
+            self._last_peak = times[-1]
+        rr = np.diff(times)
+        times = times[1:]
+        events = []
+        if self.rules.pause is not None:
+            pauses = np.flatnonzero(rr >= self.rules.pause)
+            events += [(PAUSE, float(times[i] - rr[i]), float(times[i])) for i in pauses]
+        self._times = np.concatenate([self._times, times])
+        self._rr = np.concatenate([self._rr, rr])
+        self._n_beats += len(rr)
+        if self.rules.af:
+            events += self._af_events(final)
+        self.finished = final
+        return sorted(events, key=lambda event: event[1])
+
+    def _af_events(self, final):
+        # Beat j takes the verdict of the window starting at j - centre, as in detect_af_episodes
+        decidable = self._n_beats if final else self._n_beats - self.window + self.centre + 1
+        if decidable <= self._decided:
+            return []
+        verdict = np.zeros(decidable - self._decided, dtype=bool)
+        first_window = max(self._decided - self.centre, 0)
+        last_window = min(decidable - self.centre, self._n_beats - self.window + 1)
+        if last_window > first_window:
+            rr = self._rr[first_window - self._first:last_window - 1 + self.window - self._first]
+            rr_sum = np.concatenate([[0.0], np.cumsum(rr)])
+            delta_sum = np.concatenate([[0.0], np.cumsum(np.abs(np.diff(rr)))])
+            mean_rr = (rr_sum[self.window:] - rr_sum[:-self.window]) / self.window
+            mean_delta = (delta_sum[self.window - 1:] - delta_sum[:1 - self.window]) / (self.window - 1)
+            scores = 100.0 * mean_delta / mean_rr
+            offset = first_window + self.centre - self._decided
+            verdict[offset:offset + len(scores)] = scores > self.threshold
+
+        events = []
+        starts, ends = runs(verdict)
+        base = self._decided - self._first
+        for start, end in zip(starts + base, ends + base):
+            begin, finish = self._times[start] - self._rr[start], self._times[end - 1]
+            if self._episode is not None and begin - self._episode[1] <= self.rules.merge_gap:
+                self._episode[1] = finish
+            else:
+                self._episode, self._reported = [begin, finish], False
+            if not self._reported and self._episode[1] - self._episode[0] >= self.rules.min_duration:
+                events.append((AF, float(self._episode[0]), float(self._episode[1])))
+                self._reported = True
+
+        self._decided = decidable
+        # Keep the beats the next windows start from; everything older is done with
+        keep = max(min(self._decided - self.centre, self._n_beats - self.window + 1), 0)
+        if keep > self._first:
+            self._times = self._times[keep - self._first:]
+            self._rr = self._rr[keep - self._first:]
+            self._first = keep
+        return events
+
+
+def scan_events(recording, rules=StopRules(), checkpoint=None, chunk_seconds=SCAN_CHUNK_SECONDS, leads=None):
+    """Yield ``ScanEvent`` for every stop-rule event, scanning only as far as the next one.
+
+    Pass the ``checkpoint`` of an event to continue after it; the checkpoint
+    is copied, so the same one can be resumed from more than once.
+    """
+    if checkpoint is None:
+        n_leads = len(recording.lead_index(leads))
+        checkpoint = ScanCheckpoint(0, RPeakDetector(recording.fs, n_leads=n_leads),
+                                    EventTracker(recording.fs, rules), ())
+    position = checkpoint.position
+    detector, tracker = copy.deepcopy(checkpoint.detector), copy.deepcopy(checkpoint.tracker)
+    pending = list(checkpoint.pending)
+    chunks = iter_chunks(recording, chunk_seconds, 0, leads=leads, start=position)
+    started = time.perf_counter()
+    while True:
+        while pending:
+            kind, start, stop = pending.pop(0)
+            resume = ScanCheckpoint(position, copy.deepcopy(detector), copy.deepcopy(tracker), tuple(pending))
+            observe('scan_event_seconds', time.perf_counter() - started)
+            yield ScanEvent(kind, start, stop, resume)
+            started = time.perf_counter()
+        if tracker.finished:
+            return
+        chunk = next(chunks, None)
+        if chunk is None:
+            pending = tracker.add(detector.flush(), final=True)
+        else:
+            pending = tracker.add(detector.process(chunk.core))
+            position = chunk.stop
+
+
+def scan_progress(recording, checkpoint):
+    """Fraction of the recording scanned up to ``checkpoint``"""
+    return checkpoint.position / recording.n_samples if recording.n_samples else 1.0
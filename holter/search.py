@@ -0,0 +1,233 @@
+"""In-memory full-text search with BM25 ranking and forgiving term lookup.
+
+Documents are tokenized into lowercase words and kept in an inverted index
+(term -> {document: weighted frequency}); title words count
+``title_weight`` times. Every query word is looked up as an exact term,
+as a prefix of longer terms (so results appear while a word is still being
+typed) and, from four letters on, with one typo: a deletion, insertion,
+substitution or transposition. Typo candidates come from a deletion
+neighbourhood index (every term under each of its one-letter deletions), so
+lookup never scans the vocabulary. Documents are ranked by BM25, scaled by
+the share of query words they match, and hits carry a snippet around the
+densest cluster of matched words.
+
+Documents belong to a source. ``update`` replaces all documents of one
+source but only re-indexes those whose title or text changed, so refreshing
+a source after an edit is cheap.
+"""
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from math import log
+
+TOKEN = re.compile(r'[^\W_]+')
+STOPWORDS = frozenset('a an and are as at be by for from in is it of on or the to with'.split())
+K1 = 1.2
+B = 0.75
+PREFIX_WEIGHT = 0.8         # scaled further by how much of the term the prefix covers
+FUZZY_WEIGHT = 0.6
+MIN_PREFIX = 2
+MIN_FUZZY = 4
+MAX_EXPANSIONS = 30         # completions considered per query word
+SNIPPET_WORDS = 24
+
+Document = namedtuple('Document', ['id', 'source', 'title', 'text'])
+Document.__doc__ = """One searchable item; ``id`` must be unique across sources"""
+
+SearchHit = namedtuple('SearchHit', ['id', 'source', 'title', 'score', 'snippet', 'terms'])
+SearchHit.__doc__ = """A ranked result: the index terms it matched and a snippet of its text
+with those words wrapped in the highlight markers"""
+
+
+def tokenize(text):
+    """Lowercase words of ``text`` without stopwords"""
+    return [token for token in TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def deletions(term):
+    """``term`` and every string one deletion away from it"""
+    return {term} | {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def edit_distance(a, b):
+    """Optimal string alignment distance: insertions, deletions, substitutions and transpositions"""
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def snippet(text, terms, words=SNIPPET_WORDS, highlight=('**', '**')):
+    """The ``words``-word stretch of ``text`` holding the most distinct ``terms``, highlighted"""
+    spans = [(m.start(), m.end(), m.group().lower() in terms) for m in TOKEN.finditer(text)]
+    if not spans:
+        return ''
+    best, best_count = 0, -1
+    for first in range(max(len(spans) - words, 0) + 1):
+        window = {text[s:e].lower() for s, e, hit in spans[first:first + words] if hit}
+        if len(window) > best_count:
+            best, best_count = first, len(window)
+    window = spans[best:best + words]
+    start, stop = window[0][0], window[-1][1]
+    parts, position = [], start
+    for s, e, hit in window:
+        if hit:
+            parts += [text[position:s], highlight[0], text[s:e], highlight[1]]
+            position = e
+    parts.append(text[position:stop])
+    prefix = '… ' if best > 0 else ''
+    suffix = ' …' if best + words < len(spans) else ''
+    return prefix + ' '.join(''.join(parts).split()) + suffix
+
+
+class SearchIndex:
+    """Inverted index over documents from several sources, safe to share between threads"""
+
+    def __init__(self, title_weight=3):
+        self.title_weight = title_weight
+        self._documents = {}
+        self._fingerprints = {}
+        self._lengths = {}
+        self._total_length = 0
+        self._postings = defaultdict(dict)      # term -> {document id: weighted frequency}
+        self._neighbours = defaultdict(set)     # one-deletion variant -> terms
+        self._vocabulary = []                   # sorted terms for prefix lookup, rebuilt lazily
+        self._stale = False
+        self._versions = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._documents)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._documents
+
+    def add(self, document):
+        """Index ``document``, replacing any previous document with the same id"""
+        with self._lock:
+            self.remove(document.id)
+            frequencies = defaultdict(int)
+            for token in tokenize(document.title):
+                frequencies[token] += self.title_weight
+            for token in tokenize(document.text):
+                frequencies[token] += 1
+            for term, frequency in frequencies.items():
+                if term not in self._postings:
+                    for variant in deletions(term):
+                        self._neighbours[variant].add(term)
+                    self._stale = True
+                self._postings[term][document.id] = frequency
+            self._documents[document.id] = document
+            self._fingerprints[document.id] = hash((document.title, document.text))
+            self._lengths[document.id] = sum(frequencies.values())
+            self._total_length += self._lengths[document.id]
+
+    def remove(self, doc_id):
+        """Drop a document; unknown ids are ignored"""
+        with self._lock:
+            document = self._documents.pop(doc_id, None)
+            if document is None:
+                return
+            del self._fingerprints[doc_id]
+            self._total_length -= self._lengths.pop(doc_id)
+            for term in set(tokenize(document.title)) | set(tokenize(document.text)):
+                postings = self._postings[term]
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+                    for variant in deletions(term):
+                        self._neighbours[variant].discard(term)
+                        if not self._neighbours[variant]:
+                            del self._neighbours[variant]
+                    self._stale = True
+
+    def update(self, source, documents, version=None):
+        """Make ``documents`` the whole content of ``source``, re-indexing changed documents only.
+
+        ``version`` (a file timestamp, say) is remembered for ``version(source)``.
+        Returns the number of documents added or changed and the number removed.
+        """
+        with self._lock:
+            documents = {document.id: document._replace(source=source) for document in documents}
+            removed = [doc_id for doc_id, document in self._documents.items()
+                       if document.source == source and doc_id not in documents]
+            for doc_id in removed:
+                self.remove(doc_id)
+            changed = 0
+            for doc_id, document in documents.items():
+                if self._fingerprints.get(doc_id) != hash((document.title, document.text)) \
+                        or self._documents[doc_id].source != source:
+                    self.add(document)
+                    changed += 1
+            self._versions[source] = version
+            return changed, len(removed)
+
+    def version(self, source):
+        """The ``version`` given with the last ``update`` of ``source``"""
+        return self._versions.get(source)
+
+    def expand(self, token):
+        """``{index term: weight}`` for a query word: exact, completions and one-typo matches"""
+        with self._lock:
+            matches = {}
+            if token in self._postings:
+                matches[token] = 1.0
+            if len(token) >= MIN_PREFIX:
+                if self._stale:
+                    self._vocabulary = sorted(self._postings)
+                    self._stale = False
+                position = bisect_left(self._vocabulary, token)
+                for term in self._vocabulary[position:position + MAX_EXPANSIONS + 1]:
+                    if not term.startswith(token):
+                        break
+                    if term != token:
+                        matches[term] = PREFIX_WEIGHT * len(token) / len(term)
+            if len(token) >= MIN_FUZZY:
+                candidates = set()
+                for variant in deletions(token):
+                    candidates |= self._neighbours.get(variant, set())
+                for term in candidates:
+                    if term not in matches and edit_distance(token, term) <= 1:
+                        matches[term] = FUZZY_WEIGHT
+            return matches
+
+    def search(self, query, limit=10, highlight=('**', '**')):
+        """Best ``limit`` documents for ``query`` as ``SearchHit`` tuples, best first"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        with self._lock:
+            n = len(self._documents)
+            average = self._total_length / n if n else 0.0
+            scores = defaultdict(float)
+            matched = defaultdict(set)
+            coverage = defaultdict(int)
+            for token in tokens:
+                best = {}
+                for term, weight in self.expand(token).items():
+                    postings = self._postings[term]
+                    idf = log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for doc_id, frequency in postings.items():
+                        norm = K1 * (1 - B + B * self._lengths[doc_id] / average)
+                        score = weight * idf * frequency * (K1 + 1) / (frequency + norm)
+                        best[doc_id] = max(best.get(doc_id, 0.0), score)
+                        matched[doc_id].add(term)
+                for doc_id, score in best.items():
+                    scores[doc_id] += score
+                    coverage[doc_id] += 1
+            ranked = sorted(scores, key=lambda doc_id: -scores[doc_id] * coverage[doc_id] / len(tokens))[:limit]
+            hits = []
+            for doc_id in ranked:
+                document = self._documents[doc_id]
+                hits.append(SearchHit(doc_id, document.source, document.title,
+                                      scores[doc_id] * coverage[doc_id] / len(tokens),
+                                      snippet(document.text, matched[doc_id], highlight=highlight),
+                                      frozenset(matched[doc_id])))
+            return hits
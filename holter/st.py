@@ -0,0 +1,150 @@
+"""Beat-aligned ST segment measurement.
+
+Windows around every R peak are gathered with one fancy-indexing pass over
+a ``sliding_window_view`` of each chunk, giving an ``(n_leads, n_beats,
+window)`` array without copying the signal per beat. A rolling median-beat
+template over each beat and the ``template_beats - 1`` beats before it
+locates that beat's J point; chunks carry those earlier beats over, so the
+result does not depend on the chunk size. ST deviations are then measured
+for all beats at once and binned into a per-minute trend.
+"""
+from collections import namedtuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from holter.af import runs
+from holter.metrics import timed
+
+# Offsets relative to the R peak, in seconds
+PRE_R = 0.20
+POST_R = 0.40
+BASELINE_WINDOW = (-0.10, -0.06)  # isoelectric PR segment
+J_SEARCH = (0.02, 0.12)
+J_DEFAULT = 0.06
+ST_OFFSET = 0.06  # ST level measured at J + 60 ms
+TEMPLATE_BATCH = 512  # rolling templates computed at a time
+
+STEpisode = namedtuple('STEpisode', ['lead', 'kind', 'start', 'end', 'peak'])
+STEpisode.__doc__ = """ST episode on one lead: kind is depression or elevation; peak deviation in mV"""
+
+STResult = namedtuple('STResult', ['beat_deviation', 'j_offset', 'minutes', 'trend', 'episodes'])
+STResult.__doc__ = """Per-beat ST deviation (mV) and J offset (s), per-minute trend and episodes"""
+
+
+def beat_windows(data, peaks, before, after):
+    """Gather ``(n_leads, n_beats, before + after)`` windows centred on R peaks"""
+    view = sliding_window_view(data, before + after, axis=-1)
+    return view[:, np.asarray(peaks) - before, :]
+
+
+def j_search_bounds(fs, before):
+    """First and last window sample the J point search looks at: QRS onset to the end of ``J_SEARCH``"""
+    return before - int(0.05 * fs), before + int(J_SEARCH[1] * fs)
+
+
+def find_j_offset(templates, fs, before):
+    """J point of each template: first flat sample after the QRS, in seconds from R.
+
+    ``templates`` hold only the samples within ``j_search_bounds``.
+    """
+    qrs, _ = j_search_bounds(fs, before)
+    lo = before + int(J_SEARCH[0] * fs)
+    # Slope summed over leads so the J point is shared by all leads
+    slope = np.abs(np.diff(templates, axis=-1)).sum(axis=0)
+    flat = slope[:, lo - qrs:] < 0.1 * slope.max(axis=-1, keepdims=True)
+    offset = np.where(flat.any(axis=-1), np.argmax(flat, axis=-1) + lo - before, int(J_DEFAULT * fs))
+    return offset / fs
+
+
+class STAnalyzer:
+    """Measure ST deviations for all beats of a recording, one chunk at a time"""
+
+    def __init__(self, fs, template_beats=16, threshold=0.1, min_episode=60.0):
+        self.fs = float(fs)
+        self.template_beats = template_beats
+        self.threshold = threshold
+        self.min_episode = min_episode
+        self.before = int(PRE_R * self.fs)
+        self.after = int(POST_R * self.fs)
+
+    def measure(self, windows, history=0):
+        """Per-beat ST deviation and J offset; the first ``history`` beats only feed the templates"""
+        n_beats = windows.shape[1]
+        base = slice(self.before + int(BASELINE_WINDOW[0] * self.fs),
+                     self.before + int(BASELINE_WINDOW[1] * self.fs))
+        beats = np.arange(history, n_beats)
+        baseline = windows[:, history:, base].mean(axis=-1)
+
+        # Rolling median beat over the QRS-J segment only; template k covers
+        # beats k .. k + size - 1. Beats with fewer predecessors (at the
+        # start of the recording) take the first template, of real beats only.
+        first, last = j_search_bounds(self.fs, self.before)
+        size = min(self.template_beats, n_beats)
+        segment = windows[:, :, first:last + 1]
+        n_templates = n_beats - size + 1
+        templates = np.empty((segment.shape[0], n_templates, segment.shape[2]))
+        middle = size // 2
+        # Sorting the few beats of each window is much faster than np.median
+        # here; batches keep the sorted copy of the windows small
+        for lo in range(0, n_templates, TEMPLATE_BATCH):
+            hi = min(lo + TEMPLATE_BATCH, n_templates)
+            ordered = np.sort(sliding_window_view(segment[:, lo:hi + size - 1], size, axis=1), axis=-1)
+            templates[:, lo:hi] = (ordered[..., middle] if size % 2
+                                   else (ordered[..., middle - 1] + ordered[..., middle]) / 2)
+        j_offset = find_j_offset(templates, self.fs, self.before)[np.maximum(beats - size + 1, 0)]
+
+        # ST level of every beat at its own J + 60 ms
+        position = self.before + np.round((j_offset + ST_OFFSET) * self.fs).astype(int)
+        st_level = windows[:, beats, position]
+        return st_level - baseline, j_offset
+
+    @timed('st')
+    def analyze(self, recording, peaks, leads=None, chunk_beats=4096):
+        """Measure every beat in ``peaks`` (sample indices) and build the ST trend"""
+        peaks = np.asarray(peaks, dtype=np.int64)
+        peaks = peaks[(peaks >= self.before) & (peaks + self.after <= recording.n_samples)]
+        # At least one full template per chunk, so chunking never changes the templates
+        chunk_beats = max(chunk_beats, self.template_beats)
+        deviations, offsets = [], []
+        for first in range(0, len(peaks), chunk_beats):
+            # Carry the beats the rolling templates of this chunk look back on
+            history = min(self.template_beats - 1, first)
+            batch = peaks[first - history:first + chunk_beats]
+            start, stop = batch[0] - self.before, batch[-1] + self.after
+            data = recording.read(start, stop, leads)
+            deviation, j_offset = self.measure(beat_windows(data, batch - start, self.before, self.after), history)
+            deviations.append(deviation)
+            offsets.append(j_offset)
+        n_leads = len(recording.lead_index(leads))
+        deviation = np.concatenate(deviations, axis=1) if deviations else np.zeros((n_leads, 0))
+        j_offset = np.concatenate(offsets) if offsets else np.zeros(0)
+
+        minutes, trend = self.minute_trend(peaks, deviation)
+        names = [recording.lead_names[i] for i in recording.lead_index(leads)]
+        return STResult(deviation, j_offset, minutes, trend, self.episodes(minutes, trend, names))
+
+    def minute_trend(self, peaks, deviation):
+        """Mean ST deviation per minute and lead, NaN for minutes without beats"""
+        minute = (peaks // int(60 * self.fs)).astype(np.intp)
+        n_minutes = int(minute[-1]) + 1 if len(minute) else 0
+        counts = np.bincount(minute, minlength=n_minutes)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            trend = np.stack([np.bincount(minute, weights=lead, minlength=n_minutes) / counts
+                              for lead in deviation]) if len(deviation) else np.zeros((0, n_minutes))
+        return np.arange(n_minutes) * 60.0, trend
+
+    def episodes(self, minutes, trend, lead_names):
+        """Apply the 1 mm / 1 minute rule per lead to the minute trend"""
+        found = []
+        for kind, sign in (('depression', -1), ('elevation', 1)):
+            beyond = np.nan_to_num(sign * trend) >= self.threshold
+            for lead, mask in enumerate(beyond):
+                # Runs of whole minutes are already separated by at least a minute
+                for first, last in zip(*runs(mask)):
+                    start, end = minutes[first], minutes[last - 1] + 60.0
+                    if end - start < self.min_episode:
+                        continue
+                    peak = sign * np.nanmax(sign * trend[lead, first:last])
+                    found.append(STEpisode(lead_names[lead], kind, float(start), float(end), float(peak)))
+        return sorted(found, key=lambda e: e.start)
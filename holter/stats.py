@@ -0,0 +1,155 @@
+"""Single-pass Holter summary statistics.
+
+Beats stream in chunk by chunk and are binned by minute with
+``np.bincount``: beat counts, label counts and R-R sums per minute. Every
+report figure - average/minimum/maximum heart rate, ectopic counts, AF
+burden, the hourly table and the day/night heart rate drop - is then
+derived from the minute bins (hours via ``np.add.reduceat``), never from
+per-beat rows.
+"""
+from datetime import timedelta
+
+import numpy as np
+
+from holter.classify import LABEL_NAMES, SUPRAVENTRICULAR, VENTRICULAR
+
+MINUTE = 60.0
+MAX_RR = 3.0                # longer intervals are pauses or gaps, excluded from rates
+MIN_INTERVALS = 20          # minutes with fewer usable intervals get no rate
+NIGHT_HOURS = (0, 6)        # clock hours [start, end)
+DAY_HOURS = (8, 20)
+
+
+class HolterStatistics:
+    """Accumulates per-minute beat statistics for one recording"""
+
+    def __init__(self, duration=None, start_time=None):
+        self.duration = duration
+        self.start_time = start_time
+        self._codes = list(LABEL_NAMES)
+        self._beats = np.zeros(0)
+        self._rr_sum = np.zeros(0)
+        self._rr_count = np.zeros(0)
+        self._labels = np.zeros((len(self._codes), 0))
+        self._af = np.zeros(0)
+        self._last = None
+
+    @property
+    def n_minutes(self):
+        if self.duration:
+            return max(int(np.ceil(self.duration / MINUTE)), len(self._beats))
+        return len(self._beats)
+
+    def add_beats(self, times, labels=None):
+        """Add the next chunk of beat times (seconds, ascending) and their label codes"""
+        times = np.asarray(times, dtype=np.float64)
+        if not len(times):
+            return
+        previous = times[0] if self._last is None else self._last
+        rr = np.diff(times, prepend=previous)
+        usable = (rr > 0) & (rr <= MAX_RR)
+        self._last = times[-1]
+
+        minute = (times // MINUTE).astype(np.intp)
+        self._grow(int(minute[-1]) + 1)
+        n = len(self._beats)
+        self._beats += np.bincount(minute, minlength=n)
+        self._rr_sum += np.bincount(minute, weights=rr * usable, minlength=n)
+        self._rr_count += np.bincount(minute, weights=usable, minlength=n)
+        if labels is not None:
+            labels = np.asarray(labels)
+            for row, code in enumerate(self._codes):
+                self._labels[row] += np.bincount(minute, weights=labels == code, minlength=n)
+
+    def set_af_episodes(self, intervals):
+        """Per-minute AF seconds from an ``(n, 2)`` array of non-overlapping episodes"""
+        intervals = np.asarray(intervals, dtype=np.float64).reshape(-1, 2)
+        self._grow(self.n_minutes)
+        edges = np.arange(len(self._beats) + 1) * MINUTE
+        if not len(intervals):
+            self._af = np.zeros(len(self._beats))
+            return
+        # AF time elapsed by each minute edge: every episode started before the
+        # edge counts in full, except the last one, which is clipped at the edge
+        starts, lengths = intervals[:, 0], intervals[:, 1] - intervals[:, 0]
+        completed = np.concatenate([[0.0], np.cumsum(lengths)])
+        started = np.searchsorted(starts, edges, side='right')
+        last = np.maximum(started - 1, 0)
+        covered = np.where(started > 0, completed[last] + np.clip(edges - starts[last], 0, lengths[last]), 0.0)
+        self._af = np.diff(covered)
+
+    def minutes(self):
+        """Per-minute table: start (s), beats, heart rate (bpm, NaN if too few beats), label counts, AF seconds"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            hr = np.where(self._rr_count >= MIN_INTERVALS, 60.0 * self._rr_count / self._rr_sum, np.nan)
+        table = {'start': np.arange(len(self._beats)) * MINUTE, 'beats': self._beats.astype(int), 'hr': hr,
+                 'af_seconds': self._af}
+        table.update({code: counts.astype(int) for code, counts in zip(self._codes, self._labels)})
+        return table
+
+    def hours(self):
+        """Hourly table: beats, mean/min/max HR, VPBs, SVPBs and AF minutes per hour"""
+        minutes = self.minutes()
+        n = len(self._beats)
+        if not n:
+            return {key: np.zeros(0) for key in ('start', 'beats', 'mean_hr', 'min_hr', 'max_hr',
+                                                 VENTRICULAR, SUPRAVENTRICULAR, 'af_minutes')}
+        bounds = np.arange(0, n, 60)
+        hr = minutes['hr']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_hr = 60.0 * np.add.reduceat(self._rr_count, bounds) / np.add.reduceat(self._rr_sum, bounds)
+        has_hr = np.add.reduceat(np.isfinite(hr), bounds) > 0
+        return {
+            'start': bounds * MINUTE,
+            'beats': np.add.reduceat(self._beats, bounds).astype(int),
+            'mean_hr': mean_hr,
+            'min_hr': np.where(has_hr, np.fmin.reduceat(hr, bounds), np.nan),
+            'max_hr': np.where(has_hr, np.fmax.reduceat(hr, bounds), np.nan),
+            VENTRICULAR: np.add.reduceat(minutes[VENTRICULAR], bounds),
+            SUPRAVENTRICULAR: np.add.reduceat(minutes[SUPRAVENTRICULAR], bounds),
+            'af_minutes': np.add.reduceat(self._af, bounds) / MINUTE if len(self._af) else np.zeros(len(bounds)),
+        }
+
+    def summary(self):
+        """Report figures for the whole recording"""
+        minutes = self.minutes()
+        hr = minutes['hr']
+        valid = np.isfinite(hr)
+        duration = self.duration or len(self._beats) * MINUTE
+        rr_count, rr_sum = self._rr_count.sum(), self._rr_sum.sum()
+        day, night = self._clock_rate(DAY_HOURS), self._clock_rate(NIGHT_HOURS)
+        return {
+            'total_beats': int(self._beats.sum()),
+            'mean_hr': float(60.0 * rr_count / rr_sum) if rr_sum else np.nan,
+            'max_hr': float(hr[valid].max()) if valid.any() else np.nan,
+            'max_hr_time': float(minutes['start'][valid][np.argmax(hr[valid])]) if valid.any() else np.nan,
+            'min_hr': float(hr[valid].min()) if valid.any() else np.nan,
+            'min_hr_time': float(minutes['start'][valid][np.argmin(hr[valid])]) if valid.any() else np.nan,
+            'vpb_count': int(minutes[VENTRICULAR].sum()),
+            'svpb_count': int(minutes[SUPRAVENTRICULAR].sum()),
+            'af_burden': float(100.0 * self._af.sum() / duration) if duration else 0.0,
+            'day_hr': day,
+            'night_hr': night,
+            'night_drop': 100.0 * (day - night) / day if np.isfinite(day) and np.isfinite(night) else np.nan,
+        }
+
+    def _clock_rate(self, hours):
+        """Mean heart rate over the minutes whose clock hour falls in ``[start, end)``"""
+        if self.start_time is None or not len(self._beats):
+            return np.nan
+        midnight = self.start_time.replace(hour=0, minute=0, second=0, microsecond=0)
+        offset = (self.start_time - midnight) / timedelta(seconds=1)
+        clock_hour = ((offset + np.arange(len(self._beats)) * MINUTE) // 3600) % 24
+        selected = (clock_hour >= hours[0]) & (clock_hour < hours[1])
+        rr_sum = self._rr_sum[selected].sum()
+        return float(60.0 * self._rr_count[selected].sum() / rr_sum) if rr_sum else np.nan
+
+    def _grow(self, n):
+        grow = n - len(self._beats)
+        if grow <= 0:
+            return
+        self._beats = np.concatenate([self._beats, np.zeros(grow)])
+        self._rr_sum = np.concatenate([self._rr_sum, np.zeros(grow)])
+        self._rr_count = np.concatenate([self._rr_count, np.zeros(grow)])
+        self._labels = np.concatenate([self._labels, np.zeros((len(self._codes), grow))], axis=1)
+        self._af = np.concatenate([self._af, np.zeros(grow)])
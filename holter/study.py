@@ -0,0 +1,187 @@
+"""Single-file columnar format for decoded and analysed studies.
+
+A study file holds everything needed to reopen an analysed recording
+without decoding or re-analysing it::
+
+    magic | directory offset, length | array | array | ... | JSON directory
+
+Samples are stored once as int16 ``(n_samples, n_leads)`` with per-lead
+gain and offset and an implicit time base (``fs`` and ``start_time``).
+Beat annotations, decimation levels and analysis results are further named
+arrays. Every array starts on a 64-byte boundary inside one ``np.memmap`` of
+the file, so opening a study reads only the directory, however long the
+recording. Arrays can be appended later; the directory is rewritten at the
+end of the file.
+"""
+import json
+import struct
+from datetime import datetime
+
+import numpy as np
+
+from holter.cache import content_hash
+from holter.decimate import MinMaxPyramid
+from holter.ingest import DEFAULT_CHUNK_SECONDS, Recording, iter_chunks
+from holter.metrics import timed
+
+STUDY_EXTENSION = '.hstudy'
+MAGIC = b'HSTUDY\x00\x01'
+
+_PRELUDE = struct.Struct('<8sQQ')
+_ALIGN = 64
+_INT16_RANGE = 65000.0
+
+
+class StudyRecording(Recording):
+    """Recording, annotations and results read zero-copy from a study file"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            offset, length = _read_prelude(f, path)
+            f.seek(offset)
+            directory = json.loads(f.read(length))
+
+        self.paths = (path,)
+        self.fs = float(directory['fs'])
+        self.n_samples = int(directory['n_samples'])
+        self.lead_names = tuple(directory['lead_names'])
+        start = directory.get('start_time')
+        self.start_time = datetime.fromisoformat(start) if start else None
+        self.source_hash = directory.get('source_hash')
+        self.meta = directory.get('meta', {})
+        self._gain = np.asarray(directory['gain'], dtype=np.float32)
+        self._offset = np.asarray(directory['offset'], dtype=np.float32)
+        self._buckets = directory.get('pyramid', [])
+        self._entries = directory['arrays']
+        self._map = np.memmap(path, dtype=np.uint8, mode='r', shape=(offset,))
+        self._samples = self.array('samples')
+
+    @property
+    def names(self):
+        return tuple(self._entries)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def array(self, name):
+        """Memory-mapped view of one stored array"""
+        entry = self._entries[name]
+        dtype = np.dtype(entry['dtype'])
+        nbytes = int(np.prod(entry['shape'], dtype=np.int64)) * dtype.itemsize
+        raw = self._map[entry['offset']:entry['offset'] + nbytes]
+        return raw.view(dtype).reshape(entry['shape'])
+
+    def arrays(self, prefix):
+        """All arrays stored under ``prefix``, keyed by the rest of their name"""
+        return {name[len(prefix):]: self.array(name) for name in self._entries if name.startswith(prefix)}
+
+    def pyramid(self):
+        """The stored min/max decimation pyramid, or None if the study has none"""
+        if not self._buckets:
+            return None
+        levels = [(bucket, self.array(f'pyramid/{i}/min'), self.array(f'pyramid/{i}/max'))
+                  for i, bucket in enumerate(self._buckets)]
+        return MinMaxPyramid(self, levels)
+
+    def adc_scale(self):
+        return self._gain, self._offset
+
+    @timed('ingest')
+    def _read(self, start, stop, index):
+        raw = self._samples[start:stop].T[index]
+        return raw.astype(np.float32) * self._gain[index, np.newaxis] + self._offset[index, np.newaxis]
+
+    def close(self):
+        self._map = None
+        self._samples = None
+
+
+def write_study(path, recording, arrays=None, pyramid=None, meta=None,
+                chunk_seconds=DEFAULT_CHUNK_SECONDS * 10):
+    """Write a recording plus named annotation/result arrays to one study file.
+
+    Integer-coded recordings keep their native ADC codes, so the samples
+    round-trip exactly; float recordings are quantized to int16 over the
+    range found while building the decimation pyramid.
+    """
+    scale = recording.adc_scale()
+    if scale is None:
+        pyramid = pyramid or MinMaxPyramid.build(recording)
+        _, mins, maxs = pyramid.levels[-1]
+        low = mins.min(axis=1) if mins.size else np.zeros(recording.n_leads)
+        high = maxs.max(axis=1) if maxs.size else np.zeros(recording.n_leads)
+        scale = (np.maximum(high - low, 1e-3) / _INT16_RANGE, (high + low) / 2)
+    gain, offset = (np.asarray(s, dtype=np.float64) for s in scale)
+
+    directory = {
+        'fs': recording.fs,
+        'n_samples': recording.n_samples,
+        'lead_names': list(recording.lead_names),
+        'start_time': recording.start_time.isoformat() if recording.start_time else None,
+        'source_hash': content_hash(recording),
+        'gain': gain.tolist(),
+        'offset': offset.tolist(),
+        'pyramid': [],
+        'arrays': {},
+        'meta': meta or {},
+    }
+    with open(path, 'wb') as f:
+        f.write(_PRELUDE.pack(MAGIC, 0, 0))
+        _begin_array(f, directory, 'samples', np.dtype('<i2'), (recording.n_samples, recording.n_leads))
+        for chunk in iter_chunks(recording, chunk_seconds, 0):
+            raw = np.rint((chunk.core - offset[:, np.newaxis]) / gain[:, np.newaxis])
+            f.write(np.clip(raw, -32768, 32767).astype('<i2').T.tobytes())
+
+        for i, (bucket, mins, maxs) in enumerate(pyramid.levels if pyramid else ()):
+            directory['pyramid'].append(int(bucket))
+            _write_array(f, directory, f'pyramid/{i}/min', mins)
+            _write_array(f, directory, f'pyramid/{i}/max', maxs)
+        for name, array in (arrays or {}).items():
+            _write_array(f, directory, name, array)
+        _write_directory(f, directory)
+
+
+def append_arrays(path, arrays, meta=None):
+    """Add or replace named arrays (and merge ``meta``) in an existing study file"""
+    with open(path, 'r+b') as f:
+        offset, length = _read_prelude(f, path)
+        f.seek(offset)
+        directory = json.loads(f.read(length))
+        directory['meta'].update(meta or {})
+        # New arrays overwrite the old directory; replaced arrays become dead space
+        f.seek(offset)
+        f.truncate()
+        for name, array in arrays.items():
+            _write_array(f, directory, name, array)
+        _write_directory(f, directory)
+
+
+def _read_prelude(f, path):
+    """Directory offset and length of an open study file"""
+    prelude = f.read(_PRELUDE.size)
+    if len(prelude) < _PRELUDE.size or not prelude.startswith(MAGIC):
+        raise ValueError(f'Not a study file: {path}')
+    _, offset, length = _PRELUDE.unpack(prelude)
+    return offset, length
+
+
+def _begin_array(f, directory, name, dtype, shape):
+    f.write(b'\0' * (-f.tell() % _ALIGN))
+    directory['arrays'][name] = {'offset': f.tell(), 'dtype': dtype.str, 'shape': [int(n) for n in shape]}
+
+
+def _write_array(f, directory, name, array):
+    array = np.ascontiguousarray(array)
+    if array.dtype.hasobject:
+        raise ValueError(f'Cannot store object array {name!r} in a study file')
+    _begin_array(f, directory, name, array.dtype, array.shape)
+    f.write(array.tobytes())
+
+
+def _write_directory(f, directory):
+    f.write(b'\0' * (-f.tell() % _ALIGN))
+    offset = f.tell()
+    encoded = json.dumps(directory).encode()
+    f.write(encoded)
+    f.seek(0)
+    f.write(_PRELUDE.pack(MAGIC, offset, len(encoded)))
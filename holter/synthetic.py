@@ -0,0 +1,383 @@
+"""Synthetic multi-lead Holter recordings with exact ground truth.
+
+The rhythm is planned once for the whole recording: an ECGSYN-style R-R
+tachogram (Mayer-wave and respiratory spectral peaks with random phases,
+on a circadian mean heart rate) drives sinus beats, AF episodes replace it
+with irregular R-R intervals, and pauses, ventricular premature beats, ST
+shifts and artifact bursts are placed at random. Only the beat times, labels
+and event intervals are kept in memory. Samples are synthesized on read:
+every beat is a sum of Gaussian P, Q, R, S and T waves (ECGSYN's
+morphology, with QT scaled by Bazett's rule), evaluated for all beats of a
+range at once and projected on each lead. Noise comes from counter-seeded
+blocks, so any range reads the same every time and a recording is
+reproducible from its seed.
+
+``write_wfdb`` streams a recording to a WFDB record (format 16) in chunks
+and saves the ground truth beside it; ``write_study`` does the same for a
+study file. From the command line::
+
+    python -m holter.synthetic data/synthetic.hea --hours 24 --leads 3 --seed 1
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+
+from holter.classify import NORMAL, VENTRICULAR
+from holter.ingest import DEFAULT_CHUNK_SECONDS, Recording, iter_chunks
+
+ADC_GAIN = 200.0            # ADC codes per mV of the written records
+NOISE_BLOCK = 2 ** 16       # samples per independently seeded noise block
+WINDOW = (-0.35, 0.65)      # extent of one beat's waveform around its R peak (s)
+TRUTH_SUFFIX = '.truth.npz'
+
+# ECGSYN wave parameters at 60 bpm: centre relative to R (s), width (s) and amplitude (mV)
+CENTRES = np.array([-0.20, -0.03, 0.0, 0.03, 0.28])
+WIDTHS = np.array([0.030, 0.012, 0.011, 0.012, 0.060])
+AMPLITUDES = np.array([0.15, -0.12, 1.2, -0.25, 0.30])
+# Ventricular beats: no P wave, wide QRS and a discordant T wave
+V_CENTRES = np.array([0.0, -0.04, 0.0, 0.06, 0.34])
+V_WIDTHS = np.array([0.030, 0.025, 0.032, 0.035, 0.080])
+V_AMPLITUDES = np.array([0.0, -0.20, 1.5, -0.60, -0.45])
+
+# Lead projections of the P, QRS, T and ventricular QRS axes for the first leads;
+# further leads get random projections from the seed
+LEAD_GAINS = np.array([[1.0, 1.0, 1.0, -0.9],
+                       [0.8, 0.6, 0.8, 1.1],
+                       [0.3, -0.5, 0.4, 0.8]])
+
+GroundTruth = namedtuple('GroundTruth', ['peaks', 'labels', 'af', 'pauses', 'st', 'artifact'])
+GroundTruth.__doc__ = """Beat sample positions and labels, and ``(n, 2)`` event intervals in seconds;
+``st`` has a third column with the ST shift in mV"""
+
+
+class SyntheticHolter(Recording):
+    """Reproducible synthetic recording of any length, synthesized on read"""
+
+    def __init__(self, duration, fs=200.0, n_leads=3, seed=0, start_time=None, mean_hr=70.0,
+                 af_burden=0.05, vpb_per_hour=30.0, pauses_per_day=6.0, st_per_day=4.0,
+                 artifact_per_day=12.0, noise=0.015):
+        self.params = dict(duration=duration, fs=fs, n_leads=n_leads, seed=seed, start_time=start_time,
+                           mean_hr=mean_hr, af_burden=af_burden, vpb_per_hour=vpb_per_hour,
+                           pauses_per_day=pauses_per_day, st_per_day=st_per_day,
+                           artifact_per_day=artifact_per_day, noise=noise)
+        self.fs = float(fs)
+        self.n_samples = int(round(duration * self.fs))
+        self.lead_names = tuple(['I', 'II', 'V1'][:n_leads] + [f'Lead {i + 1}' for i in range(3, n_leads)])
+        self.start_time = start_time or datetime(2024, 1, 1, 9, 0, 0)
+        self.seed = seed
+        self.noise = noise
+
+        rng = np.random.default_rng(seed)
+        extra = rng.uniform(-1, 1, (max(n_leads - 3, 0), LEAD_GAINS.shape[1]))
+        self._lead_gains = np.vstack([LEAD_GAINS, extra])[:n_leads]
+        self._phases = rng.uniform(0, 2 * np.pi, n_leads)
+        duration = self.duration
+        hours = duration / 3600.0
+
+        # Episodes last 2-60 min (about half an hour on average)
+        af = _place(rng, duration, rng.uniform(120, 3600, _count(rng, af_burden * duration / 1860.0)))
+        times = _beat_times(rng, duration, af, self._circadian_hr(mean_hr))
+        labels = np.full(len(times), NORMAL, dtype='<U1')
+
+        pauses, times, labels = _add_pauses(rng, times, labels, af, _count(rng, pauses_per_day * hours / 24))
+        labels = _add_vpbs(rng, times, labels, _count(rng, vpb_per_hour * hours))
+        times[labels == VENTRICULAR] = _premature(times, labels == VENTRICULAR)
+
+        st_episodes = _place(rng, duration, rng.uniform(60, 600, _count(rng, st_per_day * hours / 24)))
+        st_shift = rng.choice([-1.0, 1.0], len(st_episodes), p=[0.8, 0.2]) * rng.uniform(0.1, 0.3, len(st_episodes))
+        artifact = _place(rng, duration, rng.uniform(3, 45, _count(rng, artifact_per_day * hours / 24)))
+
+        keep = (times > -WINDOW[0]) & (times < duration - WINDOW[1])
+        self._times = times[keep]
+        self._labels = labels[keep]
+        self._rr = np.diff(times, prepend=times[0] - 60.0 / mean_hr)[keep]
+        self._af = af
+        self._st = np.column_stack([st_episodes, st_shift]) if len(st_episodes) else np.zeros((0, 3))
+        self._artifact = artifact
+        self._episode_phases = rng.uniform(0, 2 * np.pi, 64)
+        self.truth = GroundTruth(
+            peaks=np.round(self._times * self.fs).astype(np.int64),
+            labels=self._labels,
+            af=self._af,
+            pauses=pauses,
+            st=self._st,
+            artifact=self._artifact,
+        )
+
+    @property
+    def source_hash(self):
+        # The parameters determine every sample, so they identify the recording
+        return 'synthetic-' + hashlib.blake2b(repr(sorted(self.params.items())).encode(), digest_size=16).hexdigest()
+
+    def adc_scale(self):
+        # Samples are quantized to ADC_GAIN codes per mV, as in the written records
+        return np.full(self.n_leads, 1.0 / ADC_GAIN), np.zeros(self.n_leads)
+
+    def _read(self, start, stop, index):
+        t0, n = start / self.fs, stop - start
+        out = np.zeros((len(index), n))
+        first, last = np.searchsorted(self._times, [t0 - WINDOW[1], (stop - 1) / self.fs - WINDOW[0]])
+        if last > first:
+            self._add_beats(out, start, stop, index, slice(first, last))
+        t = np.arange(start, stop) / self.fs
+        gains = self._lead_gains[index]
+        out += 0.05 * np.sin(2 * np.pi * 0.25 * t + self._phases[index, np.newaxis])
+        for lo, hi, k in _overlapping(self._af, start / self.fs, stop / self.fs, t):
+            # Fibrillatory waves: ~6 Hz, slowly drifting, strongest where the P wave projects
+            phase = self._episode_phases[k % 64]
+            f_wave = 0.06 * np.sin(2 * np.pi * 6.0 * t[lo:hi] + 2.0 * np.sin(2 * np.pi * 0.4 * t[lo:hi]) + phase)
+            out[:, lo:hi] += gains[:, :1] * f_wave
+        noise = self._noise(start, stop, index)
+        for lo, hi, k in _overlapping(self._artifact, start / self.fs, stop / self.fs, t):
+            # Motion artifact: heavy broadband noise over a large baseline swing
+            phase = self._episode_phases[(k + 32) % 64]
+            noise[:, lo:hi] *= 12.0
+            out[:, lo:hi] += 0.8 * np.sin(2 * np.pi * 0.7 * t[lo:hi] + phase + self._phases[index, np.newaxis])
+        out += noise
+        return (np.round(out * ADC_GAIN) / ADC_GAIN).astype(np.float32)
+
+    def _add_beats(self, out, start, stop, index, beats):
+        times, labels, rr = self._times[beats], self._labels[beats], self._rr[beats]
+        ventricular = labels == VENTRICULAR
+        centres = np.where(ventricular[:, np.newaxis], V_CENTRES, CENTRES)
+        widths = np.where(ventricular[:, np.newaxis], V_WIDTHS, WIDTHS)
+        amplitudes = np.where(ventricular[:, np.newaxis], V_AMPLITUDES, AMPLITUDES)
+        # Bazett: the T wave moves with the square root of the preceding R-R interval
+        qt_scale = np.sqrt(np.clip(rr, 0.3, 2.0))
+        centres[:, 4] *= qt_scale
+        widths[:, 4] *= qt_scale
+        in_af = _inside(times, self._af)
+        amplitudes[in_af, 0] = 0.0
+
+        offsets = np.arange(int(np.floor(WINDOW[0] * self.fs)), int(np.ceil(WINDOW[1] * self.fs)) + 1)
+        anchors = np.round(times * self.fs).astype(np.int64)
+        tau = (anchors[:, np.newaxis] + offsets) / self.fs - times[:, np.newaxis]
+        shapes = amplitudes[:, :, np.newaxis] * np.exp(
+            -0.5 * ((tau[:, np.newaxis, :] - centres[:, :, np.newaxis]) / widths[:, :, np.newaxis]) ** 2)
+
+        p_wave, qrs, t_wave = shapes[:, 0], shapes[:, 1:4].sum(axis=1), shapes[:, 4]
+        # ST shift: a flat-topped segment from the J point to the T peak
+        for lo, hi, k in _overlapping(self._st[:, :2], times[0], times[-1] + 1e-9, times):
+            j_point, t_peak = 0.04 + 0.02 * ventricular[lo:hi], centres[lo:hi, 4]
+            middle, half = (j_point + t_peak) / 2, (t_peak - j_point) / 2
+            t_wave[lo:hi] += self._st[k, 2] * np.exp(
+                -((tau[lo:hi] - middle[:, np.newaxis]) / half[:, np.newaxis]) ** 4)
+
+        columns = anchors[:, np.newaxis] + offsets - start
+        valid = (columns >= 0) & (columns < stop - start)
+        columns = columns[valid]
+        for row, gain in enumerate(self._lead_gains[index]):
+            qrs_gain = np.where(ventricular, gain[3], gain[1])[:, np.newaxis]
+            waveform = gain[0] * p_wave + qrs_gain * qrs + gain[2] * t_wave
+            out[row] += np.bincount(columns, weights=waveform[valid], minlength=stop - start)
+
+    def _noise(self, start, stop, index):
+        first, last = start // NOISE_BLOCK, (stop - 1) // NOISE_BLOCK + 1
+        rows = []
+        for lead in index:
+            blocks = [np.random.default_rng([self.seed, int(lead), block]).standard_normal(NOISE_BLOCK)
+                      for block in range(first, last)]
+            rows.append(np.concatenate(blocks)[start - first * NOISE_BLOCK:stop - first * NOISE_BLOCK])
+        return self.noise * np.array(rows)
+
+    def _circadian_hr(self, mean_hr):
+        """Heart rate by elapsed time: lowest around 03:00, highest in the afternoon"""
+        midnight = self.start_time.replace(hour=0, minute=0, second=0, microsecond=0)
+        offset = (self.start_time - midnight).total_seconds()
+
+        def hr(t):
+            return mean_hr + 0.15 * mean_hr * np.cos(2 * np.pi * ((offset + t) / 3600.0 - 15.0) / 24.0)
+        return hr
+
+
+def rr_tachogram(rng, n, lf_hf=0.5, lf=0.1, hf=0.25, lf_width=0.01, hf_width=0.01, std=0.04):
+    """ECGSYN R-R modulation sampled at 1 Hz: relative deviation with LF and HF spectral peaks"""
+    f = np.fft.rfftfreq(n, d=1.0)
+    power = (lf_hf * np.exp(-0.5 * ((f - lf) / lf_width) ** 2) / lf_width
+             + np.exp(-0.5 * ((f - hf) / hf_width) ** 2) / hf_width)
+    spectrum = np.sqrt(power) * np.exp(2j * np.pi * rng.random(len(f)))
+    series = np.fft.irfft(spectrum, n)
+    return std * series / max(series.std(), 1e-12)
+
+
+def _beat_times(rng, duration, af, hr):
+    """Beat times over the recording: tachogram-driven sinus rhythm with irregular AF stretches"""
+    grid = np.arange(int(np.ceil(duration)) + 2, dtype=np.float64)
+    rate = hr(grid) / 60.0 / (1.0 + rr_tachogram(rng, len(grid)))
+    # Integral pulse frequency modulation: a sinus beat fires each time the
+    # integrated heart rate (in beats) crosses a whole number
+    phase = np.concatenate([[0.0], np.cumsum((rate[1:] + rate[:-1]) / 2)])
+    bounds = np.concatenate([[0.0], af.ravel(), [duration]])
+    times = []
+    for i, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])):
+        if i % 2:
+            # AF: irregularly irregular, fast ventricular response
+            rr = np.clip(0.65 * (1 + 0.25 * rng.standard_normal(int((hi - lo) / 0.3) + 2)), 0.3, 1.6)
+            t = lo + np.cumsum(rr)
+        else:
+            first, last = np.interp([lo, hi], grid, phase)
+            t = np.interp(np.arange(np.floor(first) + 1, last), phase, grid)
+        times.append(t[t < hi])
+    return np.concatenate(times) if times else np.zeros(0)
+
+
+def _add_pauses(rng, times, labels, af, count):
+    """Drop one or two sinus beats at random places; returns the pause intervals"""
+    candidates = np.flatnonzero(~_inside(times, af))[2:-3]
+    if not count or not len(candidates):
+        return np.zeros((0, 2)), times, labels
+    chosen = np.unique(rng.choice(candidates, min(count, len(candidates)), replace=False))
+    chosen = chosen[np.diff(chosen, prepend=-10) > 5]
+    dropped = rng.integers(1, 3, len(chosen))
+    drop = np.concatenate([np.arange(k, k + d) for k, d in zip(chosen, dropped)])
+    pauses = np.column_stack([times[chosen - 1], times[chosen + dropped]])
+    keep = np.ones(len(times), dtype=bool)
+    keep[drop] = False
+    return pauses, times[keep], labels[keep]
+
+
+def _add_vpbs(rng, times, labels, count):
+    """Mark random beats ventricular, away from pauses and each other"""
+    rr = np.diff(times, prepend=0.0)
+    regular = np.flatnonzero((rr < 1.5) & (np.roll(rr, -1) < 1.5))[2:-2]
+    if not count or not len(regular):
+        return labels
+    chosen = np.unique(rng.choice(regular, min(count, len(regular)), replace=False))
+    chosen = chosen[np.diff(chosen, prepend=-10) > 2]
+    labels = labels.copy()
+    labels[chosen] = VENTRICULAR
+    return labels
+
+
+def _premature(times, mask):
+    """New times of ventricular beats: 60% of the way from the previous beat (full compensatory pause)"""
+    k = np.flatnonzero(mask)
+    return times[k - 1] + 0.6 * (times[k] - times[k - 1])
+
+
+def _place(rng, duration, lengths):
+    """Random non-overlapping ``(n, 2)`` intervals of the given lengths, sorted"""
+    lengths = np.asarray(lengths, dtype=np.float64)
+    lengths = lengths[np.cumsum(lengths) < 0.5 * duration]
+    if not len(lengths):
+        return np.zeros((0, 2))
+    gaps = rng.dirichlet(np.ones(len(lengths) + 1)) * (duration - lengths.sum())
+    starts = np.cumsum(gaps[:-1]) + np.concatenate([[0.0], np.cumsum(lengths)[:-1]])
+    return np.column_stack([starts, starts + lengths])
+
+
+def _count(rng, expected):
+    return int(rng.poisson(expected)) if expected > 0 else 0
+
+
+def _inside(times, intervals):
+    """Which of the sorted ``times`` fall in any of the sorted, disjoint intervals"""
+    if not len(intervals):
+        return np.zeros(len(times), dtype=bool)
+    k = np.searchsorted(intervals[:, 0], times, side='right') - 1
+    return (k >= 0) & (times < intervals[np.maximum(k, 0), 1])
+
+
+def _overlapping(intervals, start, stop, times):
+    """``(lo, hi, k)`` index ranges into sorted ``times`` for each interval overlapping [start, stop)"""
+    if not len(intervals):
+        return
+    first = np.searchsorted(intervals[:, 1], start, side='right')
+    last = np.searchsorted(intervals[:, 0], stop, side='left')
+    for k in range(first, last):
+        lo, hi = np.searchsorted(times, intervals[k, :2])
+        if hi > lo:
+            yield lo, hi, k
+
+
+def write_wfdb(path, recording, chunk_seconds=DEFAULT_CHUNK_SECONDS * 10, progress=None):
+    """Stream a recording to a WFDB record (``.hea`` + format 16 ``.dat``), chunk by chunk.
+
+    The ground truth of a ``SyntheticHolter`` goes to ``<record>.truth.npz``.
+    Returns the header path.
+    """
+    base = os.path.splitext(path)[0]
+    name = os.path.basename(base)
+    n_leads = recording.n_leads
+    checksums = np.zeros(n_leads, dtype=np.int64)
+    first = np.zeros(n_leads, dtype=np.int64)
+    with open(base + '.dat', 'wb') as f:
+        for i, chunk in enumerate(iter_chunks(recording, chunk_seconds, 0)):
+            raw = np.clip(np.rint(chunk.core * ADC_GAIN), -32768, 32767).astype('<i2')
+            if i == 0 and raw.shape[1]:
+                first = raw[:, 0].astype(np.int64)
+            checksums += raw.sum(axis=1, dtype=np.int64)
+            f.write(raw.T.tobytes())
+            if progress is not None:
+                progress(chunk.stop / recording.n_samples)
+
+    start = recording.start_time
+    record = f'{name} {n_leads} {recording.fs:g} {recording.n_samples}'
+    if start is not None:
+        record += f" {start.strftime('%H:%M:%S %d/%m/%Y')}"
+    lines = [record]
+    for lead, lead_name in enumerate(recording.lead_names):
+        checksum = int((checksums[lead] + 32768) % 65536 - 32768)
+        lines.append(f'{name}.dat 16 {ADC_GAIN:g}(0)/mV 16 0 {first[lead]} {checksum} 0 {lead_name}')
+    with open(base + '.hea', 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    if getattr(recording, 'truth', None) is not None:
+        save_truth(base + TRUTH_SUFFIX, recording.truth, recording.fs)
+    return base + '.hea'
+
+
+def save_truth(path, truth, fs):
+    np.savez(path, fs=fs, **truth._asdict())
+
+
+def load_truth(path):
+    """Ground truth saved beside a synthetic record, from the record or the ``.truth.npz`` path"""
+    if not path.endswith(TRUTH_SUFFIX):
+        path = os.path.splitext(path)[0] + TRUTH_SUFFIX
+    with np.load(path) as arrays:
+        return GroundTruth(**{field: arrays[field] for field in GroundTruth._fields})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write a synthetic Holter recording with ground truth')
+    parser.add_argument('out', help='.hea for a WFDB record, .hstudy for a study file')
+    parser.add_argument('--hours', type=float, default=24.0)
+    parser.add_argument('--leads', type=int, default=3)
+    parser.add_argument('--fs', type=float, default=200.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--mean-hr', type=float, default=70.0)
+    parser.add_argument('--af-burden', type=float, default=0.05, help='expected fraction of time in AF')
+    parser.add_argument('--vpb-per-hour', type=float, default=30.0)
+    parser.add_argument('--pauses-per-day', type=float, default=6.0)
+    parser.add_argument('--st-per-day', type=float, default=4.0)
+    parser.add_argument('--artifact-per-day', type=float, default=12.0)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    recording = SyntheticHolter(args.hours * 3600, args.fs, args.leads, args.seed, mean_hr=args.mean_hr,
+                                af_burden=args.af_burden, vpb_per_hour=args.vpb_per_hour,
+                                pauses_per_day=args.pauses_per_day, st_per_day=args.st_per_day,
+                                artifact_per_day=args.artifact_per_day)
+    truth = recording.truth
+    if args.out.endswith('.hstudy'):
+        from holter.study import write_study
+        write_study(args.out, recording, arrays={f'truth/{field}': value
+                                                 for field, value in truth._asdict().items()})
+    else:
+        write_wfdb(args.out, recording)
+    print(f'{args.out}: {args.hours:g} h x {args.leads} leads @ {args.fs:g} Hz, {len(truth.peaks)} beats '
+          f'({np.count_nonzero(truth.labels == VENTRICULAR)} VPBs), {len(truth.af)} AF episodes, '
+          f'{len(truth.pauses)} pauses, {len(truth.st)} ST episodes, {len(truth.artifact)} artifact bursts '
+          f'in {time.perf_counter() - started:.1f} s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
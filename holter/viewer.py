@@ -0,0 +1,102 @@
+"""Paged, all-lead Detail view of a recording with background prefetch.
+
+A page is a fixed-length window of every lead sliced from the memory-mapped
+recording. While the current page is on screen, its neighbours are read on
+a thread pool, so stepping to the next or previous page usually finds its
+samples already loaded. Only the current page and its prefetch neighbours
+are kept, so memory does not grow with how far the reviewer has scrolled.
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+DEFAULT_PAGE_SECONDS = 10.0
+
+
+class Page:
+    """All leads of one page: samples ``[start, start + n)`` as float32 mV"""
+
+    __slots__ = ('index', 'start', 'data', 'fs')
+
+    def __init__(self, index, start, data, fs):
+        self.index = index
+        self.start = start
+        self.data = data
+        self.fs = fs
+
+    @property
+    def stop(self):
+        return self.start + self.data.shape[1]
+
+    @property
+    def times(self):
+        """Sample times in seconds"""
+        return np.arange(self.start, self.stop) / self.fs
+
+
+class PageViewer:
+    """Fixed-length pages of a recording with bounded adjacent-page prefetch"""
+
+    def __init__(self, recording, page_seconds=DEFAULT_PAGE_SECONDS, prefetch=1, executor=None):
+        self.recording = recording
+        self.page_seconds = float(page_seconds)
+        self.prefetch = prefetch
+        self._page_samples = max(int(round(self.page_seconds * recording.fs)), 1)
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='page-prefetch')
+        self._pages = {}  # page index -> Future
+        self._lock = threading.Lock()
+
+    @property
+    def n_pages(self):
+        return max(-(-self.recording.n_samples // self._page_samples), 1)
+
+    def page_of(self, seconds):
+        """Index of the page containing ``seconds``"""
+        index = int(seconds * self.recording.fs) // self._page_samples
+        return int(np.clip(index, 0, self.n_pages - 1))
+
+    def page(self, index):
+        """Return one page, loading it now unless it was prefetched, and prefetch its neighbours"""
+        index = int(np.clip(index, 0, self.n_pages - 1))
+        with self._lock:
+            future = self._pages.get(index)
+        page = future.result() if future is not None else self._load(index)
+
+        with self._lock:
+            wanted = range(index - self.prefetch, index + self.prefetch + 1)
+            for other in list(self._pages):
+                if other not in wanted:
+                    self._pages.pop(other).cancel()
+            if index not in self._pages:
+                self._pages[index] = _done(page)
+            for other in wanted:
+                if 0 <= other < self.n_pages and other not in self._pages:
+                    self._pages[other] = self._executor.submit(self._load, other)
+        return page
+
+    @property
+    def cached_pages(self):
+        """Indices of pages loaded or being loaded"""
+        with self._lock:
+            return sorted(self._pages)
+
+    def _load(self, index):
+        start = index * self._page_samples
+        data = self.recording.read(start, start + self._page_samples)
+        return Page(index, start, np.ascontiguousarray(data), self.recording.fs)
+
+    def close(self):
+        with self._lock:
+            for future in self._pages.values():
+                future.cancel()
+            self._pages.clear()
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+
+def _done(value):
+    future = Future()
+    future.set_result(value)
+    return future
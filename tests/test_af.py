@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from holter.af import RRSeries, detect_af_episodes, merge_intervals, runs
+from holter.synthetic import SyntheticHolter
+
+
+def series_from_rr(rr):
+    rr = np.asarray(rr, dtype=np.float64)
+    return RRSeries(np.cumsum(rr), rr)
+
+
+def regular(n, rng, rr=0.8):
+    return rr + rng.normal(0, 0.005, n)
+
+
+def irregular(n, rng):
+    return rng.uniform(0.4, 1.2, n)
+
+
+def test_irregularity_matches_direct_computation():
+    rr = irregular(200, np.random.default_rng(0))
+    series = series_from_rr(rr)
+    for window in (2, 3, 30, 200):
+        expected = [100 * np.mean(np.abs(np.diff(rr[i:i + window]))) / np.mean(rr[i:i + window])
+                    for i in range(len(rr) - window + 1)]
+        np.testing.assert_allclose(series.irregularity(window), expected)
+    assert len(series.irregularity(201)) == 0 and len(series.irregularity(1)) == 0
+
+
+def test_regular_rhythm_has_no_episodes():
+    result = detect_af_episodes(series_from_rr(regular(2000, np.random.default_rng(1))))
+    assert result.count == 0 and result.burden == 0.0 and len(result.episodes) == 0
+
+
+def test_irregular_segment_is_found():
+    rng = np.random.default_rng(2)
+    rr = np.concatenate([regular(500, rng), irregular(300, rng), regular(500, rng)])
+    series = series_from_rr(rr)
+    result = detect_af_episodes(series)
+    assert result.count == 1
+    true_start, true_end = series.times[500] - rr[500], series.times[799]
+    start, end = result.episodes[0]
+    # Centred windows put the edges within half a window (15 beats) of the truth
+    assert abs(start - true_start) < 12 and abs(end - true_end) < 12
+    assert result.burden == pytest.approx(100 * (end - start) / series.duration)
+    assert result.longest == result.total_duration == end - start
+
+
+def test_min_duration_and_merge_gap():
+    rng = np.random.default_rng(3)
+    # Two AF runs of ~24 s split by a ~20 s regular gap, then a lone ~24 s run
+    rr = np.concatenate([regular(300, rng), irregular(30, rng), regular(25, rng), irregular(30, rng),
+                         regular(300, rng), irregular(30, rng), regular(300, rng)])
+    series = series_from_rr(rr)
+    merged = detect_af_episodes(series, min_beats=10, min_duration=30, merge_gap=25.0)
+    assert merged.count == 1 and merged.episodes[0, 1] < series.times[700]
+    unmerged = detect_af_episodes(series, min_beats=10, min_duration=30, merge_gap=0.0)
+    assert unmerged.count == 0
+    short = detect_af_episodes(series, min_beats=10, min_duration=0, merge_gap=0.0)
+    assert short.count == 3
+    assert detect_af_episodes(series, min_beats=10, min_duration=0, merge_gap=25.0).count == 2
+
+
+def test_runs_and_merge_intervals():
+    starts, ends = runs([True, True, False, True, False, False, True])
+    assert list(starts) == [0, 3, 6] and list(ends) == [2, 4, 7]
+    assert [len(r) for r in runs([])] == [0, 0]
+    merged = merge_intervals(np.array([[0.0, 1.0], [1.5, 2.0], [5.0, 6.0], [6.0, 7.0]]), 0.5)
+    np.testing.assert_array_equal(merged, [[0.0, 2.0], [5.0, 7.0]])
+
+
+def test_burden_on_synthetic_ground_truth():
+    synthetic = SyntheticHolter(4 * 3600, n_leads=1, seed=6, af_burden=0.2)
+    truth = synthetic.truth
+    series = RRSeries.from_peaks(truth.peaks, synthetic.fs, synthetic.duration)
+    result = detect_af_episodes(series)
+    true_burden = 100 * np.sum(truth.af[:, 1] - truth.af[:, 0]) / synthetic.duration
+    assert true_burden > 5
+    assert result.burden == pytest.approx(true_burden, abs=1.0)
+    # Every true episode long enough to qualify overlaps a detected one
+    for start, end in truth.af[truth.af[:, 1] - truth.af[:, 0] >= 60]:
+        assert np.any((result.episodes[:, 0] < end) & (result.episodes[:, 1] > start))
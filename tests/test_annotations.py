@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from holter.annotations import AnnotationStore, BeatAnnotations, EpisodeIndex
+from holter.classify import NORMAL, SUPRAVENTRICULAR, VENTRICULAR
+
+
+@pytest.fixture
+def episodes():
+    # Overlapping and nested episodes, so the running maximum of ends matters
+    rng = np.random.default_rng(2)
+    starts = rng.uniform(0, 1000, 200)
+    ends = starts + rng.exponential(20, 200)
+    ends[::17] += 300
+    kinds = np.where(rng.random(200) < 0.7, 'AF', 'Pause')
+    return EpisodeIndex(starts, ends, kinds)
+
+
+def brute_overlapping(index, start, stop, kind=None):
+    hit = (index.starts < stop) & (index.ends > start)
+    if kind is not None:
+        hit &= index.kinds == kind
+    return np.flatnonzero(hit)
+
+
+def test_overlapping_matches_brute_force(episodes):
+    rng = np.random.default_rng(3)
+    for start in rng.uniform(-50, 1300, 300):
+        stop = start + rng.exponential(30)
+        for kind in (None, 'AF', 'Pause'):
+            np.testing.assert_array_equal(episodes.overlapping(start, stop, kind),
+                                          brute_overlapping(episodes, start, stop, kind))
+
+
+def test_at_touching_bounds():
+    index = EpisodeIndex.from_intervals([[10.0, 20.0], [20.0, 30.0]])
+    assert list(index.at(20.0)) == [1]
+    assert list(index.at(19.999)) == [0]
+    assert list(index.at(30.0)) == []
+
+
+def test_next_and_previous(episodes):
+    for t in np.linspace(-10, 1100, 97):
+        later = np.flatnonzero(episodes.starts > t)
+        earlier = np.flatnonzero((episodes.starts < t) & (episodes.kinds == 'Pause'))
+        assert episodes.next(t) == (int(later[0]) if len(later) else None)
+        assert episodes.previous(t, 'Pause') == (int(earlier[-1]) if len(earlier) else None)
+
+
+def test_edits_keep_queries_consistent(episodes):
+    at = episodes.add(500.0, 2000.0, 'AF')
+    assert episodes.starts[at] == 500.0 and np.all(np.diff(episodes.starts) >= 0)
+    assert at in episodes.overlapping(1500.0, 1600.0)
+    episodes.remove([at, 0])
+    episodes.relabel(3, 'Flutter')
+    for start in (0.0, 450.0, 990.0):
+        np.testing.assert_array_equal(episodes.overlapping(start, start + 40),
+                                      brute_overlapping(episodes, start, start + 40))
+    assert list(episodes.overlapping(0, 2000, 'Flutter')) == [3]
+
+
+def test_beat_range_next_previous_and_edits():
+    beats = BeatAnnotations([500, 100, 300, 900, 700], [NORMAL, NORMAL, VENTRICULAR, NORMAL, SUPRAVENTRICULAR])
+    peaks, labels = beats.range(100, 700)
+    assert list(peaks) == [100, 300, 500] and list(labels) == [NORMAL, VENTRICULAR, NORMAL]
+    assert beats.next(300) == 500 and beats.next(300, SUPRAVENTRICULAR) == 700
+    assert beats.previous(700, VENTRICULAR) == 300 and beats.previous(100) is None
+    beats.insert([600, 300], [VENTRICULAR, NORMAL])
+    assert list(beats.peaks) == [100, 300, 500, 600, 700, 900]
+    assert beats.count(0, 1000, VENTRICULAR) == 1
+    beats.remove([600, 42])
+    assert beats.next(300, VENTRICULAR) is None
+    assert beats.relabel([900, 901], SUPRAVENTRICULAR) == 1
+
+
+def test_store_page():
+    beats = BeatAnnotations([100, 250, 400], fs=100.0)
+    store = AnnotationStore(100.0, beats, EpisodeIndex.from_intervals([[2.0, 3.0]]))
+    times, labels, overlapping = store.page(2.5, 4.0)
+    assert list(times) == [2.5] and list(overlapping) == [0]
+    assert store.next_beat(2.5) == 4.0 and store.previous_beat(2.5) == 1.0
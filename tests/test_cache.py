@@ -0,0 +1,108 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from holter.cache import AnalysisCache, content_hash, make_key, sizeof
+from holter.ingest import ArrayRecording
+
+
+def test_evicts_least_recently_used_first():
+    cache = AnalysisCache(max_bytes=300)
+    for key in 'abc':
+        cache.put(key, key, size=100)
+    assert cache.get('a') == 'a'          # now b is the oldest
+    cache.put('d', 'd', size=100)
+    assert 'b' not in cache and list(cache._entries) == ['c', 'a', 'd']
+    cache.put('e', 'e', size=150)
+    assert list(cache._entries) == ['d', 'e'] and cache.bytes == 250
+    assert cache.stats()['evictions'] == 3
+
+
+def test_byte_accounting():
+    cache = AnalysisCache(max_bytes=1000)
+    cache.put('a', None, size=100)
+    cache.put('b', None, size=200)
+    cache.put('a', None, size=300)        # replacing counts the new size only
+    assert cache.bytes == 500 and len(cache) == 2
+    cache.discard('b')
+    cache.discard('missing')
+    assert cache.bytes == 300
+    cache.put('array', np.zeros(50))
+    assert cache.bytes == 300 + 400
+    cache.clear()
+    assert cache.bytes == 0 and len(cache) == 0
+    assert cache.stats()['bytes'] == 0
+
+
+def test_rejects_items_larger_than_the_budget():
+    cache = AnalysisCache(max_bytes=100)
+    cache.put('small', 1, size=60)
+    cache.put('big', 2, size=101)
+    assert 'big' not in cache and 'small' in cache and cache.bytes == 60
+    # A rejected replacement also drops the stale value
+    cache.put('small', 3, size=500)
+    assert 'small' not in cache and cache.bytes == 0 and cache.stats()['evictions'] == 0
+    assert cache.get_or_compute('huge', lambda: np.zeros(1000)).shape == (1000,)
+    assert 'huge' not in cache
+
+
+def test_hits_and_misses():
+    cache = AnalysisCache()
+    assert cache.get('a', 'default') == 'default'
+    assert cache.get_or_compute('a', lambda: 1) == 1
+    assert cache.get_or_compute('a', lambda: 2) == 1
+    assert cache.get('a') == 1
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (2, 2, 0.5)
+
+
+def test_concurrent_requests_compute_once():
+    cache = AnalysisCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('key', compute)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and results == ['value'] * 8
+
+
+def test_failed_computation_is_not_cached():
+    cache = AnalysisCache()
+
+    def fail():
+        raise RuntimeError('no')
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute('key', fail)
+    assert 'key' not in cache and cache.bytes == 0
+    assert cache.get_or_compute('key', lambda: 5) == 5
+
+
+def test_sizeof(tmp_path):
+    array = np.zeros(1000)
+    assert sizeof(array) == 8000
+    assert sizeof(array[::2]) == 4000
+    assert sizeof({'a': array, 'b': array}) < 8000 + 1000    # shared arrays count once
+    path = tmp_path / 'mapped.npy'
+    np.save(path, array)
+    mapped = np.load(path, mmap_mode='r')
+    assert sizeof(mapped) == 0 and sizeof(mapped[10:20]) == 0
+
+
+def test_keys_and_hashes():
+    data = np.arange(600, dtype=np.float32).reshape(2, 300)
+    assert content_hash(ArrayRecording(data, 100)) == content_hash(ArrayRecording(data.copy(), 100))
+    assert content_hash(ArrayRecording(data, 100)) != content_hash(ArrayRecording(data, 200))
+    assert make_key('st', 'h', a=1, b=2) == make_key('st', 'h', b=2, a=1)
+    assert make_key('st', 'h', a=1) != make_key('st', 'h', a=2)
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from holter.conditioning import ConditionedRecording, SignalConditioner, iter_conditioned
+from holter.ingest import ArrayRecording
+from holter.synthetic import SyntheticHolter
+
+
+@pytest.fixture(scope='module')
+def recording():
+    synthetic = SyntheticHolter(600, n_leads=2, seed=3)
+    return ArrayRecording(synthetic.read(0, synthetic.n_samples), synthetic.fs)
+
+
+@pytest.mark.parametrize('chunk_seconds', [0.37, 1.0, 60.0, 1000.0])
+def test_chunked_is_bit_identical_to_whole_record(recording, chunk_seconds):
+    whole = SignalConditioner(recording.fs).process(recording.read(0, recording.n_samples))
+    chunks = list(iter_conditioned(recording, chunk_seconds))
+    assert [chunk.start for chunk in chunks[1:]] == [chunk.stop for chunk in chunks[:-1]]
+    np.testing.assert_array_equal(np.concatenate([chunk.core for chunk in chunks], axis=1), whole)
+
+
+def test_chunked_with_mains_off_and_one_lead(recording):
+    whole = SignalConditioner(recording.fs, mains=None).process(recording.read(0, recording.n_samples, [1]))
+    chunked = np.concatenate([chunk.core for chunk in iter_conditioned(recording, 7.5, leads=[1], mains=None)],
+                             axis=1)
+    np.testing.assert_array_equal(chunked, whole)
+
+
+def test_conditioned_pages_match_across_page_boundaries(recording):
+    conditioned = ConditionedRecording(recording)
+    fs = int(recording.fs)
+    page = conditioned.read(100 * fs, 110 * fs)
+    halves = np.concatenate([conditioned.read(100 * fs, 105 * fs), conditioned.read(105 * fs, 110 * fs)], axis=1)
+    assert page.shape == (2, 10 * fs)
+    np.testing.assert_allclose(halves, page, atol=1e-3)
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from holter.decimate import DEFAULT_MAX_POINTS, MinMaxPyramid, decimate_minmax
+from holter.ingest import ArrayRecording
+
+
+def test_decimate_keeps_extremes_within_max_points():
+    y = np.sin(np.linspace(0, 50, 10001))
+    y[1234] = 9.0
+    x, reduced = decimate_minmax(np.arange(len(y)), y, max_points=100)
+    assert len(reduced) <= 100 and len(x) == len(reduced)
+    assert reduced.max() == 9.0 and reduced.min() == y.min()
+
+
+@pytest.mark.parametrize('max_points', [0, 1])
+def test_too_few_points_are_rejected(max_points):
+    with pytest.raises(ValueError):
+        decimate_minmax(np.arange(10), np.arange(10.0), max_points=max_points)
+    pyramid = MinMaxPyramid.build(ArrayRecording(np.zeros((1, 1000)), 100.0))
+    with pytest.raises(ValueError):
+        pyramid.query(0, 10, max_points=max_points)
+
+
+def test_query_keeps_spikes_at_every_zoom():
+    data = np.zeros((2, 360000))
+    data[1, 123456] = 5.0
+    pyramid = MinMaxPyramid.build(ArrayRecording(data, 100.0))
+    for start, stop in [(0, 3600), (1200, 1300), (1234, 1235)]:
+        t, mv = pyramid.query(start, stop, lead=1)
+        assert len(t) == len(mv) <= DEFAULT_MAX_POINTS and mv.max() == 5.0
+
+
+@pytest.mark.parametrize('max_points', [2, 3, 100, 1000, DEFAULT_MAX_POINTS])
+def test_query_never_exceeds_max_points(max_points):
+    rng = np.random.default_rng(max_points)
+    recording = ArrayRecording(rng.standard_normal((2, 6 * 3600 * 200)), 200.0)
+    pyramid = MinMaxPyramid.build(recording)
+    widths = np.exp(rng.uniform(np.log(0.5), np.log(recording.duration), 50))
+    for width, start in zip(widths, rng.uniform(0, 1, 50) * (recording.duration - widths)):
+        t, mv = pyramid.query(start, start + width, lead=int(rng.integers(2)), max_points=max_points)
+        assert len(t) == len(mv) <= max_points
+        assert np.all(np.diff(t) >= 0)
+    t, mv = pyramid.query(0, recording.duration, lead=1, max_points=max_points)
+    assert mv.max() == recording.data[1].max() and mv.min() == recording.data[1].min()
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from holter.detection import RPeakDetector, detect_r_peaks
+from holter.ingest import ArrayRecording
+from holter.synthetic import SyntheticHolter
+
+
+@pytest.fixture(scope='module')
+def synthetic():
+    return SyntheticHolter(900, n_leads=2, seed=5)
+
+
+@pytest.fixture(scope='module')
+def recording(synthetic):
+    return ArrayRecording(synthetic.read(0, synthetic.n_samples), synthetic.fs)
+
+
+@pytest.fixture(scope='module')
+def whole(recording):
+    return RPeakDetector(recording.fs, n_leads=2).process(recording.read(0, recording.n_samples), final=True)
+
+
+@pytest.mark.parametrize('chunk_seconds', [0.3, 1.0, 7.7, 60.0, 600.0])
+def test_chunk_size_does_not_change_peaks(recording, whole, chunk_seconds):
+    np.testing.assert_array_equal(detect_r_peaks(recording, chunk_seconds=chunk_seconds), whole)
+
+
+def test_process_then_flush_matches_final_block(recording, whole):
+    detector = RPeakDetector(recording.fs, n_leads=2)
+    data = recording.read(0, recording.n_samples)
+    middle = data.shape[1] // 2
+    peaks = np.concatenate([detector.process(data[:, :middle]), detector.process(data[:, middle:]),
+                            detector.flush()])
+    np.testing.assert_array_equal(peaks, whole)
+
+
+def test_peaks_match_ground_truth(synthetic, whole):
+    truth = synthetic.truth.peaks
+    tolerance = int(0.05 * synthetic.fs)
+    distance = np.abs(whole[:, np.newaxis] - truth[np.newaxis, :]).min(axis=1)
+    assert np.all(np.diff(whole) > 0)
+    assert np.mean(distance <= tolerance) > 0.99
+    assert len(whole) == pytest.approx(len(truth), rel=0.01)
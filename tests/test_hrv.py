@@ -0,0 +1,82 @@
+import numpy as np
+
+from holter.hrv import HRVEngine, plausible_nn
+
+
+def beat_series(duration, seed=0):
+    """Sinus rhythm with respiratory modulation and a few premature beats"""
+    rng = np.random.default_rng(seed)
+    n = int(duration / 0.8)
+    rr = 0.8 + 0.04 * np.sin(2 * np.pi * 0.25 * np.arange(n) * 0.8) + rng.normal(0, 0.01, n)
+    premature = rng.choice(n, n // 100, replace=False)
+    rr[premature] *= 0.6
+    times = np.cumsum(rr)
+    keep = times < duration
+    return times[keep], rr[keep]
+
+
+def assert_same_tables(first, second):
+    for key in first:
+        np.testing.assert_allclose(first[key], second[key], rtol=1e-9, equal_nan=True, err_msg=key)
+
+
+def one_shot(times, rr, normal=None):
+    engine = HRVEngine()
+    engine.add_beats(times, rr, normal)
+    return engine
+
+
+def test_hourly_chunks_match_one_shot():
+    times, rr = beat_series(3 * 3600 + 100)
+    expected = one_shot(times, rr)
+    engine = HRVEngine()
+    bounds = np.searchsorted(times, np.append(np.arange(0, times[-1], 3600), np.inf))
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        engine.add_beats(times[lo:hi], rr[lo:hi])
+    assert len(engine) == len(times)
+    assert_same_tables(engine.segments(), expected.segments())
+    assert_same_tables(engine.summary(), expected.summary())
+
+
+def test_refreshing_between_chunks_matches_one_shot():
+    times, rr = beat_series(2 * 3600)
+    expected = one_shot(times, rr)
+    engine = HRVEngine()
+    bounds = np.unique(np.concatenate([[0], np.random.default_rng(1).integers(0, len(times), 20), [len(times)]]))
+    # Include a chunk that ends exactly on a segment boundary
+    bounds = np.union1d(bounds, np.searchsorted(times, [600, 1800]))
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        engine.add_beats(times[lo:hi], rr[lo:hi])
+        engine.segments()
+    assert_same_tables(engine.segments(), expected.segments())
+    assert_same_tables(engine.summary(), expected.summary())
+
+
+def test_segment_statistics_match_direct_computation():
+    times, rr = beat_series(1800, seed=2)
+    normal = plausible_nn(rr)
+    table = one_shot(times, rr).segments()
+    for segment, start in enumerate(table['start']):
+        inside = (times >= start) & (times < start + 300)
+        nn = rr[inside & normal]
+        paired = inside & normal & np.concatenate([[False], normal[:-1]])
+        delta = rr[paired] - rr[np.flatnonzero(paired) - 1]
+        assert table['nn_count'][segment] == len(nn)
+        np.testing.assert_allclose(table['mean_nn'][segment], 1000 * nn.mean())
+        np.testing.assert_allclose(table['sdnn'][segment], 1000 * nn.std(ddof=1))
+        np.testing.assert_allclose(table['rmssd'][segment], 1000 * np.sqrt(np.mean(delta ** 2)))
+
+
+def test_set_normal_matches_labels_given_up_front():
+    times, rr = beat_series(3600, seed=3)
+    ectopic = np.random.default_rng(4).choice(len(times), 40, replace=False)
+    normal = plausible_nn(rr)
+    normal[ectopic] = False
+    expected = one_shot(times, rr, normal)
+
+    engine = one_shot(times, rr)
+    engine.segments()
+    engine.set_normal(ectopic, False)
+    assert_same_tables(engine.segments(), expected.segments())
+    assert_same_tables(engine.summary(), expected.summary())
+    assert engine.summary()['nn_count'] == normal.sum()
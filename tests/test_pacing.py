@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from holter.ingest import ArrayRecording
+from holter.pacing import PaceSpikeDetector, detect_pacing_spikes
+
+FS = 1000.0
+
+
+def paced_signal(n, spikes, width=2, amplitude=5.0):
+    x = np.zeros(n)
+    for spike in spikes:
+        x[spike:spike + width] = amplitude
+    return x
+
+
+def test_spike_at_last_sample():
+    x = paced_signal(2000, [1999], width=1)
+    assert list(PaceSpikeDetector(FS).process(x, final=True)) == [1999]
+
+
+def test_spike_at_last_sample_then_flush():
+    x = paced_signal(2000, [1999], width=1)
+    detector = PaceSpikeDetector(FS)
+    spikes = np.concatenate([detector.process(x), detector.flush()])
+    assert list(spikes) == [1999]
+
+
+@pytest.mark.parametrize('chunk_seconds', [0.25, 0.999, 1.0, 1.001, 3.0])
+def test_chunked_matches_whole_record(chunk_seconds):
+    x = paced_signal(6000, [500, 999, 2000, 2999, 4500, 5998])
+    whole = PaceSpikeDetector(FS).process(x, final=True)
+    assert list(whole) == [500, 999, 2000, 2999, 4500, 5998]
+    chunked = detect_pacing_spikes(ArrayRecording(x, FS), chunk_seconds=chunk_seconds)
+    np.testing.assert_array_equal(np.round(chunked * FS).astype(int), whole)
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from holter.af import RRSeries, detect_af_episodes
+from holter.detection import detect_r_peaks
+from holter.scan import AF, PAUSE, EventTracker, StopRules, scan_events
+from holter.synthetic import SyntheticHolter
+
+RULES = StopRules(pause=2.0, merge_gap=10.0)
+
+
+@pytest.fixture(scope='module')
+def recording():
+    return SyntheticHolter(2 * 3600, n_leads=1, seed=8, af_burden=0.5, pauses_per_day=96)
+
+
+@pytest.fixture(scope='module')
+def peaks(recording):
+    return detect_r_peaks(recording)
+
+
+@pytest.fixture(scope='module')
+def events(recording):
+    return list(scan_events(recording, RULES))
+
+
+def batch_episodes(peaks, fs, rules=RULES):
+    return detect_af_episodes(RRSeries.from_peaks(peaks, fs), rules.min_beats, rules.rr_var, rules.min_duration,
+                              rules.sensitivity, rules.merge_gap).episodes
+
+
+def tracked(peaks, fs, chunk, rules=RULES):
+    tracker = EventTracker(fs, rules)
+    events = []
+    for start in range(0, len(peaks), chunk):
+        events += tracker.add(peaks[start:start + chunk])
+    return events + tracker.add([], final=True)
+
+
+@pytest.mark.parametrize('chunk', [1, 7, 45, 1000, 100000])
+def test_tracker_finds_batch_episodes(recording, peaks, chunk):
+    episodes = batch_episodes(peaks, recording.fs)
+    found = np.array([(start, stop) for kind, start, stop in tracked(peaks, recording.fs, chunk) if kind == AF])
+    assert len(episodes) > 1 and len(found) == len(episodes)
+    np.testing.assert_allclose(found[:, 0], episodes[:, 0])
+    # Reported as soon as the minimum duration is reached, so never beyond the batch end
+    assert np.all(found[:, 1] <= episodes[:, 1] + 1e-9)
+    assert np.all(found[:, 1] - found[:, 0] >= RULES.min_duration)
+
+
+def test_tracker_matches_batch_for_other_rules(recording, peaks):
+    rules = StopRules(pause=None, min_beats=20, min_duration=0, sensitivity='High', merge_gap=0.0)
+    episodes = batch_episodes(peaks, recording.fs, rules)
+    found = [start for kind, start, stop in tracked(peaks, recording.fs, 50, rules)]
+    np.testing.assert_allclose(found, episodes[:, 0])
+
+
+def test_scan_yields_batch_events_in_order(recording, peaks, events):
+    times = peaks / recording.fs
+    rr = np.diff(times)
+    pauses = np.flatnonzero(rr >= RULES.pause)
+    assert len(pauses)
+    np.testing.assert_allclose([event.stop for event in events if event.kind == PAUSE], times[pauses + 1])
+    np.testing.assert_allclose([event.start for event in events if event.kind == AF],
+                               batch_episodes(peaks, recording.fs)[:, 0])
+    starts = [event.start for event in events]
+    assert starts == sorted(starts)
+    positions = [event.checkpoint.position for event in events]
+    assert positions == sorted(positions) and positions[0] < recording.n_samples
+
+
+def test_resuming_from_any_checkpoint_gives_the_remaining_events(recording, events):
+    expected = [event[:3] for event in events]
+    for index in (0, len(events) // 2, len(events) - 1):
+        checkpoint = events[index].checkpoint
+        for _ in range(2):
+            resumed = [event[:3] for event in scan_events(recording, RULES, checkpoint)]
+            assert resumed == expected[index + 1:]
+
+
+def test_scan_stops_at_the_first_event(recording, events):
+    first = next(scan_events(recording, RULES))
+    assert first[:3] == events[0][:3]
+    assert first.checkpoint.position == events[0].checkpoint.position
@@ -0,0 +1,112 @@
+from math import log
+
+import pytest
+
+from holter.search import B, K1, Document, SearchIndex, deletions, edit_distance, snippet, tokenize
+
+DOCUMENTS = [
+    Document('af', 'guide', 'Atrial fibrillation',
+             'Atrial fibrillation is an irregularly irregular rhythm without P waves. '
+             'The AF burden is the share of the recording spent in fibrillation.'),
+    Document('vpb', 'guide', 'Ventricular premature beats',
+             'Premature ventricular beats have a wide QRS complex and a compensatory pause.'),
+    Document('pause', 'guide', 'Pauses',
+             'A pause is an R-R interval longer than the pause threshold, for example 2.5 seconds.'),
+    Document('st', 'guide', 'ST segment analysis',
+             'ST depression is measured at the J point plus 60 ms against the PR baseline.'),
+    Document('hrv', 'rules', 'Heart rate variability',
+             'SDNN and RMSSD describe the variability of normal-to-normal intervals.'),
+]
+
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    for document in DOCUMENTS:
+        index.add(document)
+    return index
+
+
+def test_tokenize():
+    assert tokenize('The R-R interval of an AF_episode, 2.5 s!') == \
+        ['r', 'r', 'interval', 'af', 'episode', '2', '5', 's']
+    assert tokenize('Is it AND or THE') == []
+    assert tokenize('Ventrikuläre Extrasystolen') == ['ventrikuläre', 'extrasystolen']
+
+
+def test_edit_distance_and_deletions():
+    assert edit_distance('pause', 'pause') == 0
+    assert edit_distance('pause', 'puase') == 1          # transposition
+    assert edit_distance('pause', 'pauses') == 1
+    assert edit_distance('pause', 'cause') == 1
+    assert edit_distance('pause', 'pulse') == 2
+    assert edit_distance('', 'abc') == 3 and edit_distance('abc', '') == 3
+    assert deletions('abc') == {'abc', 'bc', 'ac', 'ab'}
+
+
+def test_known_best_match_ranks_first(index):
+    assert index.search('atrial fibrillation burden')[0].id == 'af'
+    assert index.search('compensatory pause')[0].id == 'vpb'
+    assert index.search('pause threshold')[0].id == 'pause'
+    assert index.search('J point depression')[0].id == 'st'
+    assert [hit.id for hit in index.search('pause')][:2] == ['pause', 'vpb']
+    assert index.search('the and of') == [] and index.search('unrelated') == []
+
+
+def test_single_term_score_is_bm25():
+    index = SearchIndex()
+    for document in DOCUMENTS:
+        index.add(document._replace(title=''))
+    n = len(DOCUMENTS)
+    lengths = {d.id: len(tokenize(d.text)) for d in DOCUMENTS}
+    average = sum(lengths.values()) / n
+    frequency = {'pause': 2, 'vpb': 1}
+    idf = log(1 + (n - 2 + 0.5) / (2 + 0.5))
+    expected = {doc_id: idf * f * (K1 + 1) / (f + K1 * (1 - B + B * lengths[doc_id] / average))
+                for doc_id, f in frequency.items()}
+    assert {hit.id: hit.score for hit in index.search('pause')} == pytest.approx(expected)
+
+
+def test_partial_matches_score_lower_than_full_matches(index):
+    hits = index.search('ventricular pause')
+    assert hits[0].id == 'vpb' and hits[0].terms == {'ventricular', 'pause'}
+    assert hits[1].score < hits[0].score
+
+
+def test_prefix_and_typo_lookup(index):
+    assert index.search('fibril')[0].id == 'af'
+    assert index.search('fibrilation')[0].id == 'af'
+    assert index.search('ventriclar')[0].id == 'vpb'
+    assert index.search('varaibility')[0].id == 'hrv'
+    assert index.expand('pau') == pytest.approx({'pause': 0.8 * 3 / 5, 'pauses': 0.8 * 3 / 6})
+    assert 'qrs' not in index.expand('qrx')         # too short for a typo
+    assert index.expand('pause')['pause'] == 1.0 and index.expand('pause')['pauses'] < 1.0
+
+
+def test_title_words_weigh_more(index):
+    index.add(Document('body', 'guide', 'Notes', 'Atrial flutter.'))
+    index.add(Document('titled', 'guide', 'Atrial flutter', 'Notes.'))
+    assert [hit.id for hit in index.search('flutter')] == ['titled', 'body']
+
+
+def test_snippet_highlights_matched_words(index):
+    hit = index.search('burden')[0]
+    assert '**burden**' in hit.snippet and hit.terms == {'burden'}
+    text = ' '.join(f'word{i}' for i in range(100)) + ' target here'
+    assert snippet(text, {'target'}, words=5) == '… word96 word97 word98 word99 **target** …'
+    assert snippet('', {'x'}) == ''
+    assert index.search('burden', highlight=('<b>', '</b>'))[0].snippet.count('<b>burden</b>') == 1
+
+
+def test_update_remove_and_versions(index):
+    changed, removed = index.update('rules', [DOCUMENTS[4]], version=1)
+    assert (changed, removed) == (0, 0) and index.version('rules') == 1
+    edited = DOCUMENTS[4]._replace(text='Frequency domain: LF and HF power.')
+    assert index.update('rules', [edited, Document('lf', None, 'LF', 'Low frequency band')], 2) == (2, 0)
+    assert index.search('rmssd') == [] and index.search('power')[0].id == 'hrv'
+    assert index.search('frequency')[0].id == 'lf' and index.search('frequency')[0].source == 'rules'
+    assert index.update('rules', [], 3) == (0, 2) and 'lf' not in index and 'hrv' not in index
+    index.remove('af')
+    index.remove('missing')
+    assert len(index) == 3 and index.search('fibrillation') == []
+    assert 'fibrillation' not in index.expand('fibril')
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from holter.st import STAnalyzer
+from holter.synthetic import SyntheticHolter
+
+
+@pytest.fixture(scope='module')
+def synthetic():
+    return SyntheticHolter(300, n_leads=2, seed=4)
+
+
+@pytest.mark.parametrize('chunk_beats', [1, 15, 16, 100])
+def test_chunk_beats_does_not_change_measurements(synthetic, chunk_beats):
+    analyzer = STAnalyzer(synthetic.fs)
+    peaks = synthetic.truth.peaks
+    whole = analyzer.analyze(synthetic, peaks, chunk_beats=len(peaks) + 16)
+    chunked = analyzer.analyze(synthetic, peaks, chunk_beats=chunk_beats)
+    np.testing.assert_allclose(chunked.beat_deviation, whole.beat_deviation)
+    np.testing.assert_allclose(chunked.j_offset, whole.j_offset)
+
+
+def test_templates_use_real_beats_only(synthetic):
+    # Rolling templates look back only: dropping the last beats changes nothing before them
+    analyzer = STAnalyzer(synthetic.fs)
+    peaks = synthetic.truth.peaks[:-1]
+    full = analyzer.analyze(synthetic, peaks)
+    assert full.j_offset.shape == (len(peaks),) and full.beat_deviation.shape == (2, len(peaks))
+    for drop in (1, 5, 17):
+        shorter = analyzer.analyze(synthetic, peaks[:-drop])
+        np.testing.assert_array_equal(shorter.j_offset, full.j_offset[:-drop])
+        np.testing.assert_array_equal(shorter.beat_deviation, full.beat_deviation[:, :-drop])
+
+
+def test_fewer_beats_than_a_template(synthetic):
+    peaks = synthetic.truth.peaks[10:15]
+    result = STAnalyzer(synthetic.fs).analyze(synthetic, peaks)
+    assert result.j_offset.shape == (5,) and np.all(np.isfinite(result.beat_deviation))
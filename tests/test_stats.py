@@ -0,0 +1,109 @@
+from datetime import datetime
+
+import numpy as np
+
+from holter.classify import NORMAL, SUPRAVENTRICULAR, UNKNOWN, VENTRICULAR
+from holter.stats import MAX_RR, MIN_INTERVALS, MINUTE, HolterStatistics
+
+DURATION = 3 * 3600.0
+
+
+def labelled_beats(seed=0):
+    """Beats over three hours with a rate trend, a pause, labels and beats exactly on hour bounds"""
+    rng = np.random.default_rng(seed)
+    rr = 0.6 + 0.4 * np.abs(np.sin(np.arange(14000) / 3000)) + rng.normal(0, 0.02, 14000)
+    times = np.cumsum(rr)
+    times = times[times < DURATION]
+    times[(times > 5000) & (times < 5004)] = np.nan     # a 4 s pause
+    times = np.union1d(times[np.isfinite(times)], [3600.0, 7200.0, 7200.5])
+    labels = rng.choice([NORMAL, VENTRICULAR, SUPRAVENTRICULAR, UNKNOWN], len(times), p=[0.9, 0.05, 0.03, 0.02])
+    return times, labels
+
+
+def direct_minutes(times, labels):
+    rr = np.diff(times, prepend=times[0])
+    usable = (rr > 0) & (rr <= MAX_RR)
+    n = int(np.ceil(DURATION / MINUTE))
+    beats, hr = np.zeros(n), np.full(n, np.nan)
+    counts = {code: np.zeros(n) for code in (VENTRICULAR, SUPRAVENTRICULAR)}
+    for minute in range(n):
+        inside = (times >= minute * MINUTE) & (times < (minute + 1) * MINUTE)
+        beats[minute] = inside.sum()
+        if (inside & usable).sum() >= MIN_INTERVALS:
+            hr[minute] = 60.0 / rr[inside & usable].mean()
+        for code in counts:
+            counts[code][minute] = (inside & (labels == code)).sum()
+    return beats, hr, counts
+
+
+def hourly_feed(stats, times, labels):
+    bounds = np.searchsorted(times, np.append(np.arange(0, DURATION, 3600), np.inf))
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        stats.add_beats(times[lo:hi], labels[lo:hi])
+    return stats
+
+
+def test_minute_bins_match_direct_computation():
+    times, labels = labelled_beats()
+    stats = hourly_feed(HolterStatistics(DURATION), times, labels)
+    beats, hr, counts = direct_minutes(times, labels)
+    minutes = stats.minutes()
+    np.testing.assert_array_equal(minutes['beats'], beats)
+    np.testing.assert_allclose(minutes['hr'], hr, equal_nan=True)
+    for code in counts:
+        np.testing.assert_array_equal(minutes[code], counts[code])
+    assert minutes['beats'].sum() == len(times)
+
+
+def test_hours_match_direct_computation():
+    times, labels = labelled_beats(1)
+    stats = hourly_feed(HolterStatistics(DURATION), times, labels)
+    beats, hr, counts = direct_minutes(times, labels)
+    hours = stats.hours()
+    rr = np.diff(times, prepend=times[0])
+    usable = (rr > 0) & (rr <= MAX_RR)
+    for hour in range(3):
+        inside = slice(hour * 60, (hour + 1) * 60)
+        in_hour = (times >= hour * 3600) & (times < (hour + 1) * 3600)
+        assert hours['start'][hour] == hour * 3600
+        assert hours['beats'][hour] == in_hour.sum() == beats[inside].sum()
+        np.testing.assert_allclose(hours['mean_hr'][hour], 60.0 / rr[in_hour & usable].mean())
+        np.testing.assert_allclose(hours['min_hr'][hour], np.nanmin(hr[inside]))
+        np.testing.assert_allclose(hours['max_hr'][hour], np.nanmax(hr[inside]))
+        for code in counts:
+            assert hours[code][hour] == (in_hour & (labels == code)).sum()
+
+
+def test_chunking_does_not_change_statistics():
+    times, labels = labelled_beats(2)
+    whole = HolterStatistics(DURATION)
+    whole.add_beats(times, labels)
+    chunked = HolterStatistics(DURATION)
+    bounds = np.unique(np.concatenate([[0], np.random.default_rng(3).integers(0, len(times), 30), [len(times)]]))
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        chunked.add_beats(times[lo:hi], labels[lo:hi])
+    for key, values in whole.minutes().items():
+        np.testing.assert_allclose(chunked.minutes()[key], values, equal_nan=True, err_msg=key)
+    for key, value in whole.summary().items():
+        np.testing.assert_allclose(chunked.summary()[key], value, equal_nan=True, err_msg=key)
+
+
+def test_summary_and_af_minutes():
+    times, labels = labelled_beats(4)
+    stats = hourly_feed(HolterStatistics(DURATION, datetime(2024, 1, 1, 22, 30)), times, labels)
+    episodes = np.array([[100.0, 250.0], [3590.0, 3700.0], [7000.0, 7030.5]])
+    stats.set_af_episodes(episodes)
+    _, hr, _ = direct_minutes(times, labels)
+    summary = stats.summary()
+    assert summary['total_beats'] == len(times)
+    assert summary['vpb_count'] == (labels == VENTRICULAR).sum()
+    assert summary['svpb_count'] == (labels == SUPRAVENTRICULAR).sum()
+    np.testing.assert_allclose([summary['max_hr'], summary['min_hr']], [np.nanmax(hr), np.nanmin(hr)])
+    assert summary['max_hr_time'] == np.nanargmax(hr) * MINUTE
+    np.testing.assert_allclose(summary['af_burden'], 100 * np.sum(np.diff(episodes)) / DURATION)
+
+    edges = np.arange(len(hr) + 1) * MINUTE
+    expected = [sum(max(0.0, min(stop, hi) - max(start, lo)) for start, stop in episodes)
+                for lo, hi in zip(edges[:-1], edges[1:])]
+    np.testing.assert_allclose(stats.minutes()['af_seconds'], expected)
+    np.testing.assert_allclose(stats.hours()['af_minutes'], [(150 + 10) / 60, (100 + 30.5) / 60, 0])
@@ -0,0 +1,110 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from holter.cache import content_hash
+from holter.classify import BeatClasses, BeatClassifier
+from holter.decimate import MinMaxPyramid
+from holter.detection import detect_r_peaks
+from holter.ingest import ArrayRecording, open_recording
+from holter.study import StudyRecording, append_arrays, write_study
+from holter.synthetic import SyntheticHolter, write_wfdb
+
+
+@pytest.fixture(scope='module')
+def source(tmp_path_factory):
+    """An integer-coded WFDB recording, so its ADC codes should round-trip exactly"""
+    path = write_wfdb(str(tmp_path_factory.mktemp('wfdb') / 'study'), SyntheticHolter(600, n_leads=2, seed=9))
+    return open_recording(path)
+
+
+@pytest.fixture(scope='module')
+def written(source, tmp_path_factory):
+    beats = detect_r_peaks(source)
+    classes = BeatClassifier(source.fs, source.n_leads).classify(source, beats)
+    pyramid = MinMaxPyramid.build(source)
+    arrays = {'beats': beats}
+    arrays.update({f'classes/{name}': values for name, values in classes.to_arrays().items()})
+    path = str(tmp_path_factory.mktemp('study') / 'study.hstudy')
+    write_study(path, source, arrays, pyramid, meta={'source': 'study.hea', 'saved': '2024-01-01T12:00:00'})
+    return path, arrays, classes, pyramid
+
+
+def test_samples_and_metadata_round_trip(source, written):
+    study = open_recording(written[0])
+    assert isinstance(study, StudyRecording)
+    assert (study.fs, study.n_samples, study.lead_names) == (source.fs, source.n_samples, source.lead_names)
+    assert study.start_time == source.start_time
+    assert study.meta == {'source': 'study.hea', 'saved': '2024-01-01T12:00:00'}
+    assert content_hash(study) == content_hash(source)
+    for ours, theirs in zip(study.adc_scale(), source.adc_scale()):
+        np.testing.assert_allclose(ours, theirs, rtol=1e-6)
+    # The native ADC codes are stored as they are
+    gain, offset = source.adc_scale()
+    codes = (source.read(0, source.n_samples) - offset[:, np.newaxis]) / gain[:, np.newaxis]
+    np.testing.assert_allclose(codes, np.rint(codes), atol=1e-3)
+    np.testing.assert_array_equal(study.array('samples').T, np.rint(codes))
+    np.testing.assert_allclose(study.read(0, study.n_samples), source.read(0, source.n_samples), atol=1e-6)
+    np.testing.assert_allclose(study.read(1234, 5678, leads=[1]), source.read(1234, 5678, leads=[1]), atol=1e-6)
+
+
+def test_arrays_and_pyramid_round_trip(source, written):
+    path, arrays, classes, pyramid = written
+    study = StudyRecording(path)
+    assert set(arrays) <= set(study.names) and 'samples' in study
+    for name, values in arrays.items():
+        assert study.array(name).dtype == np.asarray(values).dtype
+        np.testing.assert_array_equal(study.array(name), values)
+    reopened = BeatClasses.from_arrays(study.fs, study.arrays('classes/'))
+    np.testing.assert_array_equal(reopened.labels(), classes.labels())
+    np.testing.assert_array_equal(reopened.labels({0: 'V'}), classes.labels({0: 'V'}))
+
+    stored = study.pyramid()
+    assert len(stored.levels) == len(pyramid.levels)
+    for (bucket, mins, maxs), (bucket_in, mins_in, maxs_in) in zip(stored.levels, pyramid.levels):
+        assert bucket == bucket_in
+        np.testing.assert_array_equal(mins, mins_in)
+        np.testing.assert_array_equal(maxs, maxs_in)
+
+
+def test_float_recording_is_quantized_within_half_a_step(tmp_path):
+    rng = np.random.default_rng(10)
+    data = np.cumsum(rng.normal(0, 0.01, (3, 20000)), axis=1).astype(np.float32)
+    recording = ArrayRecording(data, 250.0, ['I', 'II', 'V1'], datetime(2024, 3, 1, 8, 15))
+    path = str(tmp_path / 'float.hstudy')
+    write_study(path, recording)
+    study = StudyRecording(path)
+    gain, _ = study.adc_scale()
+    error = np.abs(study.read(0, study.n_samples) - data)
+    assert np.all(error <= gain[:, np.newaxis] * 0.51 + 1e-6)
+    assert study.lead_names == ('I', 'II', 'V1') and study.start_time == datetime(2024, 3, 1, 8, 15)
+    # The pyramid built to find the range is stored too
+    assert study.pyramid() is not None and study.meta == {}
+
+
+def test_append_arrays_adds_and_replaces(written, tmp_path):
+    path = str(tmp_path / 'copy.hstudy')
+    with open(written[0], 'rb') as f, open(path, 'wb') as g:
+        g.write(f.read())
+    before = StudyRecording(path)
+    samples = np.array(before.read(0, before.n_samples))
+    before.close()
+
+    append_arrays(path, {'beats': np.arange(5), 'st/deviation': np.ones((2, 5), dtype=np.float32)},
+                  meta={'reviewed': True})
+    study = StudyRecording(path)
+    np.testing.assert_array_equal(study.array('beats'), np.arange(5))
+    np.testing.assert_array_equal(study.array('st/deviation'), np.ones((2, 5)))
+    np.testing.assert_array_equal(study.array('classes/peaks'), written[1]['classes/peaks'])
+    np.testing.assert_array_equal(study.read(0, study.n_samples), samples)
+    assert study.meta['reviewed'] is True and study.meta['source'] == 'study.hea'
+
+
+def test_rejects_other_files_and_object_arrays(source, tmp_path):
+    path = tmp_path / 'other.hstudy'
+    path.write_bytes(b'not a study file at all')
+    with pytest.raises(ValueError, match='Not a study file'):
+        StudyRecording(str(path))
+    with pytest.raises(ValueError, match='object array'):
+        write_study(str(tmp_path / 'objects.hstudy'), source, {'notes': np.array([{}, None], dtype=object)})
@@ -0,0 +1,61 @@
+"""Application pages, imported on first use.
+
+``PAGES`` maps each sidebar label to the module and function that render
+it. A page module, and whatever heavy libraries it needs (scipy for the
+detectors, matplotlib for reports), is only imported the first time the
+page is opened; later reruns reuse the loaded module. Import and render
+times go to the process metrics; ``timings()`` lists the import cost and
+last render time of every page opened so far.
+"""
+import importlib
+import sys
+import time
+
+import streamlit as st
+
+from holter.metrics import METRICS, observe, timer
+
+PAGES = {
+    "🏠 Home Dashboard": ('views.home', 'home_dashboard'),
+    "🔍 Quick Task Finder": ('views.task_finder', 'quick_task_finder'),
+    "🖥️ Detail Viewer": ('views.detail', 'detail_viewer_page'),
+    "💓 Atrial Fibrillation Detection": ('views.af', 'af_detection_page'),
+    "⚡ Arrhythmia Analysis": ('views.arrhythmia', 'arrhythmia_analysis_page'),
+    "📊 ST Segment Analysis": ('views.st_segment', 'st_analysis_page'),
+    "🔋 Pacemaker Analysis": ('views.pacemaker', 'pacemaker_analysis_page'),
+    "📈 HRV Analysis": ('views.hrv', 'hrv_analysis_page'),
+    "📝 Report Generation": ('views.report', 'report_generation_page'),
+    "⚙️ Settings & Rules": None,
+    "📚 Reference Guide": ('views.reference', 'reference_guide_page'),
+}
+
+
+def load(label):
+    """Import the page module for ``label`` (once) and return its render function"""
+    module_name, function = PAGES[label]
+    first = module_name not in sys.modules
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    if first:
+        observe('page_import_seconds', time.perf_counter() - started, page=label)
+    return getattr(module, function)
+
+
+def render(label):
+    """Render the page for a sidebar label, recording its render time"""
+    if PAGES.get(label) is None:
+        st.info(f"**{label}** - This section is under development")
+        return
+    page = load(label)
+    with timer('page_render_seconds', page=label):
+        page()
+
+
+def timings():
+    """``{label: {'import': seconds, 'render': seconds}}`` for the pages opened so far, last render only"""
+    result = {}
+    for name, labels, summary in METRICS.series():
+        if name in ('page_import_seconds', 'page_render_seconds'):
+            page = result.setdefault(labels['page'], {'import': 0.0, 'render': 0.0})
+            page['import' if name == 'page_import_seconds' else 'render'] = summary['last']
+    return result
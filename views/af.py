@@ -0,0 +1,337 @@
+"""Atrial Fibrillation Detection page and the ECG view with event navigation."""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from holter.af import detect_af_episodes
+from holter.annotations import EpisodeIndex
+from holter.classify import NORMAL, VENTRICULAR
+from holter.decimate import decimate_minmax
+from holter.scan import StopRules, scan_events, scan_progress
+from holter.synthetic import SyntheticHolter
+from views.charts import PLOTLY_AVAILABLE, go
+from views.common import (
+    cached_analysis, format_duration, get_active_recording, get_annotation_store, get_plot_pyramid, get_recording,
+    load_rr_series, view_model)
+
+
+def generate_sample_ecg_data():
+    """Ten seconds of synthetic lead II for demonstration, across the onset of an AF episode"""
+    recording = SyntheticHolter(3600, n_leads=2, seed=7, af_burden=0.3)
+    af = recording.truth.af
+    start = int(max(af[0, 0] - 5.0, 0.0) * recording.fs) if len(af) else 0
+    ecg = recording.read(start, start + int(10 * recording.fs), ['II'])[0]
+    return pd.DataFrame({
+        'Time (s)': np.arange(len(ecg)) / recording.fs,
+        'Lead II (mV)': ecg
+    })
+
+
+def get_active_rr_series():
+    """R-R series of the imported recording, falling back to demo data"""
+    recording = get_active_recording()
+    path = st.session_state.user_data['recording_path'] if recording is not None else None
+    return load_rr_series(path)
+
+
+def jump_to_event(path, episodes, kind, direction):
+    """Button callback: centre the ECG view on the next or previous episode of ``episodes`` or beat of a label"""
+    store = get_annotation_store(path)
+    start, stop = st.session_state.get('ecg_view', (0.0, 10.0))
+    # Step 1 ms past the centre so the event currently centred is not found again
+    reference = (start + stop) / 2 + 1e-3 * direction
+    if kind == 'AF':
+        step = episodes.next if direction > 0 else episodes.previous
+        index = step(reference)
+        target = None if index is None else episodes.starts[index]
+    else:
+        step = store.next_beat if direction > 0 else store.previous_beat
+        target = step(reference, kind)
+    if target is None:
+        st.session_state.nav_message = f"No {'earlier' if direction < 0 else 'later'} {kind} event"
+        return
+    centre_view(path, target)
+
+
+def centre_view(path, target):
+    """Move the ECG view, keeping its width, so that ``target`` seconds is in the middle"""
+    start, stop = st.session_state.get('ecg_view', (0.0, 10.0))
+    width = stop - start
+    duration = get_recording(path).duration
+    first = min(max(target - width / 2, 0.0), max(duration - width, 0.0))
+    st.session_state.ecg_view = (float(first), float(min(first + width, duration)))
+
+
+def format_offset(seconds):
+    seconds = int(seconds)
+    return f"+{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def scan_next(path, rules, verdict=None):
+    """Button callback: record the verdict on the event under review and scan on to the next one.
+
+    The scan resumes from the checkpoint of the last event, so chunks already
+    scanned are never read again; a new path or new rules start over.
+    """
+    scan = st.session_state.get('page_scan')
+    if scan is None or scan['path'] != path or scan['rules'] != rules:
+        scan = st.session_state.page_scan = {'path': path, 'rules': rules, 'checkpoint': None, 'event': None,
+                                             'reviewed': [], 'done': False}
+    if scan['event'] is not None:
+        scan['reviewed'].append(scan['event'] + (verdict,))
+    event = next(scan_events(get_recording(path), rules, scan['checkpoint']), None)
+    if event is None:
+        scan['event'], scan['done'] = None, True
+        return
+    scan['event'], scan['checkpoint'] = (event.kind, event.start, event.stop), event.checkpoint
+    centre_view(path, event.start)
+
+
+def stop_scan():
+    st.session_state.pop('page_scan', None)
+
+
+def show_page_scan(path, rules):
+    """Page-mode scan controls: stop at each auto-stop event for review, then resume"""
+    st.markdown("#### ⏯️ Page-Mode Scan")
+    if not rules.af and rules.pause is None:
+        st.caption("Enable an auto-stop rule to scan in Page mode.")
+        return
+    scan = st.session_state.get('page_scan')
+    if scan is None or scan['path'] != path or scan['rules'] != rules:
+        st.button("▶ Start scan", use_container_width=True, on_click=scan_next, args=(path, rules))
+        return
+
+    recording = get_recording(path)
+    if scan['event'] is not None:
+        kind, start, stop = scan['event']
+        st.info(f"Stopped at **{kind}** {format_offset(start)} - {format_offset(stop)} "
+                f"(scanned {scan_progress(recording, scan['checkpoint']):.1%} of the recording)")
+        buttons = st.columns(3)
+        buttons[0].button("✅ Confirm", use_container_width=True, on_click=scan_next,
+                          args=(path, rules, 'Confirmed'))
+        buttons[1].button("❌ Reject", use_container_width=True, on_click=scan_next,
+                          args=(path, rules, 'Rejected'))
+        buttons[2].button("⏹ Stop scan", use_container_width=True, on_click=stop_scan)
+    else:
+        confirmed = sum(verdict == 'Confirmed' for *_, verdict in scan['reviewed'])
+        st.success(f"Scan complete: {len(scan['reviewed'])} events reviewed, {confirmed} confirmed")
+        st.button("🔁 Restart scan", use_container_width=True, on_click=stop_scan)
+    if scan['reviewed']:
+        st.dataframe(pd.DataFrame(
+            [(kind, format_offset(start), format_offset(stop), verdict)
+             for kind, start, stop, verdict in scan['reviewed']],
+            columns=['Event', 'Start', 'End', 'Review']), use_container_width=True, hide_index=True, height=180)
+
+
+def load_plot_data(lead=0):
+    """ECG samples for the current view window, decimated server-side"""
+    recording = get_active_recording()
+    if recording is None:
+        return cached_analysis('sample_ecg', None, generate_sample_ecg_data)
+    
+    pyramid = get_plot_pyramid(st.session_state.user_data['recording_path'])
+    start, stop = st.session_state.get('ecg_view', (0.0, 10.0))
+    t, mv = pyramid.query(start, stop, lead)
+    name = recording.lead_names[recording.lead_index([lead])[0]]
+    return pd.DataFrame({'Time (s)': t, f'{name} (mV)': mv})
+
+
+def zoom_to_selection():
+    """Re-slice the ECG view to the x-range of a box selection on the chart"""
+    box = st.session_state.ecg_chart.selection.get('box')
+    recording = get_active_recording()
+    if box and recording is not None:
+        start, stop = sorted(box[0]['x'])
+        st.session_state.ecg_view = (max(float(start), 0.0), min(float(stop), recording.duration))
+
+
+def create_simple_plot(data):
+    """Create a simple plot using Streamlit's native chart or fallback"""
+    value_column = data.columns[1]
+    # Never send more than a few thousand points to the browser
+    t, mv = decimate_minmax(data['Time (s)'].to_numpy(), data[value_column].to_numpy())
+    if PLOTLY_AVAILABLE:
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=t, 
+                                y=mv,
+                                mode='lines',
+                                name=value_column.replace(' (mV)', ''),
+                                line=dict(color='#00539B', width=2)))
+        fig.update_layout(
+            title="ECG Signal",
+            xaxis_title="Time (seconds)",
+            yaxis_title="Amplitude (mV)",
+            height=400
+        )
+        return fig
+    else:
+        # Use Streamlit's native line chart
+        chart_data = pd.DataFrame({
+            'Time (s)': t,
+            value_column: mv
+        })
+        return chart_data
+
+
+@st.fragment
+def af_live_panel():
+    """Configuration, ECG and detection statistics; their widgets rerun this panel only"""
+    st.markdown("### ⚙️ Configuration Settings")
+    
+    with st.form("af_config"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            min_beats = st.slider("Minimum beats", 20, 100, 30)
+            sensitivity = st.select_slider("Sensitivity", 
+                                         options=["Low", "Medium", "High", "Very High"],
+                                         value="High")
+        with col2:
+            rr_var = st.slider("R-R variability (%)", 5, 30, 12)
+            min_duration = st.slider("Min duration (seconds)", 10, 120, 30)
+        with col3:
+            auto_stop = st.checkbox("Auto-stop at AF episodes", True)
+            pause_stop = st.checkbox("Auto-stop at pauses ≥ 2.5 s", True)
+            require_symptoms = st.checkbox("Require symptom correlation", False)
+        
+        if st.form_submit_button("💾 Save Configuration"):
+            st.success("Configuration saved successfully!")
+    
+    # Live demo section
+    st.markdown("### 📊 Live Demo")
+    
+    # Beat detection is cached; only windowing and episode merging rerun
+    # when the configuration changes.
+    params = (min_beats, rr_var, min_duration, sensitivity)
+    recording = get_active_recording()
+    path = st.session_state.user_data['recording_path'] if recording is not None else None
+    result = view_model('af_result', (path, params), lambda: detect_af_episodes(get_active_rr_series(), *params))
+    # The episodes these settings find, kept apart from the reviewer-edited
+    # episodes of the annotation store (which the Detail Viewer shows)
+    episodes = view_model('af_episodes', (path, params), lambda: EpisodeIndex.from_intervals(result.episodes))
+    
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        ecg_panel(path, episodes, StopRules(auto_stop, 2.5 if pause_stop else None, *params))
+    
+    with col2:
+        st.markdown("### Detection Statistics")
+        st.metric("AF Episodes", f"{result.count}")
+        st.metric("Total AF Duration", format_duration(result.total_duration))
+        st.metric("AF Burden", f"{result.burden:.1f}%")
+        st.metric("Longest Episode", format_duration(result.longest))
+
+
+@st.fragment
+def ecg_panel(path, episodes, rules):
+    """ECG view with event navigation and the Page-mode scan; zooming and paging rerun this panel only"""
+    recording = get_recording(path) if path else None
+    lead = 0
+    if recording is not None:
+        store = get_annotation_store(path)
+        
+        lead = st.selectbox("Lead", recording.lead_names)
+        start, stop = st.session_state.get('ecg_view', (0.0, 10.0))
+        st.session_state.ecg_view = (min(start, recording.duration), min(stop, recording.duration))
+        st.slider("View window (seconds)", 0.0, recording.duration, key='ecg_view')
+        
+        # Event navigation (Events / Detail workflow)
+        nav = st.columns(4)
+        for column, (label, kind, direction) in zip(nav, [("⏮ Previous AF", 'AF', -1),
+                                                          ("Next AF ⏭", 'AF', 1),
+                                                          ("⏮ Previous VPB", VENTRICULAR, -1),
+                                                          ("Next VPB ⏭", VENTRICULAR, 1)]):
+            column.button(label, use_container_width=True, on_click=jump_to_event,
+                          args=(path, episodes, kind, direction), key=f"nav_{kind}_{direction}")
+        message = st.session_state.pop('nav_message', None)
+        if message:
+            st.caption(message)
+        
+        show_page_scan(path, rules)
+    
+    # Sample ECG data, or the visible window of the imported recording; the
+    # decimated trace is rebuilt only when the lead or the window moves
+    view = st.session_state.get('ecg_view') if recording is not None else None
+    chart = view_model('ecg_chart', (path, lead, view), lambda: create_simple_plot(load_plot_data(lead)))
+    if PLOTLY_AVAILABLE:
+        if recording is not None:
+            # Overlay AF episodes and non-normal beat labels on the visible page
+            fig = go.Figure(chart)
+            start, stop = view
+            beat_times, beat_labels, _ = store.page(start, stop)
+            for i in episodes.overlapping(start, stop):
+                fig.add_vrect(x0=max(episodes.starts[i], start), x1=min(episodes.ends[i], stop),
+                              fillcolor='purple', opacity=0.12, line_width=0)
+            marked = beat_labels != NORMAL
+            if 0 < marked.sum() <= 500:
+                trace = chart.data[0].y
+                top = float(np.max(trace)) if len(trace) else 1.0
+                fig.add_trace(go.Scatter(x=beat_times[marked], y=np.full(marked.sum(), top),
+                                         mode='text', text=beat_labels[marked],
+                                         textfont=dict(color='#f44336'), showlegend=False))
+            # Box-select a range to zoom; the window is re-sliced server-side
+            fig.update_layout(dragmode='select')
+            st.plotly_chart(fig, use_container_width=True, key='ecg_chart',
+                            on_select=zoom_to_selection, selection_mode='box')
+        else:
+            st.plotly_chart(chart, use_container_width=True)
+    else:
+        st.line_chart(chart.set_index('Time (s)'))
+
+
+def af_detection_page():
+    """Atrial Fibrillation Detection page"""
+    st.markdown('<div class="sub-header">💓 Atrial Fibrillation Detection</div>', unsafe_allow_html=True)
+    
+    af_live_panel()
+    
+    # Step-by-step procedure
+    st.markdown("### 📋 Step-by-Step Procedure")
+    
+    steps = [
+        ("Setup Rules", "Navigate to Rules → AF Detection → Set parameters as configured above"),
+        ("Select Leads", "Choose optimal leads (typically II and V1 for best P-wave visibility)"),
+        ("Start Scan", "Begin in Retrospective mode for comprehensive analysis, or in Page mode to stop "
+                       "at each auto-stop event for review"),
+        ("Review Events", "Check Events tab for detected AF episodes (marked in purple)"),
+        ("Verify Diagnosis", "Use Detail view to confirm irregular R-R intervals and absent P waves"),
+        ("Measure Duration", "Use Caliper tool to measure exact episode duration"),
+        ("Document Burden", "Calculate AF burden = (Total AF time / Recording time) × 100%")
+    ]
+    
+    for i, (step, description) in enumerate(steps, 1):
+        st.markdown(f"""
+        <div class="task-card">
+            <div class="step-number">{i}</div>
+            <strong>{step}</strong><br>
+            {description}
+        </div>
+        """, unsafe_allow_html=True)
+    
+    # Tips and warnings
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("""
+        <div class="tip-box">
+        <strong>💡 Pro Tips:</strong>
+        <ul>
+        <li>Use "AF Evidence" view to see R-R interval tachogram</li>
+        <li>Check for Ashman phenomenon (wide QRS after long cycle)</li>
+        <li>Look for associated symptoms in patient diary</li>
+        <li>Consider CHA₂DS₂-VASc score for stroke risk</li>
+        </ul>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown("""
+        <div class="warning-box">
+        <strong>⚠️ Common Pitfalls:</strong>
+        <ul>
+        <li>Don't confuse AF with atrial flutter (regular atrial activity)</li>
+        <li>Artifact can mimic AF - verify in multiple leads</li>
+        <li>Medications (digoxin) may regularize AF</li>
+        <li>Consider sick sinus syndrome if long pauses after AF</li>
+        </ul>
+        </div>
+        """, unsafe_allow_html=True)
@@ -0,0 +1,88 @@
+"""Arrhythmia Analysis page: beat families and reviewer relabelling."""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from holter.classify import LABEL_NAMES, SUPRAVENTRICULAR, VENTRICULAR
+from views.charts import PLOTLY_AVAILABLE, go
+from views.common import get_active_recording, get_cluster_overrides, load_beat_classes
+
+
+def relabel_family(path, cluster, original):
+    """Selectbox callback: apply a family relabel before the page reruns"""
+    label = st.session_state[f"family_{cluster}"]
+    overrides = get_cluster_overrides(path)
+    if label != original:
+        overrides[cluster] = label
+    else:
+        overrides.pop(cluster, None)
+    store = st.session_state.get('annotations', {}).get(path)
+    if store is not None:
+        classes = load_beat_classes(path)
+        members = classes.clusters == cluster
+        store.beats.relabel(classes.peaks[members], classes.labels(overrides)[members])
+
+
+def arrhythmia_analysis_page():
+    """Arrhythmia Analysis page"""
+    st.markdown('<div class="sub-header">⚡ Arrhythmia Analysis</div>', unsafe_allow_html=True)
+    
+    recording = get_active_recording()
+    if recording is None:
+        st.info("Import a recording from the **Home Dashboard** to classify beats.")
+        return
+    
+    path = st.session_state.user_data['recording_path']
+    classes = load_beat_classes(path)
+    overrides = get_cluster_overrides(path)
+    labels = classes.labels(overrides)
+    v_runs = classes.runs(VENTRICULAR, overrides)
+    
+    # Beat counts
+    st.markdown("### 📊 Beat Summary")
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        st.metric("Total Beats", f"{len(labels):,}")
+    with col2:
+        st.metric("VPBs", f"{int(np.sum(labels == VENTRICULAR)):,}")
+    with col3:
+        st.metric("SVPBs", f"{int(np.sum(labels == SUPRAVENTRICULAR)):,}")
+    with col4:
+        st.metric("V Couplets", f"{int(np.sum(v_runs == 2)):,}")
+    with col5:
+        st.metric("V Runs (≥3)", f"{int(np.sum(v_runs >= 3)):,}")
+    
+    # Morphology families, largest first
+    st.markdown("### 🧬 Morphology Families")
+    st.caption("Relabel a family to reclassify every beat in it at once.")
+    codes = list(LABEL_NAMES)
+    order = np.argsort(classes.counts)[::-1][:12]
+    t_ms = (np.arange(classes.templates.shape[-1]) / classes.fs - 0.1) * 1000
+    columns = st.columns(4)
+    for i, cluster in enumerate(order):
+        with columns[i % 4]:
+            current = overrides.get(int(cluster), classes.cluster_labels[cluster])
+            st.markdown(f"**Family {cluster + 1}** · {classes.counts[cluster]:,} beats")
+            template = pd.DataFrame({'ms': t_ms, 'mV': classes.templates[cluster, 0]})
+            if PLOTLY_AVAILABLE:
+                fig = go.Figure(go.Scatter(x=template['ms'], y=template['mV'], mode='lines',
+                                           line=dict(color='#00539B', width=2)))
+                fig.update_layout(height=150, margin=dict(l=0, r=0, t=0, b=0), showlegend=False)
+                st.plotly_chart(fig, use_container_width=True, key=f"family_plot_{cluster}")
+            else:
+                st.line_chart(template.set_index('ms'), height=150)
+            st.selectbox("Label", codes, index=codes.index(current),
+                         format_func=LABEL_NAMES.get, key=f"family_{cluster}",
+                         on_change=relabel_family,
+                         args=(path, int(cluster), classes.cluster_labels[cluster]))
+    
+    st.markdown("""
+    <div class="tip-box">
+    <strong>💡 Review Tips:</strong>
+    <ul>
+    <li>Wide, bizarre families with a compensatory pause are ventricular</li>
+    <li>Normal-morphology beats arriving &gt;20% early are counted as SVPBs</li>
+    <li>Small families with low correlation are often artifact - relabel them as Unknown</li>
+    </ul>
+    </div>
+    """, unsafe_allow_html=True)
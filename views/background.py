@@ -0,0 +1,97 @@
+"""Background job panel: submitting jobs from a page, polling their progress
+and listing the session's jobs in the sidebar.
+"""
+import os
+
+import streamlit as st
+
+from holter.jobs import CANCELLED, DONE, FAILED, QUEUED, RUNNING, JobRunner
+
+JOB_POLL_SECONDS = 1.0
+
+
+@st.cache_resource
+def get_job_runner():
+    """Background job pool shared by all sessions; jobs outlive reruns and page changes"""
+    return JobRunner(max_workers=int(os.environ.get('HOLTER_JOB_WORKERS', '2')))
+
+
+def submit_job(name, fn, *args, **kwargs):
+    """Start ``fn(job, *args, **kwargs)`` in the background and list it under this session's jobs"""
+    job = get_job_runner().submit(name, fn, *args, **kwargs)
+    st.session_state.setdefault('job_ids', []).append(job.id)
+    return job
+
+
+def session_jobs():
+    """This session's jobs still known to the runner, oldest first"""
+    runner = get_job_runner()
+    jobs = [runner.get(job_id) for job_id in st.session_state.get('job_ids', [])]
+    return [job for job in jobs if job is not None]
+
+
+def cancel_job(job_id):
+    get_job_runner().cancel(job_id)
+
+
+def dismiss_job(job_id):
+    get_job_runner().forget(job_id)
+    st.session_state.job_ids = [i for i in st.session_state.get('job_ids', []) if i != job_id]
+
+
+def job_progress(job_id, key, render_partial=None):
+    """Progress bar, cancel button and partial results of a running job; reruns the page once it ends"""
+    job = get_job_runner().get(job_id)
+    if job is None or not job.active:
+        st.rerun()
+    text = f"{job.name}: {job.message or job.state}"
+    st.progress(job.progress, text=text)
+    st.button("✖ Cancel", key=f"cancel_{key}", on_click=cancel_job, args=(job_id,),
+              disabled=job.cancel_requested)
+    if render_partial is not None:
+        render_partial(job.partial)
+
+
+def show_job(job, key, render_partial=None):
+    """A job's progress (polled without rerunning the page) or its failure or cancellation"""
+    if job.active:
+        st.fragment(job_progress, run_every=JOB_POLL_SECONDS)(job.id, key, render_partial)
+    elif job.state == FAILED:
+        st.error(f"{job.name} failed: {job.error.splitlines()[0]}")
+    elif job.state == CANCELLED:
+        st.warning(f"{job.name} was cancelled after {job.elapsed:.1f} s")
+
+
+def jobs_sidebar():
+    """Running and queued jobs of this session, polled while any is active"""
+    jobs = session_jobs()
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Running", sum(job.state == RUNNING for job in jobs))
+    with col2:
+        st.metric("Queued", sum(job.state == QUEUED for job in jobs))
+    for job in reversed(jobs):
+        if job.active:
+            st.progress(job.progress, text=f"{job.name}: {job.message or job.state}")
+            st.button("✖ Cancel", key=f"sidebar_cancel_{job.id}", on_click=cancel_job, args=(job.id,),
+                      disabled=job.cancel_requested)
+        else:
+            icon = {DONE: "✅", FAILED: "❌", CANCELLED: "⏹️"}[job.state]
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                st.caption(f"{icon} {job.name} ({job.state}, {job.elapsed:.1f} s)")
+            with col2:
+                st.button("✕", key=f"dismiss_{job.id}", on_click=dismiss_job, args=(job.id,),
+                          help="Remove from the list")
+
+
+def sidebar_jobs_panel():
+    active = any(job.active for job in session_jobs())
+    st.fragment(jobs_panel_poll, run_every=JOB_POLL_SECONDS if active else None)(active)
+
+
+def jobs_panel_poll(was_active):
+    jobs_sidebar()
+    # A job finished since the page last ran: rerun it so results appear
+    if was_active and not any(job.active for job in session_jobs()):
+        st.rerun()
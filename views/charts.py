@@ -0,0 +1,7 @@
+"""Optional Plotly support shared by the chart-drawing pages."""
+try:
+    import plotly.graph_objects as go
+    PLOTLY_AVAILABLE = True
+except ImportError:
+    go = None
+    PLOTLY_AVAILABLE = False
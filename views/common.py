@@ -0,0 +1,247 @@
+"""Shared state and loaders used by several pages: the analysis cache, the
+open recording, beats, R-R series, beat classes and reviewer annotations.
+"""
+import os
+from contextlib import nullcontext
+
+import numpy as np
+import streamlit as st
+
+from holter.af import RRSeries, detect_af_episodes
+from holter.annotations import AnnotationStore, BeatAnnotations, EpisodeIndex
+from holter.cache import AnalysisCache, content_hash, make_key
+from holter.classify import BeatClasses, BeatClassifier
+from holter.decimate import MinMaxPyramid
+from holter.ingest import open_recording
+from holter.metrics import METRICS
+from holter.study import StudyRecording
+
+# Directory scanned by the batch "Quick Analysis"
+DATA_DIR = os.environ.get('HOLTER_DATA_DIR', 'data')
+
+# Metrics dump for monitoring: Prometheus text, or JSON for a .json file; empty to disable
+METRICS_FILE = os.environ.get('HOLTER_METRICS_FILE', os.path.join(DATA_DIR, 'metrics.prom'))
+METRICS_SECONDS = float(os.environ.get('HOLTER_METRICS_SECONDS', '15'))
+
+# Custom CSS (simplified version)
+CSS = """
+<style>
+    .main-header {
+        font-size: 2.5rem;
+        color: #00539B;
+        font-weight: bold;
+        text-align: center;
+        margin-bottom: 1.5rem;
+        padding-bottom: 10px;
+        border-bottom: 3px solid #00539B;
+    }
+    .sub-header {
+        font-size: 1.8rem;
+        color: #00539B;
+        font-weight: bold;
+        margin-top: 1.5rem;
+        margin-bottom: 1rem;
+        padding-left: 10px;
+        border-left: 4px solid #00539B;
+    }
+    .task-card {
+        background: linear-gradient(135deg, #f5f9ff 0%, #e6f0ff 100%);
+        padding: 20px;
+        border-radius: 10px;
+        border-left: 5px solid #00539B;
+        margin-bottom: 20px;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+    }
+    .tip-box {
+        background-color: #fff8e1;
+        padding: 15px;
+        border-radius: 8px;
+        border-left: 5px solid #ffb300;
+        margin: 15px 0;
+    }
+    .warning-box {
+        background-color: #ffebee;
+        padding: 15px;
+        border-radius: 8px;
+        border-left: 5px solid #f44336;
+        margin: 15px 0;
+    }
+    .success-box {
+        background-color: #e8f5e9;
+        padding: 15px;
+        border-radius: 8px;
+        border-left: 5px solid #4caf50;
+        margin: 15px 0;
+    }
+    .info-box {
+        background-color: #e3f2fd;
+        padding: 15px;
+        border-radius: 8px;
+        border-left: 5px solid #2196f3;
+        margin: 15px 0;
+    }
+    .step-number {
+        display: inline-block;
+        background-color: #00539B;
+        color: white;
+        width: 28px;
+        height: 28px;
+        border-radius: 50%;
+        text-align: center;
+        line-height: 28px;
+        font-weight: bold;
+        margin-right: 10px;
+    }
+</style>
+"""
+
+
+def generate_sample_rr_data(hours=24, seed=7):
+    """Generate a synthetic R-R interval series with paroxysmal AF episodes"""
+    rng = np.random.default_rng(seed)
+    n_beats = int(hours * 3600 / 0.8)
+    beat = np.arange(n_beats)
+    
+    # Sinus rhythm with a slow circadian swing and mild beat-to-beat variation
+    rr = 0.8 + 0.1 * np.sin(2 * np.pi * beat / n_beats) + 0.02 * rng.standard_normal(n_beats)
+    
+    # Paroxysmal AF: irregularly irregular and faster
+    af = np.zeros(n_beats, dtype=bool)
+    for start, length in [(0.18, 2400), (0.52, 5400), (0.81, 900)]:
+        af[int(start * n_beats):int(start * n_beats) + length] = True
+    rr[af] = np.clip(0.6 * (1 + 0.25 * rng.standard_normal(af.sum())), 0.3, 1.5)
+    
+    return np.cumsum(rr), rr
+
+
+@st.cache_resource
+def get_analysis_cache():
+    """Process-wide cache for signals, beats and analyses shared by all sessions"""
+    budget_mb = int(os.environ.get('HOLTER_CACHE_MB', '1024'))
+    cache = AnalysisCache(budget_mb * 2 ** 20)
+    METRICS.register('analysis_cache', cache.stats)
+    return cache
+
+
+@st.cache_resource
+def start_metrics_export():
+    """Start writing the process metrics to ``METRICS_FILE`` (once per process)"""
+    get_analysis_cache()
+    if METRICS_FILE:
+        return METRICS.start_export(METRICS_FILE, METRICS_SECONDS)
+
+
+def cached_analysis(kind, path, compute, spinner=None, **params):
+    """Return one analysis of a recording (or of the demo data when path is None) from the shared cache"""
+    source = content_hash(get_recording(path)) if path else 'demo'
+    key = make_key(kind, source, **params)
+    cache = get_analysis_cache()
+    with st.spinner(spinner) if spinner and key not in cache else nullcontext():
+        return cache.get_or_compute(key, compute)
+
+
+@st.cache_resource
+def get_recording(path):
+    """Open a recording once per process; the memory map is shared by all sessions"""
+    return open_recording(path)
+
+
+def get_active_recording():
+    """Return the recording imported in this session, if any"""
+    path = st.session_state.user_data.get('recording_path')
+    if not path:
+        return None
+    try:
+        return get_recording(path)
+    except (OSError, ValueError) as e:
+        st.error(f"Could not open recording: {e}")
+        return None
+
+
+def detect_recording_beats(path):
+    """Detect R peaks over a recording once; parameter changes reuse the result"""
+    def compute():
+        recording = get_recording(path)
+        if isinstance(recording, StudyRecording) and 'beats' in recording:
+            return recording.array('beats')
+        # scipy.signal is only loaded once beats are actually detected
+        from holter.detection import detect_r_peaks
+        return detect_r_peaks(recording)
+    return cached_analysis('beats', path, compute, spinner="Detecting beats...")
+
+
+def load_rr_series(path=None):
+    """R-R series for a recording, or the synthetic demo series when no path is given"""
+    def compute():
+        if path is None:
+            return RRSeries(*generate_sample_rr_data())
+        recording = get_recording(path)
+        return RRSeries.from_peaks(detect_recording_beats(path), recording.fs, recording.duration)
+    return cached_analysis('rr_series', path, compute)
+
+
+def load_beat_classes(path):
+    """Morphology families and beat labels for an imported recording"""
+    def compute():
+        recording = get_recording(path)
+        if isinstance(recording, StudyRecording) and 'classes/clusters' in recording:
+            return BeatClasses.from_arrays(recording.fs, recording.arrays('classes/'))
+        classifier = BeatClassifier(recording.fs, recording.n_leads)
+        return classifier.classify(recording, detect_recording_beats(path))
+    return cached_analysis('beat_classes', path, compute, spinner="Classifying beats...")
+
+
+def get_cluster_overrides(path):
+    """Reviewer family relabels for a recording, kept per session"""
+    return st.session_state.setdefault('cluster_overrides', {}).setdefault(path, {})
+
+
+def get_annotation_store(path):
+    """Reviewer-editable beat and episode annotations of a recording, kept per session"""
+    stores = st.session_state.setdefault('annotations', {})
+    if path not in stores:
+        recording = get_recording(path)
+        classes = load_beat_classes(path)
+        beats = BeatAnnotations(classes.peaks, classes.labels(get_cluster_overrides(path)), recording.fs)
+        episodes = EpisodeIndex.from_intervals(detect_af_episodes(load_rr_series(path)).episodes)
+        stores[path] = AnnotationStore(recording.fs, beats, episodes)
+    return stores[path]
+
+
+def view_model(name, key, build):
+    """Per-session memo for what a panel draws: ``build()`` runs again only when ``key`` changes"""
+    models = st.session_state.setdefault('view_models', {})
+    cached = models.get(name)
+    if cached is None or cached[0] != key:
+        cached = models[name] = (key, build())
+    return cached[1]
+
+
+def format_duration(seconds):
+    """Format a duration in seconds for display"""
+    if seconds >= 3600:
+        return f"{seconds / 3600:.1f} hours"
+    if seconds >= 60:
+        return f"{seconds / 60:.1f} min"
+    return f"{seconds:.0f} s"
+
+
+def get_plot_pyramid(path):
+    """Min/max decimation pyramid of a recording, built once per process"""
+    def compute():
+        recording = get_recording(path)
+        stored = recording.pyramid() if isinstance(recording, StudyRecording) else None
+        return stored or MinMaxPyramid.build(recording)
+    return cached_analysis('pyramid', path, compute, spinner="Building plot overview...")
+
+
+def display_footer():
+    """Display application footer"""
+    st.markdown("---")
+    st.markdown("""
+    <div style='text-align: center; color: #666; padding: 20px;'>
+        <p><strong>Philips Holter 1810/2010 Plus Analysis Guide v2.0</strong></p>
+        <p>For clinical reference and educational purposes only.</p>
+        <p>Always consult official Philips documentation and supervising physicians.</p>
+    </div>
+    """, unsafe_allow_html=True)
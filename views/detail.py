@@ -0,0 +1,140 @@
+"""Detail Viewer page: paged all-lead review with adjacent-page prefetch."""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from holter.classify import LABEL_NAMES, SUPRAVENTRICULAR, VENTRICULAR
+from holter.conditioning import ConditionedRecording
+from holter.decimate import decimate_minmax
+from holter.viewer import PageViewer
+from views.charts import PLOTLY_AVAILABLE, go
+from views.common import get_active_recording, get_annotation_store, get_recording
+
+
+@st.cache_resource
+def get_prefetch_pool():
+    """Threads shared by all sessions for reading the pages next to the one on screen"""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix='page-prefetch')
+
+
+@st.cache_resource
+def get_conditioned_recording(path, mains):
+    """Zero-phase 0.5-40 Hz band-pass plus mains notch view of a recording, shared by all sessions"""
+    return ConditionedRecording(get_recording(path), mains=mains)
+
+
+def get_page_viewer(path, page_seconds, mains=None):
+    """This session's Detail viewer; only one is kept so memory stays bounded"""
+    key = (path, page_seconds, mains)
+    viewer = st.session_state.get('page_viewer')
+    if viewer is None or st.session_state.get('page_viewer_key') != key:
+        if viewer is not None:
+            viewer.close()
+        recording = get_conditioned_recording(path, mains) if mains else get_recording(path)
+        viewer = PageViewer(recording, page_seconds, executor=get_prefetch_pool())
+        st.session_state.page_viewer = viewer
+        st.session_state.page_viewer_key = key
+    return viewer
+
+
+def step_detail_page(delta, n_pages):
+    """Button callback: move the Detail viewer by ``delta`` pages"""
+    page = st.session_state.get('detail_page', 1) + delta
+    st.session_state.detail_page = int(min(max(page, 1), n_pages))
+
+
+def jump_detail_page(path, label, seconds_per_page):
+    """Button callback: show the next page containing a beat with ``label``"""
+    store = get_annotation_store(path)
+    after = st.session_state.get('detail_page', 1) * seconds_per_page
+    target = store.next_beat(after, label)
+    if target is None:
+        st.session_state.nav_message = f"No later {LABEL_NAMES[label]} beat"
+    else:
+        st.session_state.detail_page = int(target // seconds_per_page) + 1
+
+
+def detail_viewer_page():
+    """Detail Viewer page"""
+    st.markdown('<div class="sub-header">🖥️ Detail Viewer</div>', unsafe_allow_html=True)
+    
+    recording = get_active_recording()
+    if recording is None:
+        st.info("Import a recording from the **Home Dashboard** to page through it.")
+        return
+    
+    detail_panel(st.session_state.user_data['recording_path'])
+
+
+@st.fragment
+def detail_panel(path):
+    """Page controls and the all-lead page; paging reruns this panel only"""
+    recording = get_recording(path)
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        page_seconds = st.selectbox("Page length (seconds)", [5, 10, 20, 30, 60], index=1)
+    with col2:
+        mains = st.selectbox("Filter", [None, 50.0, 60.0],
+                             format_func=lambda f: "Off" if f is None else f"0.5-40 Hz, {f:.0f} Hz notch")
+    previous = st.session_state.get('page_viewer')
+    previous_key = st.session_state.get('page_viewer_key')
+    viewer = get_page_viewer(path, float(page_seconds), mains)
+    if previous is not None and previous is not viewer and previous_key[0] == path:
+        # Page length or filter changed: stay at the same time in the recording
+        seconds = (st.session_state.get('detail_page', 1) - 1) * previous.page_seconds
+        st.session_state.detail_page = viewer.page_of(seconds) + 1
+    n_pages = viewer.n_pages
+    st.session_state.detail_page = min(st.session_state.get('detail_page', 1), n_pages)
+    with col3:
+        st.number_input(f"Page (of {n_pages:,})", 1, n_pages, key='detail_page')
+    
+    nav = st.columns(4)
+    nav[0].button("◀ Previous Page", use_container_width=True, on_click=step_detail_page, args=(-1, n_pages))
+    nav[1].button("Next Page ▶", use_container_width=True, on_click=step_detail_page, args=(1, n_pages))
+    nav[2].button("Next VPB ⏭", use_container_width=True, on_click=jump_detail_page,
+                  args=(path, VENTRICULAR, float(page_seconds)))
+    nav[3].button("Next SVPB ⏭", use_container_width=True, on_click=jump_detail_page,
+                  args=(path, SUPRAVENTRICULAR, float(page_seconds)))
+    message = st.session_state.pop('nav_message', None)
+    if message:
+        st.caption(message)
+    
+    started = time.perf_counter()
+    page = viewer.page(st.session_state.detail_page - 1)
+    loaded_ms = (time.perf_counter() - started) * 1000
+    start, stop = page.start / recording.fs, page.stop / recording.fs
+    store = get_annotation_store(path)
+    beat_times, beat_labels, episodes = store.page(start, stop)
+    
+    # All leads stacked with a fixed vertical offset
+    spacing = 3.0
+    times = page.times
+    if PLOTLY_AVAILABLE:
+        fig = go.Figure()
+        for i, name in enumerate(recording.lead_names):
+            t, mv = decimate_minmax(times, page.data[i])
+            fig.add_trace(go.Scatter(x=t, y=mv - i * spacing, mode='lines', name=name,
+                                     line=dict(color='#00539B', width=1)))
+        for i in episodes:
+            fig.add_vrect(x0=max(store.episodes.starts[i], start), x1=min(store.episodes.ends[i], stop),
+                          fillcolor='purple', opacity=0.12, line_width=0)
+        fig.add_trace(go.Scatter(x=beat_times, y=np.full(len(beat_times), spacing / 2), mode='text',
+                                 text=beat_labels, textfont=dict(color='#f44336'), showlegend=False))
+        fig.update_layout(
+            height=120 + 90 * recording.n_leads, showlegend=False,
+            xaxis_title="Time (s)", margin=dict(l=0, r=0, t=10, b=0),
+            yaxis=dict(tickvals=[-i * spacing for i in range(recording.n_leads)],
+                       ticktext=list(recording.lead_names), showgrid=False)
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.line_chart(pd.DataFrame(page.data.T, index=times, columns=list(recording.lead_names)))
+    
+    counts = {label: int(np.sum(beat_labels == label)) for label in LABEL_NAMES}
+    st.caption(f"{timedelta(seconds=int(start))} - {timedelta(seconds=int(stop))} · {len(beat_times)} beats "
+               f"({counts[VENTRICULAR]} V, {counts[SUPRAVENTRICULAR]} S) · "
+               f"{len(episodes)} AF episode(s) · page read in {loaded_ms:.1f} ms")
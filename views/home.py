@@ -0,0 +1,228 @@
+"""Home dashboard: recording import, study files and the batch Quick Analysis."""
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from holter.cache import make_key
+from holter.metrics import METRICS, STAGE, memory_usage
+from holter.study import STUDY_EXTENSION, StudyRecording, write_study
+from views.background import get_job_runner, show_job, submit_job
+from views.common import (
+    DATA_DIR, METRICS_FILE, METRICS_SECONDS, cached_analysis, detect_recording_beats, format_duration,
+    get_active_recording, get_analysis_cache, get_plot_pyramid, get_recording, load_beat_classes)
+
+
+def generate_sample_patient_data(n=5):
+    """Generate sample patient data, one column at a time"""
+    rng = np.random.default_rng()
+    number = pd.Series(np.arange(n))
+    return pd.DataFrame({
+        'ID': 'PAT-' + (number + 1000).astype(str),
+        'Name': 'Patient ' + (number + 1).astype(str),
+        'Age': rng.integers(40, 85, n),
+        'Gender': rng.choice(['M', 'F'], n),
+        'Recording Duration': pd.Series(rng.integers(24, 168, n)).astype(str) + ' hours',
+        'Status': rng.choice(['Completed', 'In Progress', 'Pending Review'], n)
+    })
+
+
+def quick_analysis_job(job, paths, out_dir, cache):
+    """Batch-analyse recordings, reporting each finished study as a partial result"""
+    from holter.batch import run_batch
+    progress = dict.fromkeys(paths, 0.0)
+    events = run_batch(paths, out_dir=out_dir)
+    try:
+        for event in events:
+            progress[event.path] = event.progress
+            job.update(sum(progress.values()) / len(paths), f"{os.path.basename(event.path)}: {event.state}")
+            if event.state == 'done':
+                result = event.result
+                # Seed the shared cache so the analysis pages reuse the beats
+                cache.put(make_key('beats', result['content_hash']), result.pop('peaks'))
+                job.add_partial({
+                    'Recording': os.path.basename(result['path']),
+                    'Duration': format_duration(result['duration']),
+                    'Beats': result['beats'],
+                    'Mean HR': round(result['mean_hr']),
+                    'AF Episodes': result['af_episodes'],
+                    'AF Burden (%)': round(result['af_burden'], 1),
+                    'Error': ''
+                })
+            elif event.state == 'failed':
+                job.add_partial({'Recording': os.path.basename(event.path), 'Error': str(event.result)})
+    finally:
+        events.close()
+    return job.partial
+
+
+def start_quick_analysis():
+    """Analyse every recording in the data directory as a background job"""
+    # holter.batch pulls in the detectors (scipy); only load it when a batch is started
+    from holter.batch import find_recordings
+    paths = find_recordings(DATA_DIR)
+    if not paths:
+        st.warning(f"No recordings (.edf, .hea) found in `{DATA_DIR}`. "
+                   "Set HOLTER_DATA_DIR to the worklist directory.")
+        return
+    job = submit_job(f"Quick analysis ({len(paths)} studies)", quick_analysis_job, paths,
+                     os.path.join(DATA_DIR, 'results'), get_analysis_cache())
+    st.session_state.quick_analysis_job = job.id
+
+
+def show_batch_rows(rows):
+    if rows:
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+
+def show_quick_analysis():
+    """Progress and per-study results of the session's quick analysis"""
+    job_id = st.session_state.get('quick_analysis_job')
+    job = get_job_runner().get(job_id) if job_id else None
+    if job is None:
+        return
+    show_job(job, 'quick_analysis', show_batch_rows)
+    if not job.active:
+        rows = job.partial
+        analysed = sum(not row['Error'] for row in rows)
+        st.caption(f"{analysed} studies analysed in {job.elapsed:.1f} s")
+        show_batch_rows(rows)
+
+
+def import_recording_form():
+    """Form for selecting an EDF/EDF+ or WFDB recording on disk"""
+    with st.form("import_recording"):
+        path = st.text_input("Recording file (.edf, .hea, .dat or .hstudy)",
+                             st.session_state.user_data.get('recording_path') or "")
+        if st.form_submit_button("📂 Open Recording"):
+            st.session_state.user_data['recording_path'] = path.strip() or None
+    
+    recording = get_active_recording()
+    if recording is not None:
+        hours = recording.duration / 3600
+        st.success(f"**Loaded:** {recording.n_leads} leads "
+                   f"({', '.join(recording.lead_names)}) at {recording.fs:g} Hz, "
+                   f"{hours:.1f} hours")
+        if not isinstance(recording, StudyRecording):
+            if st.button("💾 Save as Study File", help="Store samples, beats and beat classes "
+                         "in one file that reopens without re-analysis"):
+                target = save_study(st.session_state.user_data['recording_path'])
+                st.success(f"Saved `{target}` - open it next time to skip decoding and analysis.")
+
+
+def save_study(path):
+    """Write a recording with its beats, beat classes and plot overview to a study file"""
+    target = os.path.splitext(path)[0] + STUDY_EXTENSION
+    arrays = {'beats': detect_recording_beats(path)}
+    arrays.update({f'classes/{name}': values for name, values in load_beat_classes(path).to_arrays().items()})
+    pyramid = get_plot_pyramid(path)
+    with st.spinner("Writing study file..."):
+        write_study(target, get_recording(path), arrays, pyramid,
+                    meta={'source': os.path.basename(path), 'saved': datetime.now().isoformat()})
+    return target
+
+
+def show_performance():
+    """Stage and page timings of this server process, slowest in total first"""
+    rows = []
+    for name, labels, summary in METRICS.series():
+        if name == STAGE:
+            kind, label = 'Stage', labels['stage']
+        elif name == 'page_render_seconds':
+            kind, label = 'Page', labels['page']
+        else:
+            continue
+        rows.append({'Kind': kind, 'Name': label, 'Calls': summary['count'], 'Last (s)': summary['last'],
+                     'p50 (s)': summary['p50'], 'p95 (s)': summary['p95'], 'Max (s)': summary['max'],
+                     'Total (s)': summary['sum']})
+    if not rows:
+        return
+    table = pd.DataFrame(rows).sort_values('Total (s)', ascending=False)
+    stages = table[table['Kind'] == 'Stage']
+    st.markdown("**⏱️ Performance** (percentiles over the latest samples of each series)")
+    if len(stages):
+        slowest = stages.iloc[0]
+        st.caption(f"Most time spent in **{slowest['Name']}**: {slowest['Total (s)']:.1f} s over "
+                   f"{slowest['Calls']} calls (p95 {slowest['p95 (s)']:.2f} s)")
+    st.dataframe(table.round(3), use_container_width=True, hide_index=True)
+    if METRICS_FILE:
+        st.caption(f"Metrics are written to `{METRICS_FILE}` every {METRICS_SECONDS:g} s.")
+
+
+def home_dashboard():
+    """Home dashboard page"""
+    st.markdown(f"### 👋 Welcome, {st.session_state.user_data['role']}!")
+    
+    # Dashboard metrics
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Active Patients", "24", "+3")
+    with col2:
+        st.metric("Pending Reviews", "8", "-2")
+    with col3:
+        st.metric("Analysis Complete", "94%", "+4%")
+    with col4:
+        st.metric("Tasks Today", "12", "3 new")
+    
+    # Quick start section
+    st.markdown('<div class="sub-header">🚀 Quick Start</div>', unsafe_allow_html=True)
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.button("📁 Import Data", use_container_width=True):
+            st.session_state.show_import = True
+    with col2:
+        quick_analysis = st.button("🔍 Quick Analysis", use_container_width=True)
+    with col3:
+        if st.button("📄 Generate Report", use_container_width=True):
+            st.info("Report generation started...")
+    
+    if st.session_state.get('show_import'):
+        import_recording_form()
+    if quick_analysis:
+        start_quick_analysis()
+    show_quick_analysis()
+    
+    # Recent patients
+    st.markdown('<div class="sub-header">👥 Recent Patients</div>', unsafe_allow_html=True)
+    patient_df = cached_analysis('sample_patients', None, generate_sample_patient_data)
+    st.dataframe(patient_df, use_container_width=True, hide_index=True)
+    
+    # System status
+    st.markdown('<div class="sub-header">🖥️ System Status</div>', unsafe_allow_html=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.info("**Software Version:** 2.0.0")
+        st.info("**Last Backup:** Today 02:00 AM")
+    with col2:
+        memory = memory_usage()
+        if memory['rss_bytes'] is not None:
+            share = (f" ({memory['rss_bytes'] / memory['physical_memory_bytes']:.1%} of "
+                     f"{memory['physical_memory_bytes'] / 2 ** 30:.0f} GB)")
+            peak = f", peak {memory['peak_rss_bytes'] / 2 ** 20:.0f} MB" if memory['peak_rss_bytes'] else ""
+            st.info(f"**Memory Usage:** {memory['rss_bytes'] / 2 ** 20:.0f} MB{share}{peak}")
+        elif memory['peak_rss_bytes'] is not None:
+            st.info(f"**Memory Usage:** peak {memory['peak_rss_bytes'] / 2 ** 20:.0f} MB")
+        cache_stats = get_analysis_cache().stats()
+        st.info(f"**Analysis Cache:** {cache_stats['bytes'] / 2 ** 20:.0f} of "
+                f"{cache_stats['max_bytes'] / 2 ** 20:.0f} MB, "
+                f"{cache_stats['hit_rate']:.0%} hit rate "
+                f"({cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                f"{cache_stats['evictions']} evictions)")
+    show_performance()
+    
+    # Quick tips
+    st.markdown("""
+    <div class="tip-box">
+    <strong>💡 Quick Tips:</strong>
+    <ul>
+    <li>Use <strong>Retrospective mode</strong> for comprehensive AF detection</li>
+    <li>Always verify automated detections with manual review</li>
+    <li>Check patient diary entries when reviewing events</li>
+    <li>Export reports in both PDF and HL7 formats</li>
+    </ul>
+    </div>
+    """, unsafe_allow_html=True)
@@ -0,0 +1,110 @@
+"""HRV Analysis page."""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from holter.classify import NORMAL
+from holter.hrv import HRVEngine
+from holter.metrics import timed
+from views.charts import PLOTLY_AVAILABLE, go
+from views.common import (
+    cached_analysis, get_active_recording, get_cluster_overrides, get_recording, load_beat_classes, load_rr_series)
+
+
+def load_hrv(path=None):
+    """HRV summary and 5-minute segment table, fed to the engine an hour of beats at a time.
+
+    For an imported recording, intervals touching a beat the classifier (with
+    the reviewer's family relabels) did not call normal are left out of the NN
+    series, on top of the engine's own plausibility check.
+    """
+    overrides = get_cluster_overrides(path) if path else {}
+    def compute():
+        series = load_rr_series(path)
+        with timed('hrv'):
+            engine = HRVEngine()
+            hours = np.append(np.arange(0, series.duration, 3600), np.inf)
+            bounds = np.searchsorted(series.times, hours)
+            for lo, hi in zip(bounds[:-1], bounds[1:]):
+                engine.add_beats(series.times[lo:hi], series.rr[lo:hi])
+            if path is not None and len(series):
+                classes = load_beat_classes(path)
+                ectopic = classes.labels(overrides) != NORMAL
+                # Each interval runs from the peak before its end beat to the end beat
+                end = np.searchsorted(classes.peaks / get_recording(path).fs, series.times)
+                end = np.clip(end, 1, len(ectopic) - 1)
+                engine.set_normal(np.flatnonzero(ectopic[end] | ectopic[end - 1]), False)
+            return engine.summary(), engine.segments()
+    return cached_analysis('hrv', path, compute, spinner="Computing HRV...",
+                           overrides=tuple(sorted(overrides.items())))
+
+
+def hrv_analysis_page():
+    """Heart Rate Variability page"""
+    st.markdown('<div class="sub-header">📈 HRV Analysis</div>', unsafe_allow_html=True)
+    
+    recording = get_active_recording()
+    path = st.session_state.user_data['recording_path'] if recording is not None else None
+    summary, segments = load_hrv(path)
+    if path is None:
+        st.caption("Showing a synthetic 24-hour demo series. Import a recording from the Home Dashboard to analyse it.")
+    
+    # Time domain
+    st.markdown("### ⏱️ Time Domain")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("SDNN", f"{summary['sdnn']:.0f} ms")
+        st.metric("pNN50", f"{summary['pnn50']:.1f}%")
+    with col2:
+        st.metric("SDANN", f"{summary['sdann']:.0f} ms")
+        st.metric("Mean NN", f"{summary['mean_nn']:.0f} ms")
+    with col3:
+        st.metric("SDNN Index", f"{summary['sdnn_index']:.0f} ms")
+        st.metric("NN Intervals", f"{summary['nn_count']:,}")
+    with col4:
+        st.metric("RMSSD", f"{summary['rmssd']:.0f} ms")
+    
+    # Frequency domain
+    st.markdown("### 🌊 Frequency Domain (5-minute segments)")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("LF Power", f"{summary['lf']:.0f} ms²")
+    with col2:
+        st.metric("HF Power", f"{summary['hf']:.0f} ms²")
+    with col3:
+        st.metric("LF/HF Ratio", f"{summary['lf_hf']:.2f}")
+    
+    # Trend over the recording
+    st.markdown("### 📊 Segment Trend")
+    trend = pd.DataFrame({
+        'Time (h)': segments['start'] / 3600,
+        'SDNN (ms)': segments['sdnn'],
+        'RMSSD (ms)': segments['rmssd'],
+        'LF/HF': segments['lf'] / segments['hf']
+    })
+    if PLOTLY_AVAILABLE:
+        fig = go.Figure()
+        for column in ['SDNN (ms)', 'RMSSD (ms)']:
+            fig.add_trace(go.Scatter(x=trend['Time (h)'], y=trend[column], mode='lines', name=column))
+        fig.add_trace(go.Scatter(x=trend['Time (h)'], y=trend['LF/HF'], mode='lines',
+                                 name='LF/HF', yaxis='y2', line=dict(dash='dot')))
+        fig.update_layout(
+            xaxis_title="Time (hours)",
+            yaxis_title="ms",
+            yaxis2=dict(title="LF/HF", overlaying='y', side='right'),
+            height=400
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.line_chart(trend.set_index('Time (h)'))
+    
+    st.markdown("""
+    <div class="tip-box">
+    <strong>💡 Interpretation:</strong>
+    <ul>
+    <li>24-hour SDNN &lt;50 ms indicates markedly depressed HRV; &gt;100 ms is normal</li>
+    <li>Ectopic beats and artifact are excluded from NN intervals before analysis</li>
+    <li>Frequency-domain values are only reliable in sinus rhythm - exclude AF periods</li>
+    </ul>
+    </div>
+    """, unsafe_allow_html=True)
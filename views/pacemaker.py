@@ -0,0 +1,94 @@
+"""Pacemaker Analysis page."""
+import pandas as pd
+import streamlit as st
+
+from holter.pacing import MIN_PACING_FS, detect_pacing_spikes, link_spikes_to_beats
+from views.common import cached_analysis, detect_recording_beats, format_duration, get_active_recording, get_recording
+
+
+def load_pacing(path, pacing_path, lead, slope_threshold, amplitude_threshold):
+    """Pacing spikes from a high-rate channel linked to the beats of an imported recording"""
+    def compute():
+        recording = get_recording(path)
+        spikes = detect_pacing_spikes(get_recording(pacing_path), lead=lead,
+                                      slope_threshold=slope_threshold,
+                                      amplitude_threshold=amplitude_threshold)
+        return link_spikes_to_beats(spikes, detect_recording_beats(path) / recording.fs)
+    return cached_analysis('pacing', path, compute, spinner="Detecting pacing spikes...",
+                           pacing=pacing_path, lead=lead, slope=slope_threshold,
+                           amplitude=amplitude_threshold)
+
+
+def pacemaker_analysis_page():
+    """Pacemaker Analysis page"""
+    st.markdown('<div class="sub-header">🔋 Pacemaker Analysis</div>', unsafe_allow_html=True)
+    
+    recording = get_active_recording()
+    if recording is None:
+        st.info("Import a recording from the **Home Dashboard** to analyse pacing.")
+        return
+    
+    path = st.session_state.user_data['recording_path']
+    
+    # Pacing channel source
+    st.markdown("### ⚙️ Pacing Channel")
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        pacing_path = st.text_input("High-rate pacing channel (.edf, .hea)", value=path,
+                                    help="Defaults to the imported recording")
+    try:
+        pacing = get_recording(pacing_path)
+    except (OSError, ValueError) as e:
+        st.error(f"Could not open pacing channel: {e}")
+        return
+    with col2:
+        lead = st.selectbox("Channel", range(pacing.n_leads), format_func=lambda i: pacing.lead_names[i])
+    col1, col2 = st.columns(2)
+    with col1:
+        slope = st.number_input("Slope threshold (mV/ms)", 0.5, 20.0, 2.0, 0.5)
+    with col2:
+        amplitude = st.number_input("Amplitude threshold (mV)", 0.1, 5.0, 0.5, 0.1)
+    
+    if pacing.fs < MIN_PACING_FS:
+        st.warning(f"The pacing channel is sampled at {pacing.fs:.0f} Hz. Pacing spikes need at least "
+                   f"{MIN_PACING_FS:.0f} Hz - select the recorder's high-rate pacing channel.")
+        return
+    
+    result = load_pacing(path, pacing_path, lead, slope, amplitude)
+    counts = result.counts
+    
+    # Pacing summary
+    st.markdown("### 📊 Pacing Summary")
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        st.metric("Pacing Spikes", f"{counts['spikes']:,}")
+    with col2:
+        st.metric("Paced Beats", f"{counts['paced_percent']:.1f}%")
+    with col3:
+        st.metric("Loss of Capture", f"{counts['loss_of_capture']:,}")
+    with col4:
+        st.metric("Undersensing", f"{counts['undersensing']:,}")
+    with col5:
+        st.metric("Oversensing", f"{counts['oversensing']:,}")
+    
+    # Non-captured spikes, for review
+    failures = result.spikes[~result.captured]
+    st.markdown("### ⚠️ Non-Captured Spikes")
+    if len(failures):
+        st.dataframe(pd.DataFrame({'Time': [format_duration(t) for t in failures[:500]]}),
+                     use_container_width=True, hide_index=True)
+        if len(failures) > 500:
+            st.caption(f"Showing the first 500 of {len(failures):,} non-captured spikes.")
+    else:
+        st.success("Every pacing spike was followed by a captured beat.")
+    
+    st.markdown("""
+    <div class="tip-box">
+    <strong>💡 Review Tips:</strong>
+    <ul>
+    <li>Loss of capture: a spike with no QRS within 250 ms</li>
+    <li>Undersensing: a spike delivered shortly after an intrinsic beat the device should have sensed</li>
+    <li>Oversensing: a pause longer than the lower rate interval with no pacing spike</li>
+    </ul>
+    </div>
+    """, unsafe_allow_html=True)
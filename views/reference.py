@@ -0,0 +1,64 @@
+"""Reference Guide page."""
+import pandas as pd
+import streamlit as st
+
+# Reference tables, built once per process
+HR_PARAMETERS = pd.DataFrame({
+    'Parameter': ['Normal Sinus Rhythm', 'Bradycardia', 'Tachycardia', 
+                 'Maximum HR (Age-predicted)', 'Nighttime HR Drop'],
+    'Range': ['60-100 bpm', '<60 bpm', '>100 bpm', 
+             '220 - Age', '10-20% decrease'],
+    'Clinical Note': ['Regular rhythm, normal P waves', 
+                     'Check for sinus vs. junctional',
+                     'Assess for sinus vs. pathological',
+                     'Use for exercise assessment',
+                     'Abnormal if <10% (loss of circadian)']
+})
+
+ECG_INTERVALS = pd.DataFrame({
+    'Interval': ['PR Interval', 'QRS Duration', 'QT Interval', 'QTc (Bazett)', 'RR Interval'],
+    'Normal': ['120-200 ms', '<120 ms', '<440 ms (M), <460 ms (F)', '<450 ms (M), <470 ms (F)', '600-1000 ms'],
+    'Measurement Lead': ['II', 'Any clear lead', 'II or V5', 'II or V5', 'Any lead']
+})
+
+ARRHYTHMIA_CLASSES = {
+    'Supraventricular': {
+        'Atrial Fibrillation': 'Irregularly irregular, no P waves',
+        'Atrial Flutter': 'Sawtooth pattern, atrial rate 250-350 bpm',
+        'SVT': 'Regular, rate 150-250 bpm, narrow QRS',
+    },
+    'Ventricular': {
+        'PVC': 'Wide QRS, bizarre morphology',
+        'VT': 'Wide QRS, rate >100 bpm',
+        'VF': 'Chaotic, no organized QRS',
+    },
+}
+
+
+def reference_guide_page():
+    """Reference Guide page"""
+    st.markdown('<div class="sub-header">📚 Reference Guide</div>', unsafe_allow_html=True)
+    
+    # Quick Reference Tables
+    st.markdown("### 📊 Normal Values & Thresholds")
+    
+    st.dataframe(HR_PARAMETERS, use_container_width=True, hide_index=True)
+    
+    # Interval Reference
+    st.markdown("### ⏱️ ECG Interval Reference")
+    
+    st.dataframe(ECG_INTERVALS, use_container_width=True, hide_index=True)
+    
+    # Arrhythmia Classification
+    st.markdown("### 💓 Arrhythmia Classification")
+    
+    columns = st.columns(len(ARRHYTHMIA_CLASSES))
+    for column, (group, rhythms) in zip(columns, ARRHYTHMIA_CLASSES.items()):
+        with column:
+            st.markdown(f"**{group}:**\n" + "\n".join(f"- {name}: {features}" for name, features in rhythms.items()))
+    
+    # Downloadable resources
+    st.markdown("### 📥 Resources")
+    
+    if st.button("📋 Download Quick Reference Card", use_container_width=True):
+        st.success("Quick reference guide would be downloaded here!")
@@ -0,0 +1,337 @@
+"""Report Generation page: statistics, background report export and full disclosure."""
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from holter.af import detect_af_episodes
+from holter.classify import NORMAL, SUPRAVENTRICULAR, VENTRICULAR
+from holter.disclosure import FORMATS, Layout, MATPLOTLIB_AVAILABLE, render_full_disclosure
+from holter.jobs import DONE
+from holter.report import (
+    FORMATS as REPORT_FORMATS, MATPLOTLIB_AVAILABLE as PDF_AVAILABLE, MIME_TYPES, ReportModel, export_report,
+    warm_up as warm_up_report_workers)
+from holter.stats import HolterStatistics
+from views.background import get_job_runner, show_job, submit_job
+from views.common import (
+    DATA_DIR, cached_analysis, get_active_recording, get_annotation_store, get_cluster_overrides, get_recording,
+    load_beat_classes, load_rr_series, view_model)
+
+
+def load_statistics(path=None):
+    """Report statistics, fed to the engine an hour of beats at a time; demo data when no path is given"""
+    overrides = get_cluster_overrides(path) if path else {}
+    def compute():
+        series = load_rr_series(path)
+        if path is None:
+            stats, times, labels = HolterStatistics(series.duration), series.times, None
+        else:
+            recording = get_recording(path)
+            classes = load_beat_classes(path)
+            stats = HolterStatistics(recording.duration, recording.start_time)
+            times, labels = classes.peaks / recording.fs, classes.labels(overrides)
+        hours = np.append(np.arange(0, series.duration, 3600), np.inf)
+        bounds = np.searchsorted(times, hours)
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            stats.add_beats(times[lo:hi], None if labels is None else labels[lo:hi])
+        stats.set_af_episodes(detect_af_episodes(series).episodes)
+        return stats
+    return cached_analysis('statistics', path, compute, spinner="Computing statistics...",
+                           overrides=tuple(sorted(overrides.items())))
+
+
+def format_rate(bpm):
+    return "-" if np.isnan(bpm) else f"{bpm:.0f} bpm"
+
+
+def format_clock(recording, seconds):
+    """Clock time of an offset into the recording, or elapsed time when the start is unknown"""
+    if recording is None or recording.start_time is None:
+        return f"+{int(seconds // 3600):02d}:{int(seconds // 60 % 60):02d}"
+    return (recording.start_time + timedelta(seconds=seconds)).strftime('%a %H:%M')
+
+
+def clamp_rate(bpm, low, high, default):
+    """Whole-bpm value within a widget's bounds; ``default`` when no rate could be measured"""
+    return default if np.isnan(bpm) else int(np.clip(round(bpm), low, high))
+
+
+def disclosure_job(job, recording, store, layout):
+    def progress(done, total):
+        job.update(done / total, f"{done} of {total} pages")
+    return render_full_disclosure(recording, store, os.path.join(DATA_DIR, 'disclosure'), layout, progress=progress)
+
+
+def start_disclosure(path, layout):
+    """Render (or reuse) the full-disclosure pages of a recording as a background job"""
+    job = submit_job("Full disclosure", disclosure_job, get_recording(path), get_annotation_store(path), layout)
+    st.session_state.disclosure_job = job.id
+
+
+@st.cache_resource
+def get_report_pools():
+    """Writer threads and chart-rendering processes shared by all sessions"""
+    charts = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn'))
+    # Start the chart workers now, while the report form is being filled in
+    for _ in range(2):
+        charts.submit(warm_up_report_workers)
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix='report-writer'), charts
+
+
+def report_export_job(job, model, formats, out_dir, include_graphs, anonymize, writers, charts):
+    def progress(done, total):
+        job.update(done / total, f"{done} of {total} outputs")
+    return export_report(model, formats, out_dir, include_graphs, anonymize, writers, charts, progress)
+
+
+def start_report_export(model, formats, include_graphs, anonymize):
+    """Write a report as a background job; the page shows its progress and then its downloads"""
+    if not formats:
+        st.warning("Select at least one export format.")
+        return
+    writers, charts = get_report_pools()
+    out_dir = os.path.join(DATA_DIR, 'reports')
+    os.makedirs(out_dir, exist_ok=True)
+    job = submit_job("Report export", report_export_job, model, list(formats),
+                     tempfile.mkdtemp(prefix='report-', dir=out_dir), include_graphs, anonymize, writers, charts)
+    st.session_state.report_export = {'job_id': job.id, 'formats': list(formats)}
+
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def zip_files(paths, target, names=None, compression=zipfile.ZIP_DEFLATED):
+    """Archive ``paths`` into the ZIP file ``target`` (once, on disk) and return its bytes.
+
+    Members are copied from disk in blocks, so only the finished archive is
+    ever read into memory, as Streamlit serves downloads from memory.
+    """
+    if not os.path.exists(target):
+        partial_path = f'{target}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with zipfile.ZipFile(partial_path, 'w', compression) as archive:
+            for path, name in zip(paths, names or [os.path.basename(path) for path in paths]):
+                archive.write(path, name)
+        os.replace(partial_path, target)
+    return read_file(target)
+
+
+def show_report_export():
+    """Progress of the session's report export, then its downloads"""
+    export = st.session_state.get('report_export')
+    job = get_job_runner().get(export['job_id']) if export else None
+    if job is None:
+        return
+    show_job(job, 'report')
+    if job.state != DONE:
+        return
+    outputs, elapsed = job.result, job.elapsed
+    st.success(f"✅ Report generated in {elapsed:.1f} s")
+    cols = st.columns(len(export['formats']) + 1)
+    for col, name in zip(cols, export['formats']):
+        with col:
+            # Files are read only when their button is clicked, off the script thread
+            st.download_button(f"📥 {name}", data=partial(read_file, outputs[name]),
+                               file_name=os.path.basename(outputs[name]), mime=MIME_TYPES[name],
+                               key=f"report_download_{name}")
+    with cols[-1]:
+        out_dir = os.path.dirname(outputs[export['formats'][0]])
+        st.download_button("📦 All (ZIP)", data=partial(zip_files, list(outputs.values()), out_dir + '.zip'),
+                           file_name=os.path.basename(out_dir) + '.zip',
+                           mime="application/zip", key="report_download_zip")
+    charts = [path for name, path in outputs.items() if name not in export['formats']]
+    if charts:
+        st.image(charts, use_container_width=True)
+
+
+@st.fragment
+def report_configuration():
+    """Report type, options and physician; editing them reruns this panel only"""
+    st.markdown("### ⚙️ Report Configuration")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        report_type = st.selectbox("Report Type", 
+                                 ["Standard", "Comprehensive", "Summary", "Pacemaker"])
+        include_graphs = st.checkbox("Include Graphs", True)
+        anonymize = st.checkbox("Anonymize Data", False)
+    with col2:
+        # PDF needs matplotlib; without it, offer only the formats that can be written
+        formats = [name for name in REPORT_FORMATS if name != 'PDF' or PDF_AVAILABLE]
+        export_format = st.multiselect("Export Format", 
+                                     formats,
+                                     default=[formats[0]])
+        physician_name = st.text_input("Physician Name", "Dr. Smith")
+    return report_type, include_graphs, anonymize, export_format, physician_name
+
+
+@st.fragment
+def patient_panel():
+    col1, col2 = st.columns(2)
+    with col1:
+        patient_id = st.text_input("Patient ID", "PAT-2024-001")
+        patient_name = st.text_input("Patient Name", "John Doe")
+    with col2:
+        patient_age = st.number_input("Age", 18, 120, 65)
+        patient_gender = st.selectbox("Gender", ["Male", "Female", "Other"])
+    return {'id': patient_id, 'name': patient_name, 'age': patient_age, 'gender': patient_gender}
+
+
+@st.fragment
+def findings_panel():
+    findings = st.text_area("Clinical Findings", 
+                          "Sinus rhythm with intermittent atrial fibrillation. Occasional VPBs. No significant ST segment changes.", 
+                          height=100)
+    diagnosis = st.text_input("Diagnosis", "Paroxysmal Atrial Fibrillation")
+    return findings, diagnosis
+
+
+def statistics_tables(recording, stats):
+    """Heart-rate trend and hourly table of the report statistics"""
+    minutes = stats.minutes()
+    trend = pd.DataFrame({'Time (h)': minutes['start'] / 3600, 'HR (bpm)': minutes['hr']})
+    hours = stats.hours()
+    table = pd.DataFrame({
+        'Hour': [format_clock(recording, start) for start in hours['start']],
+        'Beats': hours['beats'],
+        'Mean HR': np.round(hours['mean_hr']),
+        'Min HR': np.round(hours['min_hr']),
+        'Max HR': np.round(hours['max_hr']),
+        'VPBs': hours[VENTRICULAR],
+        'SVPBs': hours[SUPRAVENTRICULAR],
+        'AF (min)': np.round(hours['af_minutes'], 1)
+    })
+    return trend.set_index('Time (h)'), table
+
+
+@st.fragment
+def statistics_panel(path):
+    """Editable report statistics over the day/night metrics, trend and hourly table"""
+    recording = get_recording(path) if path else None
+    stats = load_statistics(path)
+    summary = stats.summary()
+    col1, col2 = st.columns(2)
+    with col1:
+        total_beats = st.number_input("Total Beats", 0, 1000000, min(summary['total_beats'], 1000000))
+        avg_hr = st.number_input("Average HR", 30, 200, clamp_rate(summary['mean_hr'], 30, 200, 78))
+        max_hr = st.number_input("Maximum HR", 60, 250, clamp_rate(summary['max_hr'], 60, 250, 142))
+    with col2:
+        min_hr = st.number_input("Minimum HR", 30, 100, clamp_rate(summary['min_hr'], 30, 100, 48))
+        af_burden = st.number_input("AF Burden (%)", 0.0, 100.0, round(summary['af_burden'], 1))
+        vpb_count = st.number_input("VPB Count", 0, 1000000, min(summary['vpb_count'], 1000000))
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Daytime HR (08-20h)", format_rate(summary['day_hr']))
+    with col2:
+        st.metric("Nighttime HR (00-06h)", format_rate(summary['night_hr']))
+    with col3:
+        drop = summary['night_drop']
+        st.metric("Nighttime HR Drop", "-" if np.isnan(drop) else f"{drop:.0f}%",
+                  delta=None if np.isnan(drop) else ("normal" if drop >= 10 else "blunted"),
+                  delta_color="normal" if np.isnan(drop) or drop >= 10 else "inverse")
+    if np.isnan(drop):
+        st.caption("Day/night rates need the recording's start time.")
+
+    # Same statistics object, same tables: skip rebuilding them on every rerun
+    trend, table = view_model('report_tables', (path, stats), lambda: statistics_tables(recording, stats))
+    st.line_chart(trend, height=200)
+    st.dataframe(table, use_container_width=True, hide_index=True, height=240)
+    return dict(summary, total_beats=total_beats, mean_hr=avg_hr, max_hr=max_hr, min_hr=min_hr,
+                af_burden=af_burden, vpb_count=vpb_count)
+
+
+def report_generation_page():
+    """Report Generation page"""
+    st.markdown('<div class="sub-header">📝 Report Generation</div>', unsafe_allow_html=True)
+    
+    get_report_pools()
+    
+    # Report configuration and content are fragments: their widgets rerun
+    # their own panel, and the full run of the Generate button collects them
+    report_type, include_graphs, anonymize, export_format, physician_name = report_configuration()
+    
+    st.markdown("### 📋 Report Content")
+    
+    tabs = st.tabs(["Patient Info", "Findings", "Statistics"])
+    
+    with tabs[0]:
+        patient = patient_panel()
+    
+    with tabs[1]:
+        findings, diagnosis = findings_panel()
+    
+    recording = get_active_recording()
+    path = st.session_state.user_data['recording_path'] if recording is not None else None
+    with tabs[2]:
+        statistics = statistics_panel(path)
+    
+    # Generate report button
+    st.markdown("---")
+    if st.button("🔄 Generate Report", use_container_width=True):
+        if path is None:
+            times, labels = load_rr_series().times, None
+        else:
+            classes = load_beat_classes(path)
+            times, labels = classes.peaks / recording.fs, classes.labels(get_cluster_overrides(path))
+        stats = load_statistics(path)
+        minutes = stats.minutes()
+        model = ReportModel(
+            report_type=report_type, patient=patient,
+            physician=physician_name, findings=findings, diagnosis=diagnosis,
+            statistics=statistics,
+            hourly=stats.hours(), trend=(minutes['start'], minutes['hr']),
+            beats=(times, np.full(len(times), NORMAL) if labels is None else labels),
+            recording={'name': os.path.basename(path) if path else 'Demo recording',
+                       'start': recording.start_time if recording is not None else None,
+                       'duration': stats.duration or len(minutes['start']) * 60},
+            created=datetime.now())
+        start_report_export(model, export_format, include_graphs, anonymize)
+    show_report_export()
+
+    # Full-disclosure strips as a report attachment
+    recording = get_active_recording()
+    if recording is not None:
+        st.markdown("### 🗂️ Full Disclosure")
+        if not MATPLOTLIB_AVAILABLE:
+            st.info("Install matplotlib to render full-disclosure strips.")
+            return
+        path = st.session_state.user_data['recording_path']
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            lead = st.selectbox("Disclosure lead", range(recording.n_leads),
+                                format_func=lambda i: recording.lead_names[i])
+        with col2:
+            page_format = st.selectbox("Page format", FORMATS, format_func=str.upper)
+        with col3:
+            strips = st.selectbox("One-minute strips per page", [15, 30, 60], index=1)
+        if st.button("🖨️ Render Full Disclosure", use_container_width=True):
+            start_disclosure(path, Layout(lead, 60.0, strips, page_format))
+        
+        job_id = st.session_state.get('disclosure_job')
+        job = get_job_runner().get(job_id) if job_id else None
+        if job is not None:
+            show_job(job, 'disclosure')
+        pages = job.result if job is not None and job.state == DONE else None
+        if pages and all(os.path.exists(p) for p in pages):
+            st.caption(f"{len(pages)} page(s) ready in {job.elapsed:.1f} s (unchanged pages are reused)")
+            # Pages are content-addressed, so the archive is too; it is written
+            # once, when the button is first clicked, never on a rerun
+            archive = os.path.join(os.path.dirname(pages[0]),
+                                   hashlib.sha1('\n'.join(pages).encode()).hexdigest() + '.zip')
+            names = [f"full_disclosure_p{i:03d}{os.path.splitext(page)[1]}" for i, page in enumerate(pages, 1)]
+            st.download_button("📥 Download Full Disclosure (ZIP)",
+                               data=partial(zip_files, pages, archive, names, zipfile.ZIP_STORED),
+                               file_name="Full_Disclosure.zip", mime="application/zip")
+            if pages[0].endswith('.png'):
+                st.image(pages[0], caption="Page 1", use_container_width=True)
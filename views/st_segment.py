@@ -0,0 +1,83 @@
+"""ST Segment Analysis page."""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from holter.st import STAnalyzer
+from views.charts import PLOTLY_AVAILABLE, go
+from views.common import cached_analysis, detect_recording_beats, format_duration, get_active_recording, get_recording
+
+
+def load_st_analysis(path):
+    """Beat-aligned ST measurements and episodes for an imported recording"""
+    def compute():
+        recording = get_recording(path)
+        return STAnalyzer(recording.fs).analyze(recording, detect_recording_beats(path))
+    return cached_analysis('st', path, compute, spinner="Measuring ST segments...")
+
+
+def st_analysis_page():
+    """ST Segment Analysis page"""
+    st.markdown('<div class="sub-header">📊 ST Segment Analysis</div>', unsafe_allow_html=True)
+    
+    recording = get_active_recording()
+    if recording is None:
+        st.info("Import a recording from the **Home Dashboard** to measure ST segments.")
+        return
+    
+    result = load_st_analysis(st.session_state.user_data['recording_path'])
+    names = [recording.lead_names[i] for i in range(recording.n_leads)]
+    
+    # Summary per lead
+    st.markdown("### 📋 ST Summary")
+    depressions = [e for e in result.episodes if e.kind == 'depression']
+    elevations = [e for e in result.episodes if e.kind == 'elevation']
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Beats Measured", f"{result.beat_deviation.shape[1]:,}")
+    with col2:
+        st.metric("Depression Episodes", f"{len(depressions)}")
+    with col3:
+        st.metric("Elevation Episodes", f"{len(elevations)}")
+    with col4:
+        st.metric("Median J Point", f"R + {np.median(result.j_offset) * 1000:.0f} ms" if len(result.j_offset) else "-")
+    
+    # Per-minute trend
+    st.markdown("### 📈 ST Trend (per minute)")
+    trend = pd.DataFrame(result.trend.T, columns=[f'{n} (mV)' for n in names])
+    trend.insert(0, 'Time (h)', result.minutes / 3600)
+    if PLOTLY_AVAILABLE:
+        fig = go.Figure()
+        for column in trend.columns[1:]:
+            fig.add_trace(go.Scatter(x=trend['Time (h)'], y=trend[column], mode='lines',
+                                     name=column.replace(' (mV)', '')))
+        for level in (-0.1, 0.1):
+            fig.add_hline(y=level, line=dict(color='#f44336', dash='dash', width=1))
+        fig.update_layout(xaxis_title="Time (hours)", yaxis_title="ST deviation (mV)", height=400)
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.line_chart(trend.set_index('Time (h)'))
+    
+    # Episodes
+    st.markdown("### ⚠️ ST Episodes")
+    if result.episodes:
+        st.dataframe(pd.DataFrame({
+            'Lead': [e.lead for e in result.episodes],
+            'Type': [e.kind.title() for e in result.episodes],
+            'Start': [format_duration(e.start) for e in result.episodes],
+            'Duration': [format_duration(e.end - e.start) for e in result.episodes],
+            'Peak (mV)': [round(e.peak, 2) for e in result.episodes]
+        }), use_container_width=True, hide_index=True)
+    else:
+        st.success("No ST episodes meeting the 1 mm / 1 minute criterion.")
+    
+    st.markdown("""
+    <div class="warning-box">
+    <strong>⚠️ Verify before reporting:</strong>
+    <ul>
+    <li>Positional changes and rate-related shifts can mimic ischemic ST depression</li>
+    <li>Check episodes against the patient diary for symptoms</li>
+    <li>Confirm the J point and isoelectric baseline in the Detail view</li>
+    </ul>
+    </div>
+    """, unsafe_allow_html=True)
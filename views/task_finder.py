@@ -0,0 +1,175 @@
+"""Quick Task Finder page: full-text search over tasks, reference tables and the user guide."""
+import os
+import re
+import time
+
+import streamlit as st
+
+from holter.metrics import observe
+from holter.search import Document, SearchIndex
+
+GUIDE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'USER_GUIDE.md')
+MAX_RESULTS = 15
+SOURCE_LABELS = {'task': '📋 Task', 'reference': '📚 Reference Guide', 'guide': '📖 User Guide'}
+HEADING = re.compile(r'^(#{1,6})\s+(.*)$', re.MULTILINE)
+LINK = re.compile(r'\[([^\]]*)\]\([^)]*\)')
+MARKUP = re.compile(r'[*_`|#]+|^\s*>', re.MULTILINE)
+
+# Tasks database, built once per process
+TASKS = {
+    "Detect Atrial Fibrillation": {
+        "tabs": ["Rules", "Events", "Detail"],
+        "difficulty": "Intermediate",
+        "steps": [
+            "Open the **Rules** menu from the toolbar",
+            "Adjust AF detection settings: Number of beats analyzed and R-R interval variability",
+            "Set Auto Stops to stop at AF episodes",
+            "Start the scan in **Retrospective** or **Page** mode",
+            "Review detected AF episodes in **Events** tab",
+            "Verify episodes in **Detail** view with all 12 leads"
+        ],
+        "tips": ["Use R-R interval variability to increase sensitivity for paroxysmal AF",
+                "Minimum episode duration should be set to 30 seconds"]
+    },
+    "Measure QT Interval": {
+        "tabs": ["Caliper", "Display"],
+        "difficulty": "Beginner",
+        "steps": [
+            "Select **Caliper** tool from toolbar (or press 'C')",
+            "Navigate to a clear QRS complex in **Display** view",
+            "Place first caliper at Q wave onset",
+            "Place second caliper at T wave end",
+            "Read measurement displayed on screen",
+            "Calculate QTc using Bazett's formula: QTc = QT/√RR"
+        ],
+        "tips": ["Use lead II or V5 for best QT measurements",
+                "Measure in multiple beats and average"]
+    },
+    "Generate Report": {
+        "tabs": ["Report", "Review"],
+        "difficulty": "Beginner",
+        "steps": [
+            "Complete the scan and event review",
+            "Click **Report** tab",
+            "Select report template",
+            "Review automatically generated content",
+            "Add physician comments if needed",
+            "Export as PDF, HL7, or ZPT format"
+        ],
+        "tips": ["Reports can be edited after generation using ZPT Report Viewer"]
+    }
+}
+
+
+def plain(markdown):
+    """Markdown reduced to its words, for indexing and snippets"""
+    return ' '.join(MARKUP.sub(' ', LINK.sub(r'\1', markdown)).split())
+
+
+def task_documents():
+    for name, task in TASKS.items():
+        text = ' '.join(task['steps'] + task['tips'] + task['tabs'] + [task['difficulty']])
+        yield Document(('task', name), 'task', name, plain(text))
+
+
+def reference_documents():
+    from views.reference import ARRHYTHMIA_CLASSES, ECG_INTERVALS, HR_PARAMETERS
+
+    for table in (HR_PARAMETERS, ECG_INTERVALS):
+        for row in table.to_dict('records'):
+            title, *fields = row.items()
+            yield Document(('reference', title[1]), 'reference', title[1],
+                           '. '.join(f'{column}: {value}' for column, value in fields))
+    for group, rhythms in ARRHYTHMIA_CLASSES.items():
+        for name, features in rhythms.items():
+            yield Document(('reference', name), 'reference', name, f'{group} arrhythmia. {features}')
+
+
+def guide_documents(markdown):
+    """One document per section of the user guide, keyed by its heading path"""
+    matches = list(HEADING.finditer(markdown))
+    path = []
+    seen = {}
+    for match, following in zip(matches, matches[1:] + [None]):
+        level, heading = len(match.group(1)), plain(match.group(2))
+        path = path[:level - 1] + [''] * (level - 1 - len(path)) + [heading]
+        body = plain(markdown[match.end():following.start() if following else len(markdown)])
+        if not body:
+            continue
+        # The document title (level 1) is left out of section names
+        key = ' › '.join(part for part in path[1:] if part) or heading
+        seen[key] = seen.get(key, 0) + 1
+        yield Document(('guide', key, seen[key]), 'guide', key, body)
+
+
+@st.cache_resource
+def get_search_index():
+    """Search index over tasks and reference tables, shared by every session of this process"""
+    index = SearchIndex()
+    index.update('task', task_documents())
+    index.update('reference', reference_documents())
+    return index
+
+
+def refresh_guide(index):
+    """Re-index the user guide sections that changed since the last look at the file"""
+    try:
+        stat = os.stat(GUIDE_PATH)
+    except OSError:
+        index.update('guide', [], version=None)
+        return
+    version = (stat.st_mtime_ns, stat.st_size)
+    if index.version('guide') != version:
+        with open(GUIDE_PATH, encoding='utf-8') as f:
+            index.update('guide', guide_documents(f.read()), version=version)
+
+
+def show_task(task_name, task_info, expanded=False):
+    with st.expander(f"📋 {task_name} ({task_info['difficulty']})", expanded=expanded):
+        st.markdown(f"**Required Tabs:** {', '.join(task_info['tabs'])}")
+
+        st.markdown("**Steps:**")
+        for i, step in enumerate(task_info['steps'], 1):
+            st.markdown(f'<div class="step-number">{i}</div> {step}', unsafe_allow_html=True)
+
+        st.markdown("**Tips:**")
+        for tip in task_info['tips']:
+            st.markdown(f"• {tip}")
+
+        # Bookmark button
+        if st.button(f"🔖 Bookmark", key=f"book_{task_name}"):
+            if task_name not in st.session_state.user_data['bookmarks']:
+                st.session_state.user_data['bookmarks'].append(task_name)
+                st.success("Bookmarked!")
+
+
+def quick_task_finder():
+    """Quick task finder page"""
+    st.markdown('<div class="sub-header">🔍 Quick Task Finder</div>', unsafe_allow_html=True)
+    
+    # Search functionality; results update after a short pause in typing
+    search_query = st.text_input("🔎 Search tasks, reference values and the user guide:",
+                                 placeholder="e.g., detect AF, QTc, flutter, generate report",
+                                 type="search", live="200ms")
+
+    if not search_query:
+        for task_name, task_info in TASKS.items():
+            show_task(task_name, task_info)
+        return
+
+    index = get_search_index()
+    started = time.perf_counter()
+    refresh_guide(index)
+    hits = index.search(search_query, limit=MAX_RESULTS)
+    elapsed = time.perf_counter() - started
+    observe('search_seconds', elapsed)
+
+    st.caption(f"{len(hits)} result{'s' if len(hits) != 1 else ''} from {len(index)} entries "
+               f"in {elapsed * 1000:.1f} ms")
+    if not hits:
+        st.info("No matches. Try fewer or shorter words.")
+    for hit in hits:
+        if hit.source == 'task':
+            show_task(hit.title, TASKS[hit.title], expanded=hit is hits[0])
+        else:
+            st.markdown(f"**{hit.title}** · {SOURCE_LABELS[hit.source]}  \n{hit.snippet}")